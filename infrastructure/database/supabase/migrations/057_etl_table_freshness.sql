@@ -0,0 +1,81 @@
+-- Scout ETL Monitoring
+-- Migration: 057_etl_table_freshness.sql
+-- Purpose: Single-call freshness check (latest timestamp, row count, size) for ETL tables
+-- Author: TBWA Enterprise Platform
+-- Date: 2026-10-17
+
+-------------------------------------------------------------------------------
+-- TABLE FRESHNESS RPC
+-- One round trip for any list of tables. Row counts come from catalog
+-- statistics by default (no table scan); pass p_exact_counts => true to
+-- run COUNT(*) instead. Plain PL/pgSQL with no Supabase dependencies, so it
+-- can be exercised against a local Postgres.
+-------------------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION public.etl_table_freshness(
+  p_tables TEXT[],
+  p_timestamp_column TEXT DEFAULT 'transactiondate',
+  p_exact_counts BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+  table_name TEXT,
+  status TEXT,
+  latest_ts TEXT,
+  row_count BIGINT,
+  count_is_estimate BOOLEAN,
+  total_bytes BIGINT
+) AS $$
+DECLARE
+  t TEXT;
+  rel REGCLASS;
+  has_ts_column BOOLEAN;
+BEGIN
+  FOREACH t IN ARRAY p_tables LOOP
+    table_name := t;
+    latest_ts := NULL;
+    row_count := NULL;
+    count_is_estimate := NOT p_exact_counts;
+    total_bytes := NULL;
+
+    rel := to_regclass(t);
+    IF rel IS NULL THEN
+      status := 'missing';
+      RETURN NEXT;
+      CONTINUE;
+    END IF;
+
+    total_bytes := pg_total_relation_size(rel);
+
+    -- Latest timestamp (uses an index on the column when one exists)
+    SELECT EXISTS (
+      SELECT 1 FROM pg_attribute
+      WHERE attrelid = rel AND attname = p_timestamp_column AND NOT attisdropped
+    ) INTO has_ts_column;
+
+    IF has_ts_column THEN
+      EXECUTE format('SELECT MAX(%I)::TEXT FROM %s', p_timestamp_column, rel) INTO latest_ts;
+    END IF;
+
+    IF p_exact_counts THEN
+      EXECUTE format('SELECT COUNT(*) FROM %s', rel) INTO row_count;
+    ELSE
+      -- reltuples is -1 until the first ANALYZE; fall back to live tuple stats
+      SELECT CASE WHEN c.reltuples >= 0 THEN c.reltuples::BIGINT
+                  ELSE COALESCE(s.n_live_tup, 0) END
+      INTO row_count
+      FROM pg_class c
+      LEFT JOIN pg_stat_all_tables s ON s.relid = c.oid
+      WHERE c.oid = rel;
+    END IF;
+
+    status := CASE WHEN latest_ts IS NULL AND COALESCE(row_count, 0) = 0 THEN 'empty' ELSE 'ok' END;
+    RETURN NEXT;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER SET search_path = public, pg_catalog;
+
+COMMENT ON FUNCTION public.etl_table_freshness IS 'Latest timestamp, row count (estimated from pg stats unless p_exact_counts) and total size for each table, in one call. Used by the Scout ETL freshness check.';
+
+-- Monitoring is a backend concern; keep catalog details away from anon clients
+REVOKE ALL ON FUNCTION public.etl_table_freshness(TEXT[], TEXT, BOOLEAN) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.etl_table_freshness(TEXT[], TEXT, BOOLEAN) TO service_role;
@@ -2,11 +2,33 @@
 
 import os
 import json
+import itertools
+import threading
 import requests
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass
 
 
+POS_ORDER_STATES = ["paid", "done", "invoiced"]
+
+POS_ORDER_FIELDS = [
+    "id",
+    "name",
+    "date_order",
+    "partner_id",
+    "config_id",
+    "session_id",
+    "amount_total",
+    "amount_paid",
+    "amount_tax",
+    "amount_return",
+    "state",
+    "lines",
+    "payment_ids",
+    "write_date",
+]
+
+
 @dataclass
 class OdooConfig:
     """Odoo connection configuration."""
@@ -29,17 +51,29 @@ class OdooConfig:
 
 
 class OdooClient:
-    """JSON-RPC client for Odoo API."""
+    """JSON-RPC client for Odoo API.
+
+    Safe to share between threads: each thread keeps its own HTTP session
+    (and so its own keep-alive connection).
+    """
 
     def __init__(self, config: OdooConfig):
         self.config = config
         self.url = f"{config.base_url}{config.jsonrpc_path}"
         self._uid: Optional[int] = None
-        self._request_id = 0
+        self._request_ids = itertools.count(1)
+        self._auth_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        """HTTP session of the calling thread."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
 
     def _make_request(self, service: str, method: str, args: List[Any]) -> Any:
         """Make a JSON-RPC request to Odoo."""
-        self._request_id += 1
         payload = {
             "jsonrpc": "2.0",
             "method": "call",
@@ -48,10 +82,10 @@ class OdooClient:
                 "method": method,
                 "args": args,
             },
-            "id": self._request_id,
+            "id": next(self._request_ids),
         }
 
-        response = requests.post(
+        response = self._session().post(
             self.url,
             json=payload,
             headers={"Content-Type": "application/json"},
@@ -70,19 +104,21 @@ class OdooClient:
 
     def authenticate(self) -> int:
         """Authenticate and get user ID."""
-        if self._uid is not None:
-            return self._uid
-
-        self._uid = self._make_request(
-            "common",
-            "authenticate",
-            [self.config.db, self.config.username, self.config.password, {}],
-        )
+        with self._auth_lock:
+            if self._uid is not None:
+                return self._uid
+
+            uid = self._make_request(
+                "common",
+                "authenticate",
+                [self.config.db, self.config.username, self.config.password, {}],
+            )
 
-        if not self._uid:
-            raise OdooAuthError("Authentication failed")
+            if not uid:
+                raise OdooAuthError("Authentication failed")
 
-        return self._uid
+            self._uid = uid
+            return self._uid
 
     def search_read(
         self,
@@ -120,6 +156,23 @@ class OdooClient:
             ],
         )
 
+    def search_count(self, model: str, domain: List[Any] = None) -> int:
+        """Count records of Odoo model matching domain."""
+        uid = self.authenticate()
+
+        return self._make_request(
+            "object",
+            "execute_kw",
+            [
+                self.config.db,
+                uid,
+                self.config.password,
+                model,
+                "search_count",
+                [domain or []],
+            ],
+        )
+
     def get_pos_orders(
         self,
         since: Optional[str] = None,
@@ -136,29 +189,14 @@ class OdooClient:
         Returns:
             List of POS order dictionaries
         """
-        domain = [("state", "in", ["paid", "done", "invoiced"])]
+        domain = [("state", "in", POS_ORDER_STATES)]
         if since:
             domain.append(("write_date", ">", since))
 
         return self.search_read(
             "pos.order",
             domain=domain,
-            fields=[
-                "id",
-                "name",
-                "date_order",
-                "partner_id",
-                "config_id",
-                "session_id",
-                "amount_total",
-                "amount_paid",
-                "amount_tax",
-                "amount_return",
-                "state",
-                "lines",
-                "payment_ids",
-                "write_date",
-            ],
+            fields=POS_ORDER_FIELDS,
             limit=limit,
             offset=offset,
             order="write_date asc",
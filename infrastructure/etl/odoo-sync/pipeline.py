@@ -0,0 +1,104 @@
+"""Run sync stages concurrently, connected by bounded queues."""
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def run_stages(
+    source: Iterable[Any],
+    stages: Sequence[Callable[[Any], Any]],
+    max_pending: int = 2,
+) -> Iterator[Any]:
+    """Yield each source item after it has passed through every stage in turn.
+
+    The source and each stage run in their own thread, so fetching,
+    transforming and loading overlap. Items keep their order. Each queue
+    holds at most max_pending items, so memory stays bounded and a slow
+    stage holds back the ones before it. The first error in any stage
+    stops the pipeline and is raised here.
+    """
+    stop = threading.Event()
+    queues: List[queue.Queue] = [queue.Queue(max_pending) for _ in range(len(stages) + 1)]
+
+    def feed() -> None:
+        items = iter(source)
+        try:
+            for item in items:
+                if not put_or_stop(queues[0], item, stop):
+                    break
+            put_or_stop(queues[0], _DONE, stop)
+        except BaseException as e:
+            put_or_stop(queues[0], _Failed(e), stop)
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    def work(stage: Callable[[Any], Any], inbox: queue.Queue, outbox: queue.Queue) -> None:
+        while True:
+            item = _get(inbox, stop)
+            if stop.is_set():
+                return
+            if item is _DONE or isinstance(item, _Failed):
+                put_or_stop(outbox, item, stop)
+                return
+            try:
+                result = stage(item)
+            except BaseException as e:
+                put_or_stop(outbox, _Failed(e), stop)
+                return
+            if not put_or_stop(outbox, result, stop):
+                return
+
+    threads = [threading.Thread(target=feed, name="sync-source", daemon=True)]
+    for index, stage in enumerate(stages):
+        threads.append(threading.Thread(
+            target=work,
+            args=(stage, queues[index], queues[index + 1]),
+            name=f"sync-stage-{getattr(stage, '__name__', index)}",
+            daemon=True,
+        ))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def put_or_stop(items: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put item on a bounded queue, giving up once stop is set."""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(items: queue.Queue, stop: threading.Event) -> Any:
+    """Next item from a queue, or None once stop is set."""
+    while not stop.is_set():
+        try:
+            return items.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return None
@@ -0,0 +1,260 @@
+"""Parallel keyset-paginated fetcher for Odoo POS orders."""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from odoo_client import OdooClient, POS_ORDER_FIELDS, POS_ORDER_STATES
+from pipeline import put_or_stop
+
+# (write_date, id) of an order; an id of None stands for every order at that write_date
+Cursor = Tuple[str, Optional[int]]
+
+ODOO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+KEYSET_ORDER = "write_date asc, id asc"
+
+# Windows per worker: smaller windows let the checkpoint advance sooner
+WINDOWS_PER_WORKER = 4
+
+
+def parse_odoo_datetime(value: str) -> datetime:
+    """Parse an Odoo or ISO timestamp as naive UTC (how Odoo stores write_date)."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def format_odoo_datetime(value: datetime) -> str:
+    """Format a naive UTC datetime for an Odoo domain."""
+    return value.strftime(ODOO_DATETIME_FORMAT)
+
+
+def record_cursor(record: Dict[str, Any]) -> Cursor:
+    """Keyset position of a record."""
+    return (record["write_date"], record["id"])
+
+
+def after_domain(cursor: Cursor) -> List[Any]:
+    """Domain for records strictly after cursor in (write_date, id) order."""
+    write_date, record_id = cursor
+    if record_id is None:
+        return [("write_date", ">", write_date)]
+    return [
+        "|", ("write_date", ">", write_date),
+        "&", ("write_date", "=", write_date), ("id", ">", record_id),
+    ]
+
+
+def through_domain(cursor: Cursor) -> List[Any]:
+    """Domain for records up to and including cursor in (write_date, id) order."""
+    write_date, record_id = cursor
+    if record_id is None:
+        return [("write_date", "<=", write_date)]
+    return [
+        "|", ("write_date", "<", write_date),
+        "&", ("write_date", "=", write_date), ("id", "<=", record_id),
+    ]
+
+
+@dataclass
+class Window:
+    """Slice of the key range, paged through by one worker."""
+
+    index: int
+    after: Optional[Cursor]
+    through: Cursor
+
+
+@dataclass
+class Page:
+    """One page of orders from a window."""
+
+    window: int
+    orders: List[Dict[str, Any]]
+    cursor: Optional[Cursor]  # last order on the page, None when empty
+    last: bool  # the window has no further pages
+    lines: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class _WindowDone:
+    error: Optional[BaseException] = None
+
+
+class PosOrderFetcher:
+    """Drains every POS order changed after a cursor, several pages at a time.
+
+    With fetch_lines, each page also carries the order lines of its orders,
+    fetched by the same worker.
+
+    The key range, up to the newest order when the fetch starts, is split
+    into windows with equal row counts. Each worker pages through one
+    window at a time with keyset pagination on (write_date, id), so no
+    order is skipped or read twice, even when many orders share a
+    write_date. Orders written after the fetch started are left for the
+    next run.
+    """
+
+    def __init__(
+        self,
+        client: OdooClient,
+        page_size: int = 500,
+        concurrency: int = 4,
+        max_pending_pages: Optional[int] = None,
+        fetch_lines: bool = True,
+    ):
+        self.client = client
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.fetch_lines = fetch_lines
+        self.max_pending_pages = max_pending_pages or self.concurrency * 2
+
+    def _search(
+        self,
+        domain: List[Any],
+        limit: int,
+        order: str = KEYSET_ORDER,
+        fields: List[str] = POS_ORDER_FIELDS,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        return self.client.search_read(
+            "pos.order",
+            domain=[("state", "in", POS_ORDER_STATES)] + domain,
+            fields=fields,
+            limit=limit,
+            offset=offset,
+            order=order,
+        )
+
+    def plan(self, since: Optional[Cursor] = None) -> List[Window]:
+        """Split the orders after since into windows (empty when there are none).
+
+        Windows hold the same whole number of pages (the last one may be
+        shorter). Each boundary is looked up once, by offset. After that,
+        every page is a keyset query.
+        """
+        lower = after_domain(since) if since else []
+        newest = self._search(lower, 1, "write_date desc, id desc", ["id", "write_date"])
+        if not newest:
+            return []
+        through = record_cursor(newest[0])
+        total = self.client.search_count(
+            "pos.order", [("state", "in", POS_ORDER_STATES)] + lower + through_domain(through)
+        )
+
+        pages = max(1, -(-total // self.page_size))
+        count = min(self.concurrency * WINDOWS_PER_WORKER, pages)
+        window_rows = -(-pages // count) * self.page_size
+        offsets = [window_rows * (index + 1) - 1 for index in range(count)
+                   if window_rows * (index + 1) < total]
+
+        def boundary(offset: int) -> Optional[Cursor]:
+            found = self._search(lower, 1, KEYSET_ORDER, ["id", "write_date"], offset)
+            return record_cursor(found[0]) if found else None
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            found = pool.map(boundary, offsets)
+            # Orders written meanwhile can shift offsets; increasing cursors still partition
+            boundaries = sorted({cursor for cursor in found if cursor is not None and cursor < through})
+
+        windows = []
+        after = since
+        for index, end in enumerate(boundaries + [through]):
+            windows.append(Window(index, after, end))
+            after = end
+        return windows
+
+    def iter_pages(
+        self,
+        since: Optional[Cursor] = None,
+        windows: Optional[List[Window]] = None,
+    ) -> Iterator[Page]:
+        """Yield pages as workers fetch them.
+
+        Pages of a window come in key order. Pages of different windows
+        interleave. At most max_pending_pages pages wait to be consumed.
+        The first fetch error stops all workers and is raised here.
+        """
+        windows = self.plan(since) if windows is None else windows
+        pages: queue.Queue = queue.Queue(self.max_pending_pages)
+        stop = threading.Event()
+
+        def fetch(window: Window) -> None:
+            error = None
+            try:
+                self._fetch_window(window, lambda page: put_or_stop(pages, page, stop), stop)
+            except BaseException as e:
+                error = e
+            put_or_stop(pages, _WindowDone(error), stop)
+
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="odoo-fetch")
+        try:
+            for window in windows:
+                pool.submit(fetch, window)
+
+            finished = 0
+            while finished < len(windows):
+                item = pages.get()
+                if isinstance(item, _WindowDone):
+                    finished += 1
+                    if item.error is not None:
+                        raise item.error
+                    continue
+                yield item
+        finally:
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _fetch_window(self, window: Window, emit, stop: threading.Event) -> None:
+        """Page through one window; emit returns False once the fetch is cancelled."""
+        cursor = window.after
+        while not stop.is_set():
+            domain = through_domain(window.through)
+            if cursor is not None:
+                domain = after_domain(cursor) + domain
+            orders = self._search(domain, self.page_size)
+            page_cursor = record_cursor(orders[-1]) if orders else None
+            # Reaching the window's end saves a request for an empty page
+            last = len(orders) < self.page_size or page_cursor == window.through
+            page = Page(window.index, orders, page_cursor, last)
+            if self.fetch_lines and orders:
+                page.lines = self.client.get_pos_order_lines([o["id"] for o in orders])
+            if not emit(page) or last:
+                return
+            cursor = page_cursor
+
+
+class CheckpointTracker:
+    """Resume position: the last order such that every earlier order was handled.
+
+    Pages of one window are recorded in order, but windows finish out of
+    order, so the position only moves into a window once every window
+    before it has been fully recorded.
+    """
+
+    def __init__(self, windows: List[Window], since: Optional[Cursor] = None):
+        self.since = since
+        self._last: List[Optional[Cursor]] = [None] * len(windows)
+        self._done = [False] * len(windows)
+
+    def record(self, page: Page) -> None:
+        """Mark a page as handled."""
+        if page.cursor is not None:
+            self._last[page.window] = page.cursor
+        if page.last:
+            self._done[page.window] = True
+
+    @property
+    def position(self) -> Optional[Cursor]:
+        position = self.since
+        for last, done in zip(self._last, self._done):
+            if last is not None:
+                position = last
+            if not done:
+                break
+        return position
+
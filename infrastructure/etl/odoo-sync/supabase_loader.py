@@ -100,12 +100,18 @@ class SupabaseLoader:
         records_synced: int,
         status: str = "success",
         error_message: Optional[str] = None,
+        last_record_id: Optional[int] = None,
     ) -> None:
-        """Update sync checkpoint."""
+        """Update sync checkpoint.
+
+        last_sync_at and last_record_id are the (write_date, id) of the last
+        record synced, so the next run resumes right after it.
+        """
         self.client.schema("scout").table("sync_checkpoints").upsert(
             {
                 "id": checkpoint_id,
                 "last_sync_at": last_sync_at.isoformat(),
+                "last_record_id": last_record_id,
                 "records_synced": records_synced,
                 "status": status,
                 "error_message": error_message,
@@ -5,12 +5,22 @@ import os
 import sys
 import argparse
 import logging
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 
 from dotenv import load_dotenv
 
 from odoo_client import OdooClient, OdooConfig
+from pipeline import run_stages
+from pos_fetcher import (
+    CheckpointTracker,
+    Cursor,
+    Page,
+    PosOrderFetcher,
+    format_odoo_datetime,
+    parse_odoo_datetime,
+)
 from transformers import transform_pos_order, ScoutTransaction, TBWA_CLIENT_BRANDS
 from supabase_loader import SupabaseLoader
 
@@ -24,17 +34,92 @@ logger = logging.getLogger(__name__)
 CHECKPOINT_ID = "odoo_pos_sync"
 
 
+@dataclass
+class PageResult:
+    """A page of orders as it moves through the transform and load stages."""
+
+    page: Page
+    transactions: List[ScoutTransaction] = field(default_factory=list)
+    transformed: int = 0
+    loaded: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class PageTransformer:
+    """Transform stage: looks up reference data for a page, then transforms it.
+
+    Products and partners are cached across pages, so each is fetched
+    from Odoo once per run.
+    """
+
+    def __init__(self, odoo: OdooClient):
+        self.odoo = odoo
+        self.products: Dict[int, Dict[str, Any]] = {}
+        self.partners: Optional[Dict[int, Dict[str, Any]]] = None
+
+    def __call__(self, page: Page) -> PageResult:
+        result = PageResult(page)
+        orders = page.orders
+        if not orders:
+            return result
+
+        # Order lines come with the page
+        lines = page.lines
+        lines_by_order: Dict[int, List[Dict[str, Any]]] = {}
+        for line in lines:
+            order_id = line["order_id"][0] if isinstance(line["order_id"], (list, tuple)) else line["order_id"]
+            lines_by_order.setdefault(order_id, []).append(line)
+
+        # Get products not seen on earlier pages
+        product_ids = set(
+            line["product_id"][0]
+            for line in lines
+            if line.get("product_id") and isinstance(line["product_id"], (list, tuple))
+        )
+        missing = list(product_ids - self.products.keys())
+        if missing:
+            self.products.update({p["id"]: p for p in self.odoo.get_products(missing)})
+
+        # Get partners (for store/customer info) the first time an order has one
+        if self.partners is None and any(
+            o.get("partner_id") and isinstance(o["partner_id"], (list, tuple)) for o in orders
+        ):
+            logger.info("Fetching partners...")
+            self.partners = {p["id"]: p for p in self.odoo.get_partners()}
+
+        # Transform orders to Scout transactions
+        for order in orders:
+            order_lines = lines_by_order.get(order["id"], [])
+            try:
+                result.transactions.extend(transform_pos_order(
+                    order, order_lines, self.products, self.partners or {}, TBWA_CLIENT_BRANDS
+                ))
+            except Exception as e:
+                logger.error(f"Error transforming order {order['id']}: {e}")
+                result.errors.append(f"Transform error: {order['id']}: {str(e)}")
+
+        result.transformed = len(result.transactions)
+        return result
+
+
 def run_sync(
     full_sync: bool = False,
     dry_run: bool = False,
     batch_size: int = 500,
+    concurrency: int = 4,
 ) -> Dict[str, Any]:
     """Run the Odoo → Supabase sync.
 
+    Drains every order changed since the checkpoint, not just one batch.
+    Pages are fetched in parallel and flow through transform and load
+    stages that run alongside the fetch. The checkpoint is updated as
+    pages are loaded, so a failed run resumes where it stopped.
+
     Args:
         full_sync: If True, sync all data (ignore checkpoint)
         dry_run: If True, don't write to database
-        batch_size: Number of records per batch
+        batch_size: Number of records per page and per upsert batch
+        concurrency: Number of page requests to Odoo in flight at once
 
     Returns:
         Dict with sync results
@@ -60,95 +145,71 @@ def run_sync(
         loader = SupabaseLoader()
 
         # Get checkpoint
-        since = None
+        since: Optional[Cursor] = None
         if not full_sync:
             checkpoint = loader.get_checkpoint(CHECKPOINT_ID)
             if checkpoint and checkpoint.get("last_sync_at"):
-                since = checkpoint["last_sync_at"]
-                logger.info(f"Incremental sync from: {since}")
+                since = (
+                    format_odoo_datetime(parse_odoo_datetime(checkpoint["last_sync_at"])),
+                    checkpoint.get("last_record_id"),
+                )
+                logger.info(f"Incremental sync from: {since[0]} (after order {since[1]})")
             else:
                 logger.info("No checkpoint found, doing full sync")
 
-        # Fetch POS orders
-        logger.info("Fetching POS orders from Odoo...")
-        orders = odoo.get_pos_orders(since=since, limit=batch_size)
-        results["records_fetched"] = len(orders)
-        logger.info(f"Fetched {len(orders)} orders")
+        # Plan the fetch
+        fetcher = PosOrderFetcher(odoo, page_size=batch_size, concurrency=concurrency)
+        windows = fetcher.plan(since)
 
-        if not orders:
+        if not windows:
             logger.info("No new orders to sync")
             results["status"] = "success"
             results["completed_at"] = datetime.utcnow().isoformat()
             return results
 
-        # Get order line details
-        order_ids = [o["id"] for o in orders]
-        logger.info("Fetching order lines...")
-        lines = odoo.get_pos_order_lines(order_ids)
-        lines_by_order = {}
-        for line in lines:
-            order_id = line["order_id"][0] if isinstance(line["order_id"], (list, tuple)) else line["order_id"]
-            if order_id not in lines_by_order:
-                lines_by_order[order_id] = []
-            lines_by_order[order_id].append(line)
-
-        # Get products
-        product_ids = list(set(
-            line["product_id"][0]
-            for line in lines
-            if line.get("product_id") and isinstance(line["product_id"], (list, tuple))
-        ))
-        logger.info(f"Fetching {len(product_ids)} products...")
-        products_list = odoo.get_products(product_ids)
-        products = {p["id"]: p for p in products_list}
-
-        # Get partners (for store/customer info)
-        partner_ids = list(set(
-            o["partner_id"][0]
-            for o in orders
-            if o.get("partner_id") and isinstance(o["partner_id"], (list, tuple))
-        ))
-        logger.info(f"Fetching {len(partner_ids)} partners...")
-        partners_list = odoo.get_partners() if partner_ids else []
-        partners = {p["id"]: p for p in partners_list}
+        logger.info(f"Fetching POS orders from Odoo in {len(windows)} windows "
+                    f"({concurrency} in parallel)...")
+        tracker = CheckpointTracker(windows, since)
+        checkpointed = since
+
+        def load(result: PageResult) -> PageResult:
+            if not dry_run and result.transactions:
+                tx_dicts = [tx.to_dict() for tx in result.transactions]
+                result.loaded = loader.upsert_transactions(tx_dicts, batch_size=batch_size)
+            result.transactions = []
+            return result
+
+        # Fetch, transform and load overlap; pages arrive here once loaded
+        for result in run_stages(fetcher.iter_pages(windows=windows), [PageTransformer(odoo), load]):
+            tracker.record(result.page)
+            results["records_fetched"] += len(result.page.orders)
+            results["records_transformed"] += result.transformed
+            results["records_loaded"] += result.loaded
+            results["errors"].extend(result.errors)
+            if result.page.orders:
+                logger.info(f"Window {result.page.window}: {len(result.page.orders)} orders, "
+                            f"{result.transformed} transactions, {result.loaded} loaded")
 
-        # Transform orders to Scout transactions
-        logger.info("Transforming to Scout format...")
-        all_transactions: List[ScoutTransaction] = []
-        for order in orders:
-            order_lines = lines_by_order.get(order["id"], [])
-            try:
-                txns = transform_pos_order(
-                    order, order_lines, products, partners, TBWA_CLIENT_BRANDS
+            # Update checkpoint
+            position = tracker.position
+            if not dry_run and position is not None and position != checkpointed:
+                loader.update_checkpoint(
+                    CHECKPOINT_ID,
+                    last_sync_at=parse_odoo_datetime(position[0]),
+                    records_synced=results["records_loaded"],
+                    status="success",
+                    last_record_id=position[1],
                 )
-                all_transactions.extend(txns)
-            except Exception as e:
-                logger.error(f"Error transforming order {order['id']}: {e}")
-                results["errors"].append(f"Transform error: {order['id']}: {str(e)}")
+                checkpointed = position
 
-        results["records_transformed"] = len(all_transactions)
-        logger.info(f"Transformed {len(all_transactions)} transactions")
+        logger.info(f"Fetched {results['records_fetched']} orders, "
+                    f"transformed {results['records_transformed']} transactions")
 
-        # Load to Supabase
         if dry_run:
             logger.info("DRY RUN - skipping database writes")
             results["status"] = "dry_run"
         else:
-            logger.info("Loading to Supabase...")
-            tx_dicts = [tx.to_dict() for tx in all_transactions]
-            loaded = loader.upsert_transactions(tx_dicts, batch_size=batch_size)
-            results["records_loaded"] = loaded
-            logger.info(f"Loaded {loaded} transactions")
-
-            # Update checkpoint
-            if all_transactions:
-                latest_sync = max(tx.synced_at for tx in all_transactions if tx.synced_at)
-                loader.update_checkpoint(
-                    CHECKPOINT_ID,
-                    last_sync_at=latest_sync,
-                    records_synced=loaded,
-                    status="success",
-                )
+            logger.info(f"Loaded {results['records_loaded']} transactions")
 
             # Refresh silver layer
             logger.info("Refreshing silver layer...")
@@ -200,7 +261,13 @@ def main():
         "--batch-size",
         type=int,
         default=500,
-        help="Records per batch (default: 500)",
+        help="Records per page and upsert batch (default: 500)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Parallel page requests to Odoo (default: 4)",
     )
     args = parser.parse_args()
 
@@ -226,6 +293,7 @@ def main():
         full_sync=args.full,
         dry_run=args.dry_run,
         batch_size=args.batch_size,
+        concurrency=args.concurrency,
     )
 
     # Print results
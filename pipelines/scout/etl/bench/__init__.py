@@ -0,0 +1 @@
+# Scout ETL Benchmarks
\ No newline at end of file
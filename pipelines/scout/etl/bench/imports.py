@@ -0,0 +1,123 @@
+"""
+Import-time benchmark for Scout ETL Pipeline
+Cold import cost of entry-point modules, and which heavy backends they load
+
+Usage (from pipelines/scout):
+    python -m etl.bench.imports
+    python -m etl.bench.imports --modules etl.pipeline --repeat 10 --max-ms 1500
+
+Each import runs in a fresh interpreter (-X importtime), so the numbers
+are what a short CLI invocation or a newly started worker pays. Exits
+with status 1 when a module eagerly imports a backend client library or
+is slower than --max-ms.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# Entry points started by the CLI, schedulers and worker processes
+MODULES = [
+    'etl.common.config',
+    'etl.common.log',
+    'etl.transform.bronze_normalize',
+    'etl.extract.orchestrator',
+    'etl.pipeline',
+]
+
+# Only to be imported once the backend is actually used
+LAZY_MODULES = ('yaml', 'sqlalchemy', 'supabase', 'requests')
+
+_MARKER = "-- etl import start --"
+
+_CHILD = """
+import importlib, json, sys, time
+print({marker!r}, file=sys.stderr, flush=True)
+started = time.perf_counter()
+importlib.import_module({module!r})
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds,
+                  "loaded": [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+def _parse_importtime(stderr: str) -> Counter:
+    """Self time in microseconds per top-level package, for imports after the marker"""
+    self_us = Counter()
+    lines = stderr.splitlines()
+    if _MARKER in lines:
+        lines = lines[lines.index(_MARKER) + 1:]
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, _cumulative, name = line[len("import time:"):].split("|", 2)
+        if not own.strip().isdigit():
+            continue  # header line
+        self_us[name.strip().split('.')[0]] += int(own)
+    return self_us
+
+def measure_import(module: str, repeat: int = 5) -> Dict[str, Any]:
+    """Fastest cold import of a module over `repeat` fresh interpreters"""
+    script = _CHILD.format(marker=_MARKER, module=module, lazy=LAZY_MODULES)
+    # Run from the directory containing the etl package, whatever the caller's cwd
+    cwd = Path(__file__).resolve().parent.parent.parent
+
+    best: Optional[Dict[str, Any]] = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+                              cwd=cwd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = dict(result, packages=_parse_importtime(proc.stderr))
+
+    return {
+        "seconds": round(best["seconds"], 4),
+        "eager_backends": best["loaded"],
+        "top_packages": [{"package": package, "ms": round(us / 1000, 1)}
+                         for package, us in best["packages"].most_common(5)],
+    }
+
+def check(results: Dict[str, Dict[str, Any]], max_ms: Optional[float] = None) -> List[str]:
+    """Eagerly imported backends, and modules over the time budget"""
+    problems = []
+    for module, result in results.items():
+        if result["eager_backends"]:
+            problems.append(f"{module} imports {', '.join(result['eager_backends'])} at import time")
+        if max_ms is not None and result["seconds"] * 1000 > max_ms:
+            problems.append(f"{module} took {result['seconds'] * 1000:.0f}ms (budget {max_ms:.0f}ms)")
+    return problems
+
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="Scout ETL import-time benchmark")
+    parser.add_argument("--modules", nargs="+", default=MODULES,
+                        help="Modules to import (default: the pipeline entry points)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Fresh interpreters per module; the fastest is kept (default: 5)")
+    parser.add_argument("--max-ms", type=float, help="Fail when an import takes longer than this")
+    parser.add_argument("--output", type=Path, help="Also write the report as JSON here")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        results[module] = result = measure_import(module, args.repeat)
+        top = ", ".join(f"{entry['package']} {entry['ms']:.0f}ms" for entry in result["top_packages"])
+        print(f"📊 {module}: {result['seconds'] * 1000:.0f}ms ({top})")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+    problems = check(results, args.max_ms)
+    for message in problems:
+        print(f"❌ {message}")
+    if problems:
+        sys.exit(1)
+    print("✅ No eager backend imports" + (" and all imports within budget" if args.max_ms else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Pipeline benchmark for Scout ETL Pipeline
+Stage and end-to-end throughput and peak memory, checked against a stored baseline
+
+Usage (from pipelines/scout):
+    python -m etl.bench.pipeline --rows 10000 100000 1000000
+    python -m etl.bench.pipeline --rows 10000 100000 --save-baseline
+
+Exits with status 1 when a stage is slower or uses more memory than the
+baseline (etl/bench/baseline.json) by more than the tolerance. Scales go
+up to tens of millions of rows; generating 50M rows alone needs ~25 GB.
+"""
+import argparse
+import contextlib
+import ctypes
+import ctypes.util
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..common.config import cfg
+from ..common.log import ETLRun, LogSink, log_run
+from ..transform.bronze_normalize import to_bronze
+from ..transform.silver_conform import to_silver
+from ..transform.silver_enrich import enrich_interactions, create_customer_segments
+from .synthetic import make_dataset
+
+# Pipeline order; each stage takes the previous stage's output
+STAGES: Dict[str, Callable[[Any, ETLRun], Any]] = {
+    'to_bronze': to_bronze,
+    'to_silver': to_silver,
+    'enrich_interactions': enrich_interactions,
+    'create_customer_segments': create_customer_segments,
+}
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+REGRESSION_TOLERANCE = 0.25
+# Below these, differences are timer and allocator noise rather than regressions
+MIN_COMPARE_SECONDS = 0.05
+MIN_COMPARE_MB = 16.0
+
+class _DiscardSink(LogSink):
+    """Drops run logs so they do not drown the benchmark output"""
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        pass
+
+class PeakMemory:
+    """Peak resident memory above the level at entry, while the block runs
+
+    A thread samples the current RSS (Linux /proc/self/statm) every
+    interval; peak_mb stays None where that is unavailable.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak_mb: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'PeakMemory':
+        self._start = self._peak = _current_rss()
+        if self._start is not None:
+            self._thread = threading.Thread(target=self._sample, name="bench-rss", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, _current_rss())
+        self.peak_mb = (self._peak - self._start) / 2 ** 20
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, _current_rss())
+
+def _release_free_memory() -> None:
+    """Collect garbage and hand freed heap back to the OS (glibc only)
+
+    Otherwise memory freed by an earlier run is reused without showing up
+    in RSS, and the next measurement's peak reads close to zero.
+    """
+    gc.collect()
+    libc_name = ctypes.util.find_library('c')
+    if libc_name:
+        try:
+            ctypes.CDLL(libc_name).malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+def _current_rss() -> Optional[int]:
+    """Current resident set size in bytes, or None off Linux"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _input_rows(data: Any) -> int:
+    """Interaction rows in a stage input (throughput is counted in these)"""
+    if isinstance(data, pd.DataFrame):
+        return len(data)
+    for table in ('sales', 'interactions'):
+        if table in data:
+            return len(data[table])
+    return sum(len(df) for df in data.values())
+
+def _measure(run: ETLRun, name: str, rows: int, fn: Callable[[], Any],
+             repeat: int) -> Dict[str, Any]:
+    """Time fn `repeat` times: fastest run's timings, largest peak memory"""
+    best, peaks = None, []
+    for _ in range(repeat):
+        _release_free_memory()
+        # Stage status prints are muted; they would interleave with the results
+        with contextlib.redirect_stdout(io.StringIO()), PeakMemory() as memory, \
+                run.span(f"bench_{name}", rows_in=rows) as span:
+            fn()
+        seconds = span.wall_ms / 1000
+        if memory.peak_mb is not None:
+            peaks.append(memory.peak_mb)
+        if best is None or seconds < best["seconds"]:
+            best = {
+                "rows": rows,
+                "seconds": round(seconds, 4),
+                "cpu_seconds": round(span.cpu_ms / 1000, 4),
+                "rows_per_s": int(rows / seconds) if seconds > 0 else None,
+            }
+    best["peak_mb"] = round(max(peaks), 1) if peaks else None
+    return best
+
+def benchmark_size(n_rows: int, stages: List[str], repeat: int = 1,
+                   seed: int = 42) -> Dict[str, Dict[str, Any]]:
+    """Benchmark the pipeline end to end, then each stage alone, at one scale
+
+    Isolated stages run on the inputs captured during the end-to-end run,
+    so every stage sees exactly what it would in production.
+    """
+    raw = make_dataset(n_rows, seed=seed)
+    run = log_run(environment="benchmark", dry_run=True, sink=_DiscardSink())
+    inputs: Dict[str, Any] = {}
+
+    def end_to_end():
+        data = raw
+        for stage, func in STAGES.items():
+            inputs[stage] = data
+            data = func(data, run)
+        return data
+
+    results = {"end_to_end": _measure(run, "end_to_end", n_rows, end_to_end, repeat)}
+    for stage in stages:
+        data = inputs[stage]
+        results[stage] = _measure(run, stage, _input_rows(data),
+                                  lambda: STAGES[stage](data, run), repeat)
+    return results
+
+def environment() -> Dict[str, Any]:
+    """What a baseline was measured on (results only compare on similar hosts)"""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "bronze_processes": cfg.bronze_processes,
+    }
+
+def calibrate(repeat: int = 10) -> float:
+    """Seconds for a fixed pandas workload (fastest of `repeat`)
+
+    Measured before and after each scale, and the faster of the two is
+    stored with its results, so a comparison can tell a slower or busier
+    host from slower code without one noisy calibration skewing it.
+    """
+    rng = np.random.default_rng(0)
+    keys = np.array([f"K{i}" for i in range(5_000)], dtype=object)
+    frame = pd.DataFrame({'key': keys[rng.integers(0, 5_000, 200_000)],
+                          'value': rng.random(200_000)})
+    best = None
+    for attempt in range(repeat + 1):
+        start = time.perf_counter()
+        frame.groupby('key')['value'].agg(['sum', 'mean', 'count'])
+        frame['key'].str.upper().factorize()
+        frame.sort_values('value')
+        elapsed = time.perf_counter() - start
+        if attempt > 0:  # the first pass warms up pandas code paths
+            best = elapsed if best is None else min(best, elapsed)
+    return round(best, 5)
+
+def host_speed(report: Dict[str, Any], baseline: Dict[str, Any], size: str) -> float:
+    """Current host speed relative to the baseline's at one scale (0.8 = 20% slower)"""
+    current = report.get("calibration_seconds", {}).get(size)
+    base = baseline.get("calibration_seconds", {}).get(size)
+    if not current or not base:
+        return 1.0
+    return base / current
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = REGRESSION_TOLERANCE) -> List[str]:
+    """Regressions of a report against a baseline, as readable messages
+
+    A stage regresses when its throughput drops by more than tolerance
+    both raw and scaled by host_speed (so a calibration that ran slow on
+    a busy moment alone cannot flag it), or its peak memory grows by more
+    than tolerance (and MIN_COMPARE_MB). Stages faster than
+    MIN_COMPARE_SECONDS in the baseline are not timed.
+    """
+    regressions = []
+    for size, stages in report["results"].items():
+        speed = host_speed(report, baseline, size)
+        for stage, current in stages.items():
+            base = baseline.get("results", {}).get(size, {}).get(stage)
+            if base is None:
+                continue
+
+            expected = (base["rows_per_s"] or 0) * speed
+            floor = min(expected, base["rows_per_s"] or 0) * (1 - tolerance)
+            if (base["seconds"] >= MIN_COMPARE_SECONDS and expected
+                    and current["rows_per_s"] < floor):
+                regressions.append(
+                    f"{stage} @ {int(size):,} rows: {current['rows_per_s']:,} rows/s "
+                    f"vs {int(expected):,} expected from baseline (host speed {speed:.2f}x)"
+                )
+            if (current["peak_mb"] is not None and base.get("peak_mb") is not None
+                    and current["peak_mb"] > max(base["peak_mb"] * (1 + tolerance),
+                                                 base["peak_mb"] + MIN_COMPARE_MB)):
+                regressions.append(
+                    f"{stage} @ {int(size):,} rows: peak {current['peak_mb']:,.1f} MB "
+                    f"vs {base['peak_mb']:,.1f} MB baseline"
+                )
+    return regressions
+
+def load_baseline(path: Path) -> Dict[str, Any]:
+    """Stored baseline, or an empty one when the file does not exist"""
+    if not path.exists():
+        return {"environment": {}, "calibration_seconds": {}, "results": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path: Path, report: Dict[str, Any]) -> None:
+    """Store a report as the baseline, keeping scales that were not re-run"""
+    baseline = load_baseline(path)
+    baseline["environment"] = report["environment"]
+    for key in ("calibration_seconds", "results"):
+        baseline[key] = {**baseline.get(key, {}), **report[key]}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"✅ Baseline written to {path}")
+
+def _print_size(report: Dict[str, Any], baseline: Dict[str, Any], size: str) -> None:
+    base_stages = baseline.get("results", {}).get(size, {})
+    speed = host_speed(report, baseline, size)
+    print(f"rows={int(size):>12,}  host speed vs baseline {speed:.2f}x")
+    for stage, result in report["results"][size].items():
+        line = (f"  {stage:<26} {result['seconds']:>9.3f}s  "
+                f"{result['rows_per_s'] or 0:>12,} rows/s  "
+                f"peak {result['peak_mb'] if result['peak_mb'] is not None else '-':>8} MB")
+        base = base_stages.get(stage)
+        if base and base.get("rows_per_s") and result["rows_per_s"]:
+            change = (result["rows_per_s"] / (base["rows_per_s"] * speed) - 1) * 100
+            line += f"  ({change:+.1f}% vs baseline)"
+        print(line)
+
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="Scout ETL pipeline benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Interaction rows per scale (default: 10k 100k 1M)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="Stages to benchmark in isolation (default: all)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per measurement; the fastest is kept (default: 3)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH,
+                        help=f"Baseline JSON (default: {BASELINE_PATH.name} next to this module)")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="Allowed slowdown / memory growth as a fraction (default: 0.25)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Store these results as the baseline instead of comparing")
+    parser.add_argument("--output", type=Path, help="Also write the report as JSON here")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    report = {"environment": environment(), "calibration_seconds": {}, "results": {}}
+    if baseline["environment"] and baseline["environment"] != report["environment"]:
+        print(f"⚠️ Baseline was measured on a different environment: {baseline['environment']}")
+
+    for n_rows in args.rows:
+        size = str(n_rows)
+        before = calibrate()
+        report["results"][size] = benchmark_size(n_rows, args.stages, args.repeat, args.seed)
+        report["calibration_seconds"][size] = min(before, calibrate())
+        _print_size(report, baseline, size)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, report)
+        return
+
+    regressions = compare(report, baseline, args.tolerance)
+    for message in regressions:
+        print(f"❌ Regression: {message}")
+    if regressions:
+        sys.exit(1)
+    print("✅ No regressions against baseline" if baseline["results"] else
+          "⚠️ No baseline to compare against (run with --save-baseline)")
+
+if __name__ == "__main__":
+    main()
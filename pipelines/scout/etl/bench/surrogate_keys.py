@@ -0,0 +1,86 @@
+"""
+Surrogate key benchmark for Scout ETL Pipeline
+Compares the columnar key engine against the row-wise hash_row path
+
+Usage (from pipelines/scout):
+    python -m etl.bench.surrogate_keys --rows 10000 1000000 10000000
+"""
+import argparse
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+from ..common.util import create_surrogate_key, hash_row, format_duration
+
+KEY_COLS = ['transaction_id', 'store_id', 'device_id']
+
+def make_interaction_keys(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Generate interaction key columns with realistic cardinalities"""
+    rng = np.random.default_rng(seed)
+    n_transactions = max(n_rows // 3, 1)
+
+    return pd.DataFrame({
+        'transaction_id': pd.Series(rng.integers(1, n_transactions + 1, n_rows)).map('TXN_{:09d}'.format),
+        'store_id': rng.integers(1, 501, n_rows),
+        'device_id': rng.integers(1, 2001, n_rows).astype(float),
+    })
+
+def _time_call(fn) -> tuple:
+    """Run fn once and return (result, seconds)"""
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def run_benchmark(sizes: List[int], legacy_max_rows: int, algorithm: str) -> List[Dict[str, Any]]:
+    """Benchmark both key paths at each size"""
+    results = []
+
+    for n_rows in sizes:
+        df = make_interaction_keys(n_rows)
+        columnar_keys, columnar_s = _time_call(
+            lambda: create_surrogate_key(df, KEY_COLS, algorithm=algorithm)
+        )
+
+        result = {
+            "rows": n_rows,
+            "columnar_s": round(columnar_s, 3),
+            "columnar_rows_per_s": int(n_rows / columnar_s) if columnar_s > 0 else None,
+            "legacy_s": None,
+            "speedup": None,
+            "keys_match": None,
+        }
+
+        if n_rows <= legacy_max_rows:
+            legacy_keys, legacy_s = _time_call(
+                lambda: df[KEY_COLS].apply(hash_row, axis=1, algorithm=algorithm)
+            )
+            result["legacy_s"] = round(legacy_s, 3)
+            result["speedup"] = round(legacy_s / columnar_s, 1) if columnar_s > 0 else None
+            result["keys_match"] = bool((legacy_keys == columnar_keys).all())
+
+        results.append(result)
+        print(f"rows={n_rows:>10,}  columnar={format_duration(columnar_s):>7}  "
+              f"legacy={format_duration(result['legacy_s']) if result['legacy_s'] is not None else 'skipped':>7}  "
+              f"speedup={result['speedup']}x  match={result['keys_match']}")
+
+    return results
+
+def main():
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="Surrogate key benchmark")
+    parser.add_argument("--rows", type=int, nargs="+",
+                        default=[10_000, 1_000_000, 10_000_000],
+                        help="Row counts to benchmark (default: 10k 1M 10M)")
+    parser.add_argument("--legacy-max-rows", type=int, default=10_000_000,
+                        help="Skip the row-wise path above this size (default: 10M)")
+    parser.add_argument("--algorithm", default="blake2b",
+                        choices=["blake2b", "blake3", "md5", "sha256"],
+                        help="Hash algorithm (default: blake2b)")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.legacy_max_rows, args.algorithm)
+
+if __name__ == "__main__":
+    main()
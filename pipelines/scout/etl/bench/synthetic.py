@@ -0,0 +1,232 @@
+"""
+Synthetic data scaler for Scout ETL Pipeline
+Raw sales, stores and devices at any scale with realistic cardinalities
+
+Usage (from pipelines/scout):
+    python -m etl.bench.synthetic --rows 1000000 --out data/synthetic
+"""
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Market model after scripts/seed/seed_ph_fmcg_market.py: (region, province, weight, cities)
+REGIONS = [
+    ("NCR", "Metro Manila", 0.18, ["Quezon City", "Manila", "Makati", "Taguig", "Pasig"]),
+    ("Region III", "Pampanga", 0.10,
+     ["San Fernando", "Angeles", "Malolos", "Olongapo", "Cabanatuan"]),
+    ("Region IV-A", "Laguna", 0.12,
+     ["Calamba", "Santa Rosa", "Lucena", "Antipolo", "Batangas City"]),
+    ("Region VII", "Cebu", 0.07, ["Cebu City", "Lapu-Lapu", "Mandaue", "Tagbilaran", "Dumaguete"]),
+    ("Region VI", "Iloilo", 0.06, ["Iloilo City", "Bacolod", "Roxas City", "San Jose", "Kalibo"]),
+    ("Region XI", "Davao del Sur", 0.05, ["Davao City", "Panabo", "Tagum", "Digos", "Mati"]),
+    ("Region X", "Misamis Oriental", 0.05,
+     ["Cagayan de Oro", "Iligan", "Valencia", "Malaybalay", "Ozamiz"]),
+    ("Region V", "Albay", 0.04, ["Legazpi", "Naga", "Sorsogon City", "Masbate City", "Iriga"]),
+    ("Region I", "Pangasinan", 0.04, ["Dagupan", "Laoag", "Vigan", "Alaminos", "Candon"]),
+    ("CAR", "Benguet", 0.02, ["Baguio", "La Trinidad", "Tabuk", "Bontoc", "Lagawe"]),
+]
+
+BARANGAYS = ["Poblacion", "San Isidro", "San Roque", "Sto. Nino", "Bagong Silang", "Mabini",
+             "Maligaya", "San Jose", "Pag-asa", "Del Pilar", "Santa Cruz", "Rizal"]
+STORE_PREFIX = ["Tindahan ni", "Sari-Sari ni", "Aling", "Mang", "Kanto ni", "Mini Mart ni"]
+STORE_OWNERS = ["Nena", "Berto", "Lita", "Carlo", "Rosa", "Jun", "Maria", "Pedro", "Ana", "Jose"]
+STORE_TYPES = [("Sari-Sari", 0.70), ("Mini Mart", 0.20), ("Grocery", 0.08), ("Mall", 0.02)]
+
+# (category, weight, brands, pack base prices in PHP)
+CATEGORIES = [
+    ("Dairy", 0.08, ["Alaska", "Bear Brand", "Nestle Fresh Milk", "Anchor", "Selecta"],
+     [28, 95, 12, 58]),
+    ("Snacks", 0.22, ["Oishi", "Jack 'n Jill", "Leslie's", "Piattos", "Nova", "Clover"],
+     [10, 18, 35, 75]),
+    ("Beverage", 0.22, ["Del Monte", "C2", "Coca-Cola", "Pepsi", "Zest-O", "Minute Maid"],
+     [15, 22, 30, 55]),
+    ("Tobacco", 0.18, ["JTI", "Marlboro", "Fortune", "Winston", "Camel"], [8, 75]),
+    ("Cleaning", 0.10, ["Champion", "Joy", "Surf", "Ariel", "Zonrox"], [12, 35, 62, 110]),
+    ("Personal Care", 0.20, ["Safeguard", "Palmolive", "Colgate", "Closeup", "Head & Shoulders",
+                             "Cream Silk"], [9, 35, 65, 28]),
+]
+
+# Raw spellings as they arrive from the source systems (normalized by the silver rules)
+PAYMENT_METHODS = [("Cash", 0.55), ("cash ", 0.05), ("GCash", 0.20), ("PayMaya", 0.05),
+                   ("Credit Card", 0.08), ("Debit Card", 0.05), ("GrabPay", 0.02)]
+FIRMWARE_VERSIONS = ["v1.9.8", "v2.0.5", "v2.1.0", "v2.1.1"]
+DEVICE_TYPES = [("POS", 0.55), ("Point of Sale", 0.05), ("Self-Checkout", 0.15),
+                ("Mobile POS", 0.15), ("Kiosk", 0.10)]
+
+# Share of dirty rows the silver rules are expected to drop or fix
+ZERO_QUANTITY_RATE = 0.01
+PRICE_OUTLIER_RATE = 0.001
+INACTIVE_RATE = 0.05
+BAD_COORDINATE_RATE = 0.01
+
+START_DATE = pd.Timestamp("2024-01-01")
+
+def cardinalities(n_rows: int) -> Dict[str, int]:
+    """Entity counts for a dataset of n_rows interaction rows
+
+    About three items per basket and eight visits per customer; store
+    count grows with volume (about 1,000 rows per store) within bounds.
+    """
+    n_stores = int(np.clip(n_rows // 1000, 20, 50_000))
+    return {
+        "transactions": max(n_rows // 3, 1),
+        "customers": max(n_rows // 24, 100),
+        "stores": n_stores,
+        "devices": n_stores * 2,
+    }
+
+def make_stores(n_stores: int, seed: int = 42) -> pd.DataFrame:
+    """Store master data shaped like the Azure SQL Stores extract"""
+    rng = np.random.default_rng(seed)
+    region_codes = _weighted_codes(rng, [w for _, _, w, _ in REGIONS], n_stores)
+    city_codes = rng.integers(0, 5, n_stores)
+    cities = np.array([region_cities for _, _, _, region_cities in REGIONS], dtype=object)
+
+    latitude = np.round(rng.uniform(5.5, 18.5, n_stores), 6)
+    longitude = np.round(rng.uniform(117.5, 126.0, n_stores), 6)
+    bad = rng.random(n_stores) < BAD_COORDINATE_RATE
+    latitude[bad], longitude[bad] = 0.0, 0.0
+
+    store_ids = np.arange(1, n_stores + 1)
+    return pd.DataFrame({
+        'StoreID': store_ids,
+        'StoreName': _labels(STORE_PREFIX, rng.integers(0, len(STORE_PREFIX), n_stores))
+                     + ' ' + _labels(STORE_OWNERS, rng.integers(0, len(STORE_OWNERS), n_stores))
+                     + ' #' + pd.Series(store_ids).astype(str).to_numpy(dtype=object),
+        'StoreType': _labels([t for t, _ in STORE_TYPES],
+                             _weighted_codes(rng, [w for _, w in STORE_TYPES], n_stores)),
+        'Region': _labels([r for r, _, _, _ in REGIONS], region_codes),
+        'Province': _labels([p for _, p, _, _ in REGIONS], region_codes),
+        'City': cities[region_codes, city_codes],
+        'Barangay': _labels(BARANGAYS, rng.integers(0, len(BARANGAYS), n_stores)),
+        'Latitude': latitude,
+        'Longitude': longitude,
+        'OpenDate': START_DATE - pd.to_timedelta(rng.integers(30, 3650, n_stores), unit='D'),
+        'Status': _status(rng, n_stores, 'Closed'),
+    })
+
+def make_devices(n_stores: int, seed: int = 42) -> pd.DataFrame:
+    """Two devices per store, shaped like the Google Drive device export"""
+    rng = np.random.default_rng(seed + 1)
+    n_devices = n_stores * 2
+    device_ids = np.arange(1, n_devices + 1)
+    return pd.DataFrame({
+        'device_id': device_ids,
+        'device_name': 'Terminal ' + pd.Series(device_ids).astype(str).to_numpy(dtype=object),
+        'device_type': _labels([t for t, _ in DEVICE_TYPES],
+                               _weighted_codes(rng, [w for _, w in DEVICE_TYPES], n_devices)),
+        'store_id': (device_ids - 1) // 2 + 1,
+        'location_in_store': _labels(["Main Counter", "Side Counter"], (device_ids - 1) % 2),
+        'installation_date': START_DATE - pd.to_timedelta(rng.integers(30, 1500, n_devices),
+                                                          unit='D'),
+        'status': _status(rng, n_devices, 'Inactive'),
+        'serial_number': _ids('SN', device_ids + 100_000),
+        'firmware_version': _labels(FIRMWARE_VERSIONS,
+                                    rng.integers(0, len(FIRMWARE_VERSIONS), n_devices)),
+    })
+
+def make_sales(n_rows: int, n_stores: int, days: int = 90, seed: int = 42) -> pd.DataFrame:
+    """Interaction rows shaped like the Azure SQL SalesInteractions extract
+
+    Rows are grouped into baskets (transactions) that share store, device,
+    customer, timestamp and payment method, in timestamp order.
+    """
+    rng = np.random.default_rng(seed + 2)
+    counts = cardinalities(n_rows)
+    n_tx, n_customers = counts["transactions"], counts["customers"]
+
+    # Per-transaction attributes, indexed by each row's transaction code
+    tx = np.sort(rng.integers(0, n_tx, n_rows))
+    tx_store = rng.integers(0, n_stores, n_tx)
+    tx_device = tx_store * 2 + rng.integers(0, 2, n_tx) + 1
+    # Skewed visits: the busiest 10% of customers make about a third of the trips
+    tx_customer = (rng.random(n_tx) ** 2 * n_customers).astype(np.int64)
+    tx_payment = _weighted_codes(rng, [w for _, w in PAYMENT_METHODS], n_tx)
+    # Opening hours 06:00-22:00
+    seconds = np.sort(rng.integers(0, days, n_tx) * 86_400
+                      + rng.integers(6 * 3600, 22 * 3600, n_tx))
+    tx_timestamp = START_DATE + pd.to_timedelta(seconds, unit='s')
+
+    # Product catalog: category -> brand -> pack
+    catalog = [(category, brand, pack, price)
+               for category, _, brands, prices in CATEGORIES
+               for brand in brands
+               for pack, price in enumerate(prices)]
+    category_weights = {category: weight for category, weight, _, _ in CATEGORIES}
+    product_weights = np.array([category_weights[c] / sum(1 for x in catalog if x[0] == c)
+                                for c, _, _, _ in catalog])
+    product = _weighted_codes(rng, product_weights, n_rows)
+    base_price = np.array([price for _, _, _, price in catalog], dtype=np.float64)
+
+    quantity = rng.geometric(0.55, n_rows).clip(max=12)
+    quantity[rng.random(n_rows) < ZERO_QUANTITY_RATE] = 0
+    unit_price = np.round(base_price[product] * rng.uniform(0.9, 1.25, n_rows), 2)
+    unit_price[rng.random(n_rows) < PRICE_OUTLIER_RATE] = 25_000.0
+
+    timestamp = tx_timestamp[tx]
+    return pd.DataFrame({
+        'InteractionID': _ids('INT_', np.arange(n_rows)),
+        'TransactionID': _ids('TXN_', np.arange(n_tx))[tx],
+        'StoreID': tx_store[tx] + 1,
+        'DeviceID': tx_device[tx],
+        'ProductID': _ids('P_', np.arange(len(catalog)))[product],
+        'CustomerID': _ids('C_', np.arange(n_customers))[tx_customer[tx]],
+        'TransactionDate': timestamp.normalize(),
+        'TransactionTimestamp': timestamp,
+        'Quantity': quantity,
+        'UnitPrice': unit_price,
+        'TotalAmount': np.round(quantity * unit_price, 2),
+        'PaymentMethod': _labels([p for p, _ in PAYMENT_METHODS], tx_payment[tx]),
+        'Category': _labels([c for c, _, _, _ in catalog], product),
+        'Brand': _labels([b for _, b, _, _ in catalog], product),
+        'ProductName': _labels([f"{b} {p + 1}" for _, b, p, _ in catalog], product),
+        'SKU': _ids('SKU_', np.arange(len(catalog)))[product],
+    })
+
+def make_dataset(n_rows: int, days: int = 90, seed: int = 42) -> Dict[str, pd.DataFrame]:
+    """raw_data ({'sales', 'stores', 'devices'}) for n_rows interactions, as extract returns it"""
+    n_stores = cardinalities(n_rows)["stores"]
+    return {
+        'sales': make_sales(n_rows, n_stores, days, seed),
+        'stores': make_stores(n_stores, seed),
+        'devices': make_devices(n_stores, seed),
+    }
+
+def _weighted_codes(rng: np.random.Generator, weights: List[float], n: int) -> np.ndarray:
+    """n draws from range(len(weights)) with the given relative weights"""
+    cumulative = np.cumsum(weights, dtype=np.float64)
+    return np.searchsorted(cumulative / cumulative[-1], rng.random(n), side='right')
+
+def _status(rng: np.random.Generator, n: int, inactive: str) -> np.ndarray:
+    """'Active' except for INACTIVE_RATE of rows (dropped by the silver rules)"""
+    return np.where(rng.random(n) < INACTIVE_RATE, inactive, 'Active').astype(object)
+
+def _labels(values: List[str], codes: np.ndarray) -> np.ndarray:
+    """Object array of values[codes] (strings shared, as a database driver returns them)"""
+    return np.array(values, dtype=object)[codes]
+
+def _ids(prefix: str, numbers: np.ndarray) -> np.ndarray:
+    """Zero-padded string ids like TXN_000000042"""
+    width = max(len(str(int(numbers.max()))) if len(numbers) else 1, 6)
+    return np.array([f"{prefix}{number:0{width}d}" for number in numbers.tolist()], dtype=object)
+
+def main():
+    """CLI entry point: write a synthetic raw dataset as Parquet"""
+    parser = argparse.ArgumentParser(description="Generate synthetic Scout raw data")
+    parser.add_argument("--rows", type=int, default=1_000_000,
+                        help="Interaction rows (default: 1M)")
+    parser.add_argument("--days", type=int, default=90, help="Days of history (default: 90)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, required=True, help="Output directory")
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    for name, df in make_dataset(args.rows, args.days, args.seed).items():
+        df.to_parquet(args.out / f"{name}.parquet", index=False)
+        print(f"✅ Wrote {len(df):,} {name} rows to {args.out / f'{name}.parquet'}")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ Configuration management for Scout ETL Pipeline
 Handles environment variables and feature flags
 """
 import os
-import yaml
+import pickle
 from pathlib import Path
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
@@ -11,8 +11,15 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Bumped when the compiled YAML cache format changes
+CONFIG_CACHE_VERSION = 1
+
 class Config:
-    """Configuration manager for Scout ETL"""
+    """Configuration manager for Scout ETL
+
+    Environment settings are read on construction; the YAML files
+    (tables, dims, features) are only parsed on first access.
+    """
 
     def __init__(self):
         self.base_path = Path(__file__).parent.parent
@@ -39,29 +46,124 @@ class Config:
         # Processing configuration
         self.batch_size = int(os.getenv("BATCH_SIZE", "5000"))
         self.max_workers = int(os.getenv("MAX_WORKERS", "4"))
-
-        # Load YAML configurations
-        self._load_configs()
-
-    def _load_configs(self):
-        """Load YAML configuration files"""
+        self.connection_health_ttl = float(os.getenv("CONNECTION_HEALTH_TTL", "300"))
+        self.stream_chunk_size = int(os.getenv("STREAM_CHUNK_SIZE", "50000"))
+        # Read the sales extract through a server-side cursor in STREAM_CHUNK_SIZE chunks
+        self.stream_extract = os.getenv("STREAM_EXTRACT", "false").lower() == "true"
+        self.reference_page_size = int(os.getenv("REFERENCE_PAGE_SIZE", "1000"))
+        self.extract_timeout = float(os.getenv("EXTRACT_TIMEOUT", "600"))
+        self.bronze_processes = int(os.getenv("BRONZE_PROCESSES", "1"))
+        self.bronze_partition_rows = int(os.getenv("BRONZE_PARTITION_ROWS", "100000"))
+        self.profile_sample_rows = int(os.getenv("PROFILE_SAMPLE_ROWS", "1000000"))
+
+        # Incremental extraction configuration
+        self.state_dir = Path(os.getenv("ETL_STATE_DIR", str(self.base_path.parent / "state")))
+        self.extract_lookback_days = int(os.getenv("EXTRACT_LOOKBACK_DAYS", "90"))
+        self.watermark_overlap_days = int(os.getenv("WATERMARK_OVERLAP_DAYS", "1"))
+        self.full_refresh = os.getenv("FULL_REFRESH", "false").lower() == "true"
+        self.schema_cache = os.getenv("SCHEMA_CACHE", "true").lower() == "true"
+        self.incremental_segments = os.getenv("INCREMENTAL_SEGMENTS", "true").lower() == "true"
+        # Days of merged interaction IDs kept by incremental segments to recognise re-read rows
+        # (must cover the overlap window)
+        self.segment_seen_days = int(os.getenv("SEGMENT_SEEN_DAYS",
+                                               str(self.watermark_overlap_days + 1)))
+
+        # Distinct-count metrics computed from HyperLogLog sketches instead of exactly
+        # (e.g. "brands_purchased,stores_visited,brands_in_basket")
+        self.approx_distinct = {name.strip() for name in os.getenv("APPROX_DISTINCT", "").split(",")
+                                if name.strip()}
+
+        # Structured logging: "stdout" or "ndjson" (ETL_LOG_FILE), buffered off the calling thread
+        self.log_sink = os.getenv("ETL_LOG_SINK", "stdout")
+        self.log_buffered = os.getenv("ETL_LOG_BUFFERED", "true").lower() == "true"
+        self.log_file = Path(os.getenv("ETL_LOG_FILE", str(self.base_path.parent / "logs" / "etl.ndjson")))
+
+        # Span tracing: Chrome trace written on finish when ETL_TRACE_FILE is set ({run_id} is
+        # filled in); ETL_TRACE_PROFILE samples stacks every ETL_TRACE_PROFILE_MS per span
+        trace_file = os.getenv("ETL_TRACE_FILE")
+        self.trace_file = Path(trace_file) if trace_file else None
+        self.trace_profile = os.getenv("ETL_TRACE_PROFILE", "false").lower() == "true"
+        self.trace_profile_ms = float(os.getenv("ETL_TRACE_PROFILE_MS", "10"))
+
+        # Stage persistence (partitioned Parquet per layer)
+        self.data_dir = Path(os.getenv("ETL_DATA_DIR", str(self.base_path.parent / "data")))
+
+        # Stage cache (memoized transform outputs)
+        self.stage_cache = os.getenv("STAGE_CACHE", "true").lower() == "true"
+        self.cache_dir = Path(os.getenv("ETL_CACHE_DIR", str(self.base_path.parent / "cache")))
+        self.cache_max_bytes = int(float(os.getenv("ETL_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+        # Parsed YAML configs pickled under cache_dir/config, reused while the file is unchanged
+        self.config_cache = os.getenv("CONFIG_CACHE", "true").lower() == "true"
+
+        self._yaml: Dict[str, Any] = {}
+
+    @property
+    def tables(self) -> Dict[str, Any]:
+        """Table mappings (tables.yaml)"""
+        return self._load_yaml("tables")
+
+    @property
+    def dims(self) -> Dict[str, Any]:
+        """Dimension configurations (dims.yaml)"""
+        return self._load_yaml("dims")
+
+    @property
+    def features(self) -> Dict[str, Any]:
+        """Feature flags (features.yaml)"""
+        return self._load_yaml("features")
+
+    def _load_yaml(self, name: str) -> Dict[str, Any]:
+        """Load a YAML configuration file once, from the compiled cache when it is current"""
+        if name in self._yaml:
+            return self._yaml[name]
+
+        path = self.configs_path / f"{name}.yaml"
         try:
-            # Load table mappings
-            with open(self.configs_path / "tables.yaml", 'r') as f:
-                self.tables = yaml.safe_load(f)
-
-            # Load dimension configurations
-            with open(self.configs_path / "dims.yaml", 'r') as f:
-                self.dims = yaml.safe_load(f)
-
-            # Load feature flags
-            with open(self.configs_path / "features.yaml", 'r') as f:
-                self.features = yaml.safe_load(f)
+            stat = path.stat()
         except FileNotFoundError as e:
             print(f"Warning: Configuration file not found: {e}")
-            self.tables = {}
-            self.dims = {}
-            self.features = {}
+            self._yaml[name] = {}
+            return self._yaml[name]
+
+        # Keyed on the source file, so an edit (or another checkout) recompiles
+        key = (CONFIG_CACHE_VERSION, str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        cache_path = self.cache_dir / "config" / f"{name}.pickle"
+        data = self._read_compiled(cache_path, key) if self.config_cache else None
+        if data is None:
+            import yaml
+
+            # libyaml's loader when PyYAML was built with it, same result as safe_load
+            loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+            with open(path, 'r') as f:
+                data = yaml.load(f, Loader=loader) or {}
+            if self.config_cache:
+                self._write_compiled(cache_path, key, data)
+
+        self._yaml[name] = data
+        return data
+
+    @staticmethod
+    def _read_compiled(cache_path: Path, key: tuple) -> Optional[Any]:
+        """Cached parse result, or None when missing, stale or unreadable"""
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_key, data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            return None
+        return data if cached_key == key else None
+
+    @staticmethod
+    def _write_compiled(cache_path: Path, key: tuple, data: Any) -> None:
+        """Best effort: a read-only cache dir just means parsing YAML every time"""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((key, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not cache compiled config {cache_path.name}: {e}")
 
     def validate_supabase_config(self, require_service_role: bool = False) -> bool:
         """Validate Supabase configuration"""
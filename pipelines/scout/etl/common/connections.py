@@ -0,0 +1,127 @@
+"""
+Connection registry for Scout ETL Pipeline
+Process-wide cache of pooled engines and API clients
+"""
+import atexit
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from .config import cfg
+
+class ConnectionRegistry:
+    """Process-wide cache of backend connections
+
+    Each backend is created once per process and shared by every extract
+    function. Health checks are lazy: they only run when a cached client is
+    handed out and its last successful check is older than the TTL.
+    """
+
+    def __init__(self, health_ttl_seconds: Optional[float] = None):
+        self.health_ttl_seconds = (cfg.connection_health_ttl
+                                   if health_ttl_seconds is None else health_ttl_seconds)
+        # _lock only guards the dicts; building and checking a client holds its name's lock
+        self._lock = threading.Lock()
+        self._name_locks: Dict[str, threading.Lock] = {}
+        self._clients: Dict[str, Any] = {}
+        self._closers: Dict[str, Optional[Callable[[Any], None]]] = {}
+        self._checked_at: Dict[str, float] = {}
+        self.stats = {"created": 0, "reused": 0, "health_checks": 0, "evicted": 0}
+
+    def get(self, name: str,
+            factory: Callable[[], Any],
+            health_check: Optional[Callable[[Any], None]] = None,
+            closer: Optional[Callable[[Any], None]] = None) -> Any:
+        """Return the cached client for `name`, creating it on first use
+
+        health_check(client) should raise if the client is unusable; a failed
+        check evicts the client and a fresh one is created once. A slow
+        connect or check only blocks callers asking for the same name.
+        """
+        client = self._cached(name, health_check)
+        if client is not None:
+            return client
+
+        with self._name_lock(name):
+            # Another caller may have created or checked it while we waited
+            client = self._cached(name, health_check)
+            if client is not None:
+                return client
+
+            with self._lock:
+                client = self._clients.get(name)
+            if client is not None:
+                try:
+                    self._count("health_checks")
+                    health_check(client)
+                    with self._lock:
+                        self._checked_at[name] = time.monotonic()
+                    return client
+                except Exception as e:
+                    print(f"⚠️ Cached connection '{name}' failed health check, reconnecting: {e}")
+                    self.invalidate(name)
+
+            return self._create(name, factory, health_check, closer)
+
+    def _cached(self, name: str, health_check: Optional[Callable[[Any], None]]) -> Any:
+        """The cached client if it needs no health check right now, else None"""
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None or (health_check is not None and self._check_due(name)):
+                return None
+            self.stats["reused"] += 1
+            return client
+
+    def _name_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.Lock())
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _create(self, name: str, factory: Callable[[], Any],
+                health_check: Optional[Callable[[Any], None]],
+                closer: Optional[Callable[[Any], None]]) -> Any:
+        """Create and verify a new client, then publish it to the cache"""
+        client = factory()
+        if health_check is not None:
+            self._count("health_checks")
+            health_check(client)
+
+        with self._lock:
+            self._clients[name] = client
+            self._closers[name] = closer
+            self._checked_at[name] = time.monotonic()
+            self.stats["created"] += 1
+        return client
+
+    def _check_due(self, name: str) -> bool:
+        """Whether the cached client's health check has expired"""
+        return time.monotonic() - self._checked_at.get(name, 0.0) >= self.health_ttl_seconds
+
+    def invalidate(self, name: str) -> None:
+        """Close and drop a cached client"""
+        with self._lock:
+            client = self._clients.pop(name, None)
+            closer = self._closers.pop(name, None)
+            self._checked_at.pop(name, None)
+            if client is None:
+                return
+            self.stats["evicted"] += 1
+
+        if closer is not None:
+            try:
+                closer(client)
+            except Exception as e:
+                print(f"⚠️ Failed to close connection '{name}': {e}")
+
+    def close_all(self) -> None:
+        """Close every cached client (called at interpreter exit)"""
+        with self._lock:
+            names = list(self._clients)
+        for name in names:
+            self.invalidate(name)
+
+# Global registry, closed cleanly at exit
+registry = ConnectionRegistry()
+atexit.register(registry.close_all)
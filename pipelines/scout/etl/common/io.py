@@ -3,11 +3,14 @@ I/O utilities for Scout ETL Pipeline
 Handles CSV, JSON, Parquet reading and writing
 """
 import pandas as pd
+import numpy as np
 import json
 import csv
+import pickle
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union, Iterator
+from typing import Dict, Any, List, Optional, Union, Iterator, Tuple, Sequence
 from io import StringIO
+from .util import sample_values
 
 def read_csv(file_path: Union[str, Path], **kwargs) -> pd.DataFrame:
     """Read CSV file with robust error handling"""
@@ -72,6 +75,37 @@ def dataframe_chunks(df: pd.DataFrame, chunk_size: int = 5000) -> Iterator[pd.Da
     for i in range(0, len(df), chunk_size):
         yield df.iloc[i:i + chunk_size]
 
+def frame_to_ipc(df: pd.DataFrame) -> Tuple[str, bytes]:
+    """Serialize a DataFrame for hand-off to another process
+
+    Uses the Arrow IPC stream format (column buffers, no per-object
+    pickling); frames Arrow cannot represent (e.g. mixed-type object
+    columns) fall back to pickle. Returns (format, payload).
+    """
+    try:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return "arrow", sink.getvalue().to_pybytes()
+    except (ImportError, ValueError, TypeError, NotImplementedError) as e:
+        # pyarrow's ArrowInvalid/ArrowTypeError subclass ValueError/TypeError
+        if not isinstance(e, ImportError):
+            print(f"⚠️ Arrow hand-off unavailable for frame, using pickle: {e}")
+        return "pickle", pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+def frame_from_ipc(payload: Tuple[str, bytes]) -> pd.DataFrame:
+    """Deserialize a DataFrame produced by frame_to_ipc"""
+    fmt, data = payload
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        with pa.ipc.open_stream(pa.py_buffer(data)) as reader:
+            return reader.read_all().to_pandas()
+    return pickle.loads(data)
+
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Normalize column names for consistency"""
     df = df.copy()
@@ -106,6 +140,10 @@ def infer_datatypes(df: pd.DataFrame,
     if not numeric_cols:
         for col in df.columns:
             if df[col].dtype == 'object':
+                # Skip the full conversion when a sample shows the column is mostly text
+                if not _may_be_mostly_numeric(df[col]):
+                    continue
+
                 # Try to convert to numeric
                 try:
                     converted = pd.to_numeric(df[col], errors='coerce')
@@ -117,6 +155,20 @@ def infer_datatypes(df: pd.DataFrame,
 
     return df
 
+def _may_be_mostly_numeric(series: pd.Series) -> bool:
+    """Whether more than half the column could be numeric, judged from a sample
+
+    Errs towards True: only skips when the sampled numeric share is more than
+    four standard errors below one half.
+    """
+    sample = sample_values(series)
+    if len(sample) == len(series):
+        return True
+
+    share = pd.to_numeric(sample, errors='coerce').notna().mean()
+    stderr = max(np.sqrt(share * (1 - share) / len(sample)), 1 / len(sample))
+    return share + 4 * stderr > 0.5
+
 def validate_required_columns(df: pd.DataFrame, required_cols: List[str]) -> bool:
     """Validate that DataFrame has required columns"""
     missing_cols = set(required_cols) - set(df.columns)
@@ -126,16 +178,80 @@ def validate_required_columns(df: pd.DataFrame, required_cols: List[str]) -> boo
 
 def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """Clean DataFrame with standard operations"""
-    df = df.copy()
-
-    # Remove completely empty rows
+    # Remove completely empty rows (returns a new frame; the caller's is untouched)
     df = df.dropna(how='all')
 
-    # Strip whitespace from string columns
-    string_cols = df.select_dtypes(include=['object']).columns
+    # Strip whitespace from string columns and map null tokens to NA in one pass
+    string_cols = df.select_dtypes(include=['object', 'string']).columns
     for col in string_cols:
-        df[col] = df[col].astype(str).str.strip()
-        # Convert empty strings to NaN
-        df[col] = df[col].replace(['', 'nan', 'None'], pd.NA)
+        df[col] = clean_strings(df[col], null_tokens=('', 'nan', 'None'), na_value=pd.NA)
+
+    return df
+
+def clean_strings(series: pd.Series, case: Optional[str] = None,
+                  null_tokens: Sequence[str] = ('', 'nan', 'None'),
+                  na_value: Any = np.nan, categorical: bool = False) -> pd.Series:
+    """Strip, case-normalize ('upper', 'lower', 'title') and null-map a column
+
+    Equivalent to astype(str).str.strip().str.<case>() followed by replacing
+    null_tokens with na_value, but done in one pass: the column is factorized
+    once and only its distinct values are cleaned, so repeated values cost a
+    hash lookup instead of three string copies. Missing values always map to
+    na_value. Arrow-backed string columns are cleaned with Arrow kernels and
+    stay Arrow-backed. categorical=True returns a category dtype with sorted
+    categories.
+    """
+    if _is_arrow_string(series.dtype):
+        return _clean_arrow_strings(series, case, null_tokens, categorical)
+
+    codes, uniques = pd.factorize(series.to_numpy(), use_na_sentinel=True)
+    tokens = set(null_tokens)
+    transform = {'upper': str.upper, 'lower': str.lower, 'title': str.title}.get(case)
+
+    cleaned = np.empty(len(uniques), dtype=object)
+    for i, value in enumerate(uniques):
+        text = str(value).strip()
+        if transform is not None:
+            text = transform(text)
+        cleaned[i] = None if text in tokens else text
+
+    # Distinct raw values can collapse to the same cleaned value
+    value_codes, values = pd.factorize(cleaned, sort=categorical, use_na_sentinel=True)
+    final_codes = value_codes.take(codes) if len(value_codes) else codes
+    final_codes[codes < 0] = -1
+
+    if categorical:
+        result = pd.Categorical.from_codes(final_codes, categories=values)
+    else:
+        # na_value sits last, so -1 codes pick it (also when every value was null)
+        lookup = np.empty(len(values) + 1, dtype=object)
+        lookup[:-1] = values
+        lookup[-1] = na_value
+        result = lookup.take(final_codes)
+    return pd.Series(result, index=series.index, name=series.name)
+
+def _is_arrow_string(dtype: Any) -> bool:
+    """Whether a dtype is an Arrow-backed string dtype"""
+    if isinstance(dtype, pd.StringDtype):
+        return dtype.storage == 'pyarrow'
+    if isinstance(dtype, pd.ArrowDtype):
+        import pyarrow as pa
+        return pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype)
+    return False
+
+def _clean_arrow_strings(series: pd.Series, case: Optional[str],
+                         null_tokens: Sequence[str], categorical: bool) -> pd.Series:
+    """clean_strings for Arrow-backed columns using Arrow compute kernels"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    values = pc.utf8_trim_whitespace(pa.array(series.array))
+    if case is not None:
+        values = {'upper': pc.utf8_upper, 'lower': pc.utf8_lower, 'title': pc.utf8_title}[case](values)
+    is_token = pc.is_in(values, value_set=pa.array(list(null_tokens), type=values.type))
+    values = pc.if_else(is_token, pa.scalar(None, type=values.type), values)
 
-    return df
\ No newline at end of file
+    result = pd.Series(pd.arrays.ArrowExtensionArray(values), index=series.index, name=series.name)
+    if categorical:
+        return result.astype('category')
+    return result.astype(series.dtype)
@@ -1,12 +1,181 @@
 """
 Structured logging for Scout ETL Pipeline
 """
+import atexit
 import json
+import sys
+import threading
 import time
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
+from pathlib import Path
+from typing import Dict, Any, List, Optional, TextIO, Union
 from dataclasses import dataclass, asdict
+from .config import cfg
+from .tracing import Span, Tracer
+
+try:
+    import orjson
+except ImportError:  # standard library encoder, same output
+    orjson = None
+
+# BufferedSink hands records to its target after this many records or seconds
+LOG_FLUSH_RECORDS = 1000
+LOG_FLUSH_SECONDS = 1.0
+
+def _encode_default(value: Any) -> Any:
+    """numpy scalars as numbers, anything else unknown as its string form"""
+    if hasattr(value, 'item') and hasattr(value, 'dtype'):
+        return value.item()
+    return str(value)
+
+def encode_record(record: Dict[str, Any]) -> str:
+    """One log record as a compact JSON line (without the newline)"""
+    if orjson is not None:
+        return orjson.dumps(record, default=_encode_default,
+                            option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(record, default=_encode_default, separators=(',', ':'))
+
+class LogSink:
+    """Destination for structured log records"""
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.write_batch([record])
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+class StreamSink(LogSink):
+    """NDJSON lines on a text stream (sys.stdout at write time by default)"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        stream = self.stream or sys.stdout
+        stream.write(''.join(encode_record(record) + '\n' for record in records))
+        stream.flush()
+
+class FileSink(LogSink):
+    """NDJSON file, appended to; opened on first write"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = None
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(''.join(encode_record(record) + '\n' for record in records))
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class BufferedSink(LogSink):
+    """Buffers records in memory and writes them to a target sink from a background thread
+
+    write() only appends to a list, so logging costs the caller no
+    serialization or I/O. The writer thread hands the buffer to the target
+    every flush_records records or flush_seconds seconds; flush() and
+    close() drain it synchronously, in order. Records are serialized when
+    written, so values passed to the log must not be mutated afterwards.
+    """
+
+    def __init__(self, target: LogSink, flush_records: int = LOG_FLUSH_RECORDS,
+                 flush_seconds: float = LOG_FLUSH_SECONDS):
+        self.target = target
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="etl-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._closed:
+            self.target.write(record)
+            return
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.flush_records
+        if full:
+            self._wakeup.set()
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        """Write everything buffered so far to the target"""
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            self.target.write_batch(batch)
+            self.target.flush()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        self.target.close()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:  # never let a log write kill the writer thread
+                print(f"⚠️ Log sink write failed: {e}", file=sys.stderr)
+
+_default_sink: Optional[LogSink] = None
+_default_sink_lock = threading.Lock()
+
+def create_log_sink(kind: Optional[str] = None, buffered: Optional[bool] = None,
+                    path: Optional[Union[str, Path]] = None) -> LogSink:
+    """Sink from settings: kind 'stdout' or 'ndjson' (file), optionally buffered"""
+    kind = (kind or cfg.log_sink).lower()
+    buffered = cfg.log_buffered if buffered is None else buffered
+
+    if kind == 'stdout':
+        sink = StreamSink()
+    elif kind in ('ndjson', 'file'):
+        sink = FileSink(path or cfg.log_file)
+    else:
+        raise ValueError(f"Unknown log sink: {kind}")
+    return BufferedSink(sink) if buffered else sink
+
+def default_log_sink() -> LogSink:
+    """Process-wide sink shared by runs that were not given one; closed at exit"""
+    global _default_sink
+    with _default_sink_lock:
+        if _default_sink is None:
+            _default_sink = create_log_sink()
+            atexit.register(_default_sink.close)
+        return _default_sink
 
 @dataclass
 class ETLRun:
@@ -22,6 +191,10 @@ class ETLRun:
     errors: list = None
 
     def __post_init__(self):
+        # Not dataclass fields, so to_dict() leaves them out
+        self.sink: LogSink = default_log_sink()
+        self.tracer = Tracer(on_close=self._log_span,
+                             profile_interval=cfg.trace_profile_ms / 1000 if cfg.trace_profile else None)
         if self.steps is None:
             self.steps = []
         if self.metrics is None:
@@ -51,7 +224,29 @@ class ETLRun:
             "message": f"ETL Step: {step_name}",
             "data": step_data
         }
-        print(json.dumps(log_entry, default=str))
+        self.sink.write(log_entry)
+
+    def span(self, name: str, rows_in: Optional[int] = None,
+             parent: Optional[Span] = None, **attrs):
+        """Context manager timing a block as a child of the current span (or `parent`)
+
+        Yields the Span; set span.rows_out inside the block. Each closed
+        span is logged with wall/CPU time, peak RSS growth and row counts.
+        """
+        return self.tracer.span(name, rows_in=rows_in, parent=parent, **attrs)
+
+    def current_span(self) -> Optional[Span]:
+        """Innermost open span of the calling thread"""
+        return self.tracer.current()
+
+    def _log_span(self, span: Span):
+        log_entry = {
+            "run_id": self.run_id,
+            "level": "DEBUG",
+            "message": f"ETL Span: {span.name}",
+            "data": span.to_dict()
+        }
+        self.sink.write(log_entry)
 
     def log_metric(self, metric_name: str, value: Any):
         """Log a metric for this run"""
@@ -63,7 +258,7 @@ class ETLRun:
             "message": f"Metric: {metric_name}",
             "data": {"metric": metric_name, "value": value}
         }
-        print(json.dumps(log_entry, default=str))
+        self.sink.write(log_entry)
 
     def log_error(self, error_type: str, error_message: str, **kwargs):
         """Log an error for this run"""
@@ -82,7 +277,7 @@ class ETLRun:
             "message": f"ETL Error: {error_type}",
             "data": error_data
         }
-        print(json.dumps(log_entry, default=str))
+        self.sink.write(log_entry)
 
     def finish(self, ok: bool = True):
         """Finish the ETL run"""
@@ -100,17 +295,30 @@ class ETLRun:
                 "duration_seconds": duration_seconds,
                 "steps_count": len(self.steps),
                 "errors_count": len(self.errors),
-                "metrics": self.metrics
+                "metrics": dict(self.metrics)
             }
         }
-        print(json.dumps(log_entry, default=str))
+        self.sink.write(log_entry)
+        self.tracer.close()
+        if cfg.trace_file is not None:
+            self.export_trace(str(cfg.trace_file).format(run_id=self.run_id))
+        self.sink.flush()
+
+    def export_trace(self, path: Union[str, Path]) -> Path:
+        """Write the run's spans as a Chrome trace, plus sampled stacks as <path>.folded"""
+        trace_path = self.tracer.export_chrome_trace(path)
+        if self.tracer.profile_interval:
+            self.tracer.export_folded_stacks(f"{trace_path}.folded")
+        print(f"📊 Trace written to {trace_path}")
+        return trace_path
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert run to dictionary for serialization"""
         return asdict(self)
 
-def log_run(environment: str = "development", dry_run: bool = True) -> ETLRun:
-    """Initialize a new ETL run with logging"""
+def log_run(environment: str = "development", dry_run: bool = True,
+            sink: Optional[LogSink] = None) -> ETLRun:
+    """Initialize a new ETL run with logging (to the default sink unless one is given)"""
     run_id = str(uuid.uuid4())[:8]
     start_time = datetime.utcnow()
 
@@ -120,6 +328,8 @@ def log_run(environment: str = "development", dry_run: bool = True) -> ETLRun:
         environment=environment,
         dry_run=dry_run
     )
+    if sink is not None:
+        run.sink = sink
 
     log_entry = {
         "run_id": run_id,
@@ -131,6 +341,6 @@ def log_run(environment: str = "development", dry_run: bool = True) -> ETLRun:
             "start_time": start_time.isoformat()
         }
     }
-    print(json.dumps(log_entry, default=str))
+    run.sink.write(log_entry)
 
     return run
\ No newline at end of file
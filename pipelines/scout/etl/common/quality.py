@@ -0,0 +1,193 @@
+"""
+Data quality profiling for Scout ETL Pipeline
+Single-pass frame profiles, kept per frame so later stages reuse them
+"""
+import weakref
+from dataclasses import dataclass, field, replace
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .config import cfg
+
+# Profiles by id() of the frame they describe, dropped when the frame is collected.
+# Not kept in df.attrs: pandas copies attrs to derived frames and to_parquet
+# JSON-encodes them, which a DataProfile cannot be.
+_PROFILES: Dict[int, 'DataProfile'] = {}
+
+@dataclass(frozen=True)
+class ColumnProfile:
+    """Stats for one column; min/max only for numeric and datetime columns"""
+    dtype: str
+    null_count: int
+    distinct_count: int
+    min: Any = None
+    max: Any = None
+
+@dataclass(frozen=True)
+class DataProfile:
+    """Completeness, null, duplicate and per-column stats for one frame
+
+    When the frame was larger than the sample size, stats come from a
+    sample of sampled_rows rows: null and duplicate counts are scaled to
+    row_count (estimates) and distinct counts are those seen in the sample.
+    """
+    row_count: int
+    columns: Dict[str, ColumnProfile]
+    duplicate_rows: int
+    sampled_rows: int
+    signature: Tuple[Any, ...] = field(default=(), compare=False, repr=False)
+
+    @property
+    def sampled(self) -> bool:
+        return self.sampled_rows < self.row_count
+
+    @property
+    def null_count(self) -> int:
+        return sum(column.null_count for column in self.columns.values())
+
+    def completeness(self) -> float:
+        """Share of non-null cells"""
+        total_cells = self.row_count * len(self.columns)
+        if total_cells == 0:
+            return 1
+        return 1 - self.null_count / total_cells
+
+    def quality_score(self) -> Dict[str, Any]:
+        """Metrics in the calculate_data_quality_score format"""
+        total_cells = self.row_count * len(self.columns)
+        null_cells = self.null_count
+        return {
+            "completeness": self.completeness(),
+            "row_count": self.row_count,
+            "column_count": len(self.columns),
+            "null_count": null_cells,
+            "null_percentage": (null_cells / total_cells * 100) if total_cells > 0 else 0,
+            "duplicate_rows": self.duplicate_rows,
+            "columns_with_nulls": sum(col.null_count > 0 for col in self.columns.values()),
+        }
+
+def profile_frame(df: pd.DataFrame, sample_rows: Optional[int] = None,
+                  refresh: bool = False) -> DataProfile:
+    """Profile of df, reusing the one attached to it when still current
+
+    Every column is factorized once; the codes give its null and distinct
+    counts and are combined into row codes for the duplicate count. The
+    profile is kept for df and reused while df is the same object with the
+    same rows and columns (frames derived from it are profiled again).
+    Code that edits values in place must pass refresh=True.
+    """
+    if not refresh:
+        profile = attached_profile(df)
+        if profile is not None:
+            return profile
+
+    sample_rows = sample_rows or cfg.profile_sample_rows
+    profile = _profile(df, sample_rows)
+    _attach(df, profile)
+    return profile
+
+def attached_profile(df: pd.DataFrame) -> Optional[DataProfile]:
+    """Profile kept for df if it still describes df, else None"""
+    profile = _PROFILES.get(id(df))
+    if profile is not None and profile.signature == _signature(df):
+        return profile
+    return None
+
+def extend_profile(df: pd.DataFrame, columns: List[str]) -> DataProfile:
+    """Profile of df after `columns` were added to an already profiled frame
+
+    Only the new columns are profiled. Constant columns cannot change the
+    duplicate count, so it is kept; otherwise the frame is profiled again.
+    """
+    profile = _PROFILES.get(id(df))
+    if profile is None or profile.row_count != len(df):
+        return profile_frame(df, refresh=True)
+
+    frame = df[columns]
+    if profile.sampled:
+        frame = frame.sample(n=profile.sampled_rows, random_state=0)
+    scale = profile.row_count / profile.sampled_rows if profile.sampled_rows else 1
+    added = {name: _column_profile(frame[name], profile.row_count, scale)[0] for name in columns}
+    if any(col.distinct_count > 1 or 0 < col.null_count < profile.row_count
+           for col in added.values()):
+        return profile_frame(df, refresh=True)
+
+    profile = replace(profile, columns={**profile.columns, **added}, signature=_signature(df))
+    _attach(df, profile)
+    return profile
+
+def _attach(df: pd.DataFrame, profile: DataProfile) -> None:
+    if id(df) not in _PROFILES:
+        weakref.finalize(df, _PROFILES.pop, id(df), None)
+    _PROFILES[id(df)] = profile
+
+def _signature(df: pd.DataFrame) -> Tuple[Any, ...]:
+    return (id(df), len(df), tuple(df.columns), tuple(str(dtype) for dtype in df.dtypes))
+
+def _profile(df: pd.DataFrame, sample_rows: int) -> DataProfile:
+    """Profile every column and the row duplicates from one factorization per column"""
+    frame = df.sample(n=sample_rows, random_state=0) if len(df) > sample_rows else df
+    scale = len(df) / len(frame) if len(frame) else 1
+
+    columns = {}
+    row_codes, row_space, distinct_rows = None, 1, False
+    for position, name in enumerate(df.columns):
+        column, codes = _column_profile(frame.iloc[:, position], len(df), scale)
+        columns[name] = column
+        if distinct_rows:
+            continue
+        if column.distinct_count == len(frame):
+            # A unique column makes every row distinct; later columns cannot change that
+            distinct_rows = True
+            continue
+
+        if row_codes is not None and row_space * (column.distinct_count + 1) >= 2 ** 62:
+            # Compress before the mixed-radix code overflows int64
+            row_codes, uniques = pd.factorize(row_codes)
+            row_space = len(uniques)
+            distinct_rows = row_space == len(frame)
+            if distinct_rows:
+                continue
+        row_codes, row_space = _combine_codes(row_codes, row_space, codes, column.distinct_count)
+
+    duplicate_rows = 0
+    if not distinct_rows and row_codes is not None:
+        duplicate_rows = int(round((len(frame) - len(pd.unique(row_codes))) * scale))
+
+    return DataProfile(len(df), columns, duplicate_rows, len(frame), _signature(df))
+
+def _column_profile(values: pd.Series, row_count: int,
+                    scale: float = 1.0) -> Tuple[ColumnProfile, np.ndarray]:
+    """ColumnProfile plus dense codes (-1 = null) for one column"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        used = np.flatnonzero(np.bincount(codes[codes >= 0], minlength=len(values.cat.categories)))
+        # Re-code to the observed categories so distinct_count bounds the codes
+        remap = np.full(len(values.cat.categories) + 1, -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        codes, uniques = remap[codes], values.cat.categories[used]
+    else:
+        try:
+            codes, uniques = pd.factorize(values)
+        except TypeError:
+            # Unhashable values (lists, dicts) are profiled by their string form
+            codes, uniques = pd.factorize(values.astype(str).where(values.notna()))
+
+    null_count = int(np.count_nonzero(codes < 0))
+    if scale != 1.0:
+        null_count = min(int(round(null_count * scale)), row_count)
+
+    minimum = maximum = None
+    kind = values.dtype.kind if isinstance(values.dtype, np.dtype) else ''
+    if len(uniques) and kind in 'iufM':
+        minimum, maximum = uniques.min(), uniques.max()
+
+    return ColumnProfile(str(values.dtype), null_count, len(uniques), minimum, maximum), codes
+
+def _combine_codes(row_codes: Optional[np.ndarray], row_space: int,
+                   codes: np.ndarray, n_values: int) -> Tuple[np.ndarray, int]:
+    """Fold one column's codes into the mixed-radix row codes (equal rows <=> equal codes)"""
+    shifted = codes.astype(np.int64) + 1
+    if row_codes is None:
+        return shifted, n_values + 1
+    return row_codes * (n_values + 1) + shifted, row_space * (n_values + 1)
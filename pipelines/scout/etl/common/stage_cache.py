@@ -0,0 +1,201 @@
+"""
+Stage cache for Scout ETL Pipeline
+Content-addressed memoization of stage outputs keyed by input fingerprints
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+import pandas as pd
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+from .config import cfg
+from .log import ETLRun
+from .tracing import traced
+
+# Load timestamps change on every run without changing the data
+VOLATILE_COLUMNS = {'_bronze_loaded_at', '_silver_loaded_at', '_enriched_at'}
+FINGERPRINT_CHUNK_ROWS = 250_000
+
+StageInput = Union[pd.DataFrame, Dict[str, pd.DataFrame]]
+
+def fingerprint_frame(df: pd.DataFrame, chunk_rows: int = FINGERPRINT_CHUNK_ROWS) -> str:
+    """Content fingerprint of a DataFrame: schema plus per-chunk row hashes
+
+    Row hashes come from pd.util.hash_pandas_object (vectorized); each chunk
+    of row hashes is digested separately and the digests are combined.
+    """
+    columns = [col for col in df.columns if col not in VOLATILE_COLUMNS]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[str(col), str(df[col].dtype)] for col in columns]).encode())
+    digest.update(str(len(df)).encode())
+
+    frame = df[columns]
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        try:
+            row_hashes = pd.util.hash_pandas_object(chunk, index=True)
+        except TypeError:
+            # Unhashable cells (lists, dicts): hash their string form
+            row_hashes = pd.util.hash_pandas_object(chunk.astype(str), index=True)
+        digest.update(hashlib.blake2b(row_hashes.to_numpy().tobytes(), digest_size=16).digest())
+
+    return digest.hexdigest()
+
+def fingerprint_input(data: Any) -> str:
+    """Fingerprint a stage input (DataFrame, dict of DataFrames or plain value)"""
+    if isinstance(data, pd.DataFrame):
+        return fingerprint_frame(data)
+    if isinstance(data, dict):
+        parts = {str(name): fingerprint_input(value) for name, value in sorted(data.items())}
+        return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=16).hexdigest()
+    return hashlib.blake2b(repr(data).encode(), digest_size=16).hexdigest()
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Hash of the ETL package source; any code change invalidates the cache"""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(cfg.base_path.rglob("*.py")):
+        digest.update(str(path.relative_to(cfg.base_path)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def config_version() -> str:
+    """Hash of the configuration that shapes transform output"""
+    settings = {
+        "environment": cfg.environment,
+        "tables": getattr(cfg, 'tables', None),
+        "dims": getattr(cfg, 'dims', None),
+        "features": getattr(cfg, 'features', None),
+        "approx_distinct": sorted(getattr(cfg, 'approx_distinct', ())),
+    }
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True, default=str).encode(),
+                           digest_size=16).hexdigest()
+
+class StageCache:
+    """Local content-addressed cache of stage outputs with size-based LRU eviction
+
+    Entries live in <root>/<key>/ (output.pkl + meta.json); the meta file's
+    mtime is the last-access time used for eviction. Outputs are pickled so
+    a hit returns exactly what the stage produced (dtypes, index, NA kinds).
+    The cache directory must only be writable by the pipeline itself.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None,
+                 max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.root = Path(root) if root else cfg.cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else cfg.cache_max_bytes
+        self.enabled = cfg.stage_cache if enabled is None else enabled
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                      "bytes_read": 0, "bytes_written": 0}
+
+    def key(self, stage: str, inputs: Dict[str, Any], version: str = "1") -> str:
+        """Cache key for a stage run from its inputs, code and config versions"""
+        parts = {
+            "stage": stage,
+            "version": version,
+            "code": code_version(),
+            "config": config_version(),
+            "inputs": {name: fingerprint_input(value) for name, value in sorted(inputs.items())},
+        }
+        return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached output for a key, or None"""
+        entry = self.root / key
+        output_path = entry / "output.pkl"
+        if not output_path.exists():
+            return None
+
+        try:
+            with open(output_path, 'rb') as f:
+                output = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Dropping unreadable cache entry {key}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        # Touch for LRU ordering
+        os.utime(entry / "meta.json")
+        self.stats["bytes_read"] += output_path.stat().st_size
+        return output
+
+    def put(self, key: str, stage: str, output: Any) -> None:
+        """Store a stage output, then evict least-recently-used entries over the size limit"""
+        entry = self.root / key
+        staging = self.root / f".{key}.{os.getpid()}.tmp"
+        staging.mkdir(parents=True, exist_ok=True)
+
+        try:
+            with open(staging / "output.pkl", 'wb') as f:
+                pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = (staging / "output.pkl").stat().st_size
+            with open(staging / "meta.json", 'w', encoding='utf-8') as f:
+                json.dump({"stage": stage, "bytes": size, "created_at": time.time()}, f)
+
+            if entry.exists():
+                shutil.rmtree(entry)
+            staging.rename(entry)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.stats["stores"] += 1
+        self.stats["bytes_written"] += size
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least-recently-used entries until the cache fits max_bytes"""
+        entries = []
+        for entry in self.root.iterdir():
+            meta = entry / "meta.json"
+            if entry.name.startswith('.') or not meta.exists():
+                continue
+            size = sum(path.stat().st_size for path in entry.iterdir())
+            entries.append((meta.stat().st_mtime, size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self.stats["evictions"] += 1
+
+    @traced("cache_{stage}")
+    def run_stage(self, run: ETLRun, stage: str, func: Callable[..., Any],
+                  inputs: Dict[str, StageInput], version: str = "1", **kwargs) -> Any:
+        """Call func(**inputs, run=run, **kwargs) unless an identical run is cached
+
+        Hits and misses are logged as a `cache_<stage>` step and the running
+        totals as the `stage_cache` metric.
+        """
+        if not self.enabled:
+            return func(**inputs, run=run, **kwargs)
+
+        with run.span(f"fingerprint_{stage}") as span:
+            key = self.key(stage, inputs, version)
+        fingerprint_ms = span.elapsed_ms
+
+        output = self.get(key)
+        if output is not None:
+            self.stats["hits"] += 1
+            run.log_step(f"cache_{stage}", "success", result="hit", key=key[:12],
+                        fingerprint_ms=fingerprint_ms)
+        else:
+            self.stats["misses"] += 1
+            output = func(**inputs, run=run, **kwargs)
+            try:
+                self.put(key, stage, output)
+            except Exception as e:
+                # A cache that cannot be written must never fail the stage
+                print(f"⚠️ Failed to cache {stage} output: {e}")
+            run.log_step(f"cache_{stage}", "success", result="miss", key=key[:12],
+                        fingerprint_ms=fingerprint_ms)
+
+        run.log_metric("stage_cache", dict(self.stats))
+        return output
@@ -0,0 +1,272 @@
+"""
+Stage persistence for Scout ETL Pipeline
+Partitioned Parquet datasets for the bronze, silver and gold layers
+"""
+import shutil
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+from pyarrow import fs
+from .config import cfg
+from .log import ETLRun
+from .state import JsonStateFile
+from .tracing import traced
+
+# Partition keys are derived into dedicated path-only columns (no leading
+# underscore: dataset readers skip such directories) so the data
+# columns round-trip with their original types
+PARTITION_DATE_COLUMNS = ['transaction_date', 'transaction_timestamp']
+PARTITION_REGION_COLUMNS = ['region', 'store_region']
+DATE_PARTITION = 'partition_date'
+REGION_PARTITION = 'partition_region'
+ROW_ORDER_COLUMN = '_stage_row'
+UNKNOWN_PARTITION = 'unknown'
+
+Filter = Tuple[str, str, Any]
+
+class StageStore:
+    """Layer outputs as hive-partitioned Parquet: <root>/<layer>/<table>/partition_date=.../partition_region=...
+
+    Each layer keeps a manifest of its tables; the pipeline state file
+    records which layers the current (or last, unfinished) run completed
+    so a rerun can resume from the last persisted layer.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None):
+        self.root = Path(root) if root else cfg.data_dir
+        self._filesystem = fs.LocalFileSystem(use_mmap=True)
+
+    def table_path(self, layer: str, table: str) -> Path:
+        """Dataset directory for one table"""
+        return self.root / layer / table
+
+    def _manifest(self, layer: str) -> JsonStateFile:
+        return JsonStateFile(self.root / layer / "_manifest.json")
+
+    def tables(self, layer: str) -> Dict[str, Any]:
+        """Manifest entries for the tables persisted in a layer"""
+        return self._manifest(layer)._load()
+
+    @traced("persist_{layer}")
+    def write_layer(self, layer: str, tables: Dict[str, pd.DataFrame], run: ETLRun) -> None:
+        """Persist every table of a layer"""
+        try:
+            entries = {name: self.write_table(layer, name, df, run.run_id)
+                       for name, df in tables.items()}
+
+            manifest = self._manifest(layer)
+            manifest._save(entries)
+
+            duration_ms = run.current_span().elapsed_ms
+            run.log_step(f"persist_{layer}", "success",
+                        duration_ms=duration_ms,
+                        tables=len(entries),
+                        rows=sum(entry["rows"] for entry in entries.values()))
+
+        except Exception as e:
+            run.log_error(f"persist_{layer}", str(e))
+            raise
+
+    def write_table(self, layer: str, table: str, df: pd.DataFrame,
+                    run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Write one table as a partitioned dataset, replacing any previous version"""
+        target = self.table_path(layer, table)
+        staging = target.with_name(f"{table}.tmp-{uuid.uuid4().hex[:8]}")
+        entry = {
+            "rows": len(df),
+            "columns": [str(col) for col in df.columns],
+            "partitions": [],
+            "run_id": run_id,
+            "written_at": datetime.utcnow().isoformat(),
+        }
+
+        if df.empty:
+            if target.exists():
+                shutil.rmtree(target)
+            return entry
+
+        frame, partitions = _with_partition_columns(df)
+        arrow_table = pa.Table.from_pandas(frame, preserve_index=False)
+        partitioning = None
+        if partitions:
+            partitioning = ds.partitioning(
+                pa.schema([(name, pa.string()) for name in partitions]), flavor='hive'
+            )
+
+        staging.parent.mkdir(parents=True, exist_ok=True)
+        ds.write_dataset(arrow_table, staging, format='parquet', partitioning=partitioning,
+                         basename_template='part-{i}.parquet',
+                         existing_data_behavior='error')
+
+        # Swap the new dataset in only once it is fully written
+        if target.exists():
+            shutil.rmtree(target)
+        staging.rename(target)
+
+        entry["partitions"] = partitions
+        return entry
+
+    @traced("load_{layer}")
+    def read_layer(self, layer: str, tables: Optional[Sequence[str]] = None,
+                   columns: Optional[Dict[str, List[str]]] = None,
+                   run: Optional[ETLRun] = None) -> Dict[str, pd.DataFrame]:
+        """Read persisted tables of a layer; columns maps table -> projection"""
+        manifest = self.tables(layer)
+        names = [name for name in (tables or manifest) if name in manifest]
+        columns = columns or {}
+
+        data = {name: self.read_table(layer, name, columns.get(name)) for name in names}
+
+        if run is not None:
+            duration_ms = run.current_span().elapsed_ms
+            run.log_step(f"load_{layer}", "success",
+                        duration_ms=duration_ms,
+                        tables=len(data),
+                        rows=sum(len(df) for df in data.values()))
+        return data
+
+    def read_table(self, layer: str, table: str,
+                   columns: Optional[List[str]] = None,
+                   filters: Optional[List[Filter]] = None) -> pd.DataFrame:
+        """Read one table with column projection and predicate pushdown
+
+        filters are (column, op, value) tuples combined with AND. Filters on
+        a date or region column also prune partition directories. Files are
+        memory-mapped and converted without intermediate copies.
+        """
+        entry = self.tables(layer).get(table)
+        path = self.table_path(layer, table)
+        if entry is None or entry["rows"] == 0 or not path.exists():
+            return pd.DataFrame(columns=columns or (entry or {}).get("columns", []))
+
+        partitions = entry.get("partitions", [])
+        partitioning = None
+        if partitions:
+            partitioning = ds.partitioning(
+                pa.schema([(name, pa.string()) for name in partitions]), flavor='hive'
+            )
+        dataset = ds.dataset(str(path), format='parquet', partitioning=partitioning,
+                             filesystem=self._filesystem)
+
+        projection = None
+        if columns is not None:
+            available = set(dataset.schema.names)
+            projection = [col for col in columns if col in available]
+            if ROW_ORDER_COLUMN not in projection:
+                projection.append(ROW_ORDER_COLUMN)
+
+        expression = None
+        if filters:
+            expression = pq.filters_to_expression(
+                _coerce_filters(filters, dataset.schema) + _partition_filters(filters, partitions)
+            )
+
+        arrow_table = dataset.to_table(columns=projection, filter=expression)
+
+        # Partition directories are read in path order; restore the written order
+        arrow_table = arrow_table.take(pc.sort_indices(arrow_table[ROW_ORDER_COLUMN]))
+        drop = [name for name in [ROW_ORDER_COLUMN] + partitions if name in arrow_table.column_names]
+        arrow_table = arrow_table.drop_columns(drop)
+
+        return arrow_table.to_pandas(split_blocks=True, self_destruct=True)
+
+    # Pipeline resume state
+
+    def _pipeline_state(self) -> JsonStateFile:
+        return JsonStateFile(self.root / "_pipeline.json")
+
+    def begin_pipeline(self, run_id: str, resume: bool = True) -> List[str]:
+        """Start a pipeline run; returns layers reusable from an unfinished previous run"""
+        state_file = self._pipeline_state()
+        previous = state_file._load()
+
+        reusable = []
+        if resume and previous and not previous.get("finished", False):
+            reusable = list(previous.get("completed", []))
+
+        state_file._save({
+            "run_id": run_id,
+            "resumed_from": previous.get("run_id") if reusable else None,
+            "started_at": datetime.utcnow().isoformat(),
+            "completed": reusable,
+            "finished": False,
+        })
+        return reusable
+
+    def completed_layers(self) -> List[str]:
+        """Layers persisted so far by the current run"""
+        return list(self._pipeline_state()._load().get("completed", []))
+
+    def mark_complete(self, layer: str) -> None:
+        """Record that a layer has been fully persisted by the current run"""
+        state_file = self._pipeline_state()
+        state = state_file._load()
+        if layer not in state.setdefault("completed", []):
+            state["completed"].append(layer)
+        state_file._save(state)
+
+    def finish_pipeline(self) -> None:
+        """Mark the current run finished so the next run starts fresh"""
+        state_file = self._pipeline_state()
+        state = state_file._load()
+        state["finished"] = True
+        state["finished_at"] = datetime.utcnow().isoformat()
+        state_file._save(state)
+
+def _with_partition_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """Add row order and path-only partition columns for writing"""
+    columns = {ROW_ORDER_COLUMN: pd.RangeIndex(len(df))}
+    partitions = []
+
+    date_col = next((col for col in PARTITION_DATE_COLUMNS if col in df.columns), None)
+    if date_col is not None:
+        dates = pd.to_datetime(df[date_col], errors='coerce')
+        columns[DATE_PARTITION] = dates.dt.strftime('%Y-%m-%d').fillna(UNKNOWN_PARTITION).to_numpy()
+        partitions.append(DATE_PARTITION)
+
+    region_col = next((col for col in PARTITION_REGION_COLUMNS if col in df.columns), None)
+    if region_col is not None:
+        regions = df[region_col].astype(object).where(df[region_col].notna(), UNKNOWN_PARTITION)
+        columns[REGION_PARTITION] = regions.astype(str).to_numpy()
+        partitions.append(REGION_PARTITION)
+
+    frame = df.reset_index(drop=True).assign(**columns)
+    return frame, partitions
+
+def _coerce_filters(filters: List[Filter], schema: pa.Schema) -> List[Filter]:
+    """Convert filter values on timestamp/date columns (e.g. ISO strings) to timestamps"""
+    coerced = []
+    for column, op, value in filters:
+        if column in schema.names and (pa.types.is_timestamp(schema.field(column).type)
+                                       or pa.types.is_date(schema.field(column).type)):
+            if op in ('in', 'not in'):
+                value = [pd.Timestamp(v) for v in value]
+            else:
+                value = pd.Timestamp(value)
+        coerced.append((column, op, value))
+    return coerced
+
+def _partition_filters(filters: List[Filter], partitions: List[str]) -> List[Filter]:
+    """Equivalent partition-column filters, so whole directories are skipped"""
+    pruning = []
+    for column, op, value in filters:
+        if REGION_PARTITION in partitions and column in PARTITION_REGION_COLUMNS:
+            if op in ('=', '=='):
+                pruning.append((REGION_PARTITION, '=', str(value)))
+            elif op == 'in':
+                pruning.append((REGION_PARTITION, 'in', [str(v) for v in value]))
+
+        elif DATE_PARTITION in partitions and column in PARTITION_DATE_COLUMNS:
+            if op in ('=', '==', '<', '<=', '>', '>='):
+                day = pd.Timestamp(value).strftime('%Y-%m-%d')
+                # Day granularity: strict bounds must keep the boundary day
+                day_op = {'==': '=', '<': '<=', '>': '>='}.get(op, op)
+                pruning.append((DATE_PARTITION, day_op, day))
+
+    return pruning
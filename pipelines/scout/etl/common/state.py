@@ -0,0 +1,153 @@
+"""
+Persisted pipeline state for Scout ETL Pipeline
+Watermarks and inferred schemas, stored as local JSON state files
+"""
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Union, Iterator
+from .config import cfg
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, last writer wins
+    fcntl = None
+
+class JsonStateFile:
+    """Small JSON document under cfg.state_dir, written atomically"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def _load(self) -> Dict[str, Any]:
+        """Read the whole state document from disk"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable state file {self.path}: {e}")
+            return {}
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        """Write the whole state document atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive lock for read-modify-write across processes"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix('.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+class WatermarkStore(JsonStateFile):
+    """Last extracted position per source table
+
+    Each entry records the latest TransactionDate and the highest
+    InteractionID seen on that date, which together form a keyset cursor
+    for the next incremental pull.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        super().__init__(path or cfg.state_dir / "watermarks.json")
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        """Get the watermark for a source table, if any"""
+        return self._load().get(source)
+
+    def set(self, source: str, transaction_date: Any, interaction_id: Any,
+            rows_extracted: int = 0) -> Dict[str, Any]:
+        """Persist a new watermark for a source table"""
+        state = self._load()
+        state[source] = {
+            "transaction_date": str(transaction_date),
+            "interaction_id": None if interaction_id is None else str(interaction_id),
+            "rows_extracted": int(rows_extracted),
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        self._save(state)
+        return state[source]
+
+    def reset(self, source: str) -> None:
+        """Drop the watermark for a source table (forces a full window)"""
+        state = self._load()
+        if state.pop(source, None) is not None:
+            self._save(state)
+
+class StagedWatermarkStore(WatermarkStore):
+    """Watermark store that holds writes in memory until commit()
+
+    Lets a pipeline advance a watermark only once the rows it covers have
+    been accepted (finished within the timeout) and persisted.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        super().__init__(path)
+        self._staged: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Dict[str, Any]:
+        """Read staged watermarks, falling back to disk"""
+        if self._staged is not None:
+            return dict(self._staged)
+        return super()._load()
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        """Stage watermarks without touching disk"""
+        self._staged = dict(state)
+
+    @property
+    def has_pending(self) -> bool:
+        """Whether there are staged writes not yet committed"""
+        return self._staged is not None
+
+    def commit(self) -> None:
+        """Write staged watermarks to disk"""
+        if self._staged is not None:
+            super()._save(self._staged)
+            self._staged = None
+
+    def discard(self) -> None:
+        """Drop staged watermarks"""
+        self._staged = None
+
+class SchemaCache(JsonStateFile):
+    """Inferred column types per source, reused by later runs
+
+    Written by detect_column_types; updates merge per column under a file
+    lock, so process-pool workers inferring different column groups of the
+    same source do not overwrite each other.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        super().__init__(path or cfg.state_dir / "schemas.json")
+
+    def get(self, source: str) -> Dict[str, str]:
+        """Cached {column: type} decisions for a source"""
+        return dict(self._load().get(source, {}).get("columns", {}))
+
+    def update(self, source: str, column_types: Dict[str, str]) -> None:
+        """Merge new column type decisions for a source"""
+        if not column_types:
+            return
+        with self._locked():
+            state = self._load()
+            entry = state.setdefault(source, {"columns": {}})
+            entry["columns"].update(column_types)
+            entry["updated_at"] = datetime.utcnow().isoformat()
+            self._save(state)
+
+    def reset(self, source: str) -> None:
+        """Forget the cached schema for a source"""
+        with self._locked():
+            state = self._load()
+            if state.pop(source, None) is not None:
+                self._save(state)
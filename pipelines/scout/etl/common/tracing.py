@@ -0,0 +1,295 @@
+"""
+Span tracing for Scout ETL Pipeline
+Nested wall/CPU/RSS timings, optional stack sampling and Chrome trace export
+"""
+import functools
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, RSS deltas are not recorded
+    resource = None
+
+# Frames kept per sampled stack, and hot frames reported per span
+SAMPLE_MAX_DEPTH = 64
+TOP_FRAMES = 10
+
+@dataclass
+class Span:
+    """One timed region; children point at their parent through parent_id
+
+    cpu_ms is CPU time of the thread that ran the span (work in worker
+    processes is not included); rss_peak_delta_kb is how much the
+    process's peak RSS grew while the span was open.
+    """
+    name: str
+    span_id: int
+    parent_id: Optional[int]
+    thread_id: int
+    start_us: float
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    wall_ms: Optional[float] = None
+    cpu_ms: Optional[float] = None
+    rss_peak_delta_kb: Optional[int] = None
+    samples: Counter = field(default_factory=Counter, repr=False)
+    _started: float = field(default=0.0, repr=False)
+    _cpu_started: float = field(default=0.0, repr=False)
+    _rss_started: Optional[int] = field(default=None, repr=False)
+
+    @property
+    def elapsed_ms(self) -> int:
+        """Wall time so far (or total once closed), in whole milliseconds"""
+        if self.wall_ms is not None:
+            return int(self.wall_ms)
+        return int((time.perf_counter() - self._started) * 1000)
+
+    def hot_frames(self, limit: int = TOP_FRAMES) -> List[Dict[str, Any]]:
+        """Innermost frames that were sampled most often while this span was innermost"""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack[-1]] += count
+        return [{"frame": frame, "samples": count} for frame, count in leaves.most_common(limit)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {
+            "span": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "thread_id": self.thread_id,
+            "wall_ms": round(self.wall_ms, 3) if self.wall_ms is not None else None,
+            "cpu_ms": round(self.cpu_ms, 3) if self.cpu_ms is not None else None,
+            "rss_peak_delta_kb": self.rss_peak_delta_kb,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            **self.attrs,
+        }
+        if self.samples:
+            record["hot_frames"] = self.hot_frames()
+        return record
+
+class Tracer:
+    """Collects spans for one run; parents are tracked per thread
+
+    With profile_interval set, a sampler thread records the Python stack
+    of every thread that has an open span each interval and attributes it
+    to that thread's innermost span.
+    """
+
+    def __init__(self, on_close: Optional[Callable[[Span], None]] = None,
+                 profile_interval: Optional[float] = None):
+        self.on_close = on_close
+        self.profile_interval = profile_interval
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        self._open: Dict[int, List[Span]] = {}
+        self._lock = threading.Lock()
+        self._epoch = time.perf_counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @contextmanager
+    def span(self, name: str, rows_in: Optional[int] = None,
+             parent: Optional[Span] = None, **attrs) -> Iterator[Span]:
+        """Time a block as a child of `parent`, else of the current thread's open span
+
+        Pass parent explicitly for work handed to another thread.
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            stack = self._open.setdefault(thread_id, [])
+            if parent is None and stack:
+                parent = stack[-1]
+            parent_id = parent.span_id if parent is not None else None
+            now = time.perf_counter()
+            span = Span(name, next(self._ids), parent_id, thread_id,
+                        (now - self._epoch) * 1e6, rows_in=rows_in, attrs=attrs,
+                        _started=now, _cpu_started=time.thread_time(), _rss_started=_peak_rss_kb())
+            stack.append(span)
+        if self.profile_interval and self._sampler is None:
+            self._start_sampler()
+
+        try:
+            yield span
+        finally:
+            span.wall_ms = (time.perf_counter() - span._started) * 1000
+            span.cpu_ms = (time.thread_time() - span._cpu_started) * 1000
+            if span._rss_started is not None:
+                span.rss_peak_delta_kb = _peak_rss_kb() - span._rss_started
+            with self._lock:
+                stack.remove(span)
+                if not stack:
+                    self._open.pop(thread_id, None)
+                self.spans.append(span)
+            if self.on_close is not None:
+                self.on_close(span)
+
+    def current(self) -> Optional[Span]:
+        """Innermost open span of the calling thread"""
+        stack = self._open.get(threading.get_ident())
+        return stack[-1] if stack else None
+
+    def close(self) -> None:
+        """Stop the sampler (spans stay available for export)"""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=5)
+            self._sampler = None
+
+    def export_chrome_trace(self, path: Union[str, Path]) -> Path:
+        """Write closed spans as Chrome trace complete events (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        events = [{
+            "name": span.name,
+            "cat": "etl",
+            "ph": "X",
+            "ts": round(span.start_us, 1),
+            "dur": round(span.wall_ms * 1000, 1),
+            "pid": pid,
+            "tid": span.thread_id,
+            "args": {key: value for key, value in span.to_dict().items()
+                     if key not in ("span", "thread_id") and value is not None},
+        } for span in self.spans]
+        return _write_text(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"},
+                                            default=str))
+
+    def export_folded_stacks(self, path: Union[str, Path]) -> Path:
+        """Write sampled stacks in folded format (flamegraph.pl, speedscope)
+
+        Each line is span path;python frames with its sample count, so the
+        flame graph nests Python frames under the spans they ran in.
+        """
+        by_id = {span.span_id: span for span in self.spans}
+        folded = Counter()
+        for span in self.spans:
+            path_names = []
+            node = span
+            while node is not None:
+                path_names.append(node.name)
+                node = by_id.get(node.parent_id)
+            prefix = ';'.join(reversed(path_names))
+            for stack, count in span.samples.items():
+                folded[f"{prefix};{';'.join(stack)}"] += count
+        return _write_text(path, ''.join(f"{stack} {count}\n" for stack, count in folded.items()))
+
+    def _start_sampler(self) -> None:
+        with self._lock:
+            if self._sampler is not None:
+                return
+            self._sampler = threading.Thread(target=self._sample_loop, name="etl-span-sampler",
+                                             daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.profile_interval):
+            with self._lock:
+                innermost = {thread_id: stack[-1] for thread_id, stack in self._open.items() if stack}
+            if not innermost:
+                continue
+            frames = sys._current_frames()
+            for thread_id, span in innermost.items():
+                frame = frames.get(thread_id)
+                if frame is not None and thread_id != own_id:
+                    span.samples[_stack_of(frame)] += 1
+
+def _stack_of(frame) -> Tuple[str, ...]:
+    """Outermost-first 'function (file:line)' names for a frame's stack"""
+    names = []
+    while frame is not None and len(names) < SAMPLE_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+def _peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS, KiB on Linux
+
+def _write_text(path: Union[str, Path], text: str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return path
+
+def frame_rows(value: Any) -> Optional[int]:
+    """Row count of a DataFrame, or total rows of a dict of DataFrames"""
+    if hasattr(value, 'shape') and hasattr(value, 'columns'):
+        return len(value)
+    if isinstance(value, dict) and value and all(hasattr(v, 'columns') for v in value.values()):
+        return sum(len(v) for v in value.values())
+    return None
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator running a function inside run.span(name)
+
+    The run is the function's `run` argument (no span without one), and
+    the name may use arguments as format fields ("normalize_{source_name}").
+    rows_in is taken from the first DataFrame (or dict of frames)
+    argument, rows_out from the return value. A generator function's span
+    stays open until it is exhausted or closed (so it includes the
+    consumer's time between items), and rows_out sums the yielded frames.
+    """
+    def decorate(func: Callable) -> Callable:
+        span_name = name or func.__name__
+        signature = inspect.signature(func)
+
+        def open_span(args, kwargs):
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            run = arguments.get('run')
+            if run is None or not hasattr(run, 'span'):
+                return None
+
+            if '{' in span_name:
+                label = span_name.format(**arguments)
+            else:
+                label = span_name
+            rows_in = next((rows for rows in map(frame_rows, arguments.values()) if rows is not None),
+                           None)
+            return run.span(label, rows_in=rows_in)
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                context = open_span(args, kwargs)
+                if context is None:
+                    return (yield from func(*args, **kwargs))
+
+                items = func(*args, **kwargs)
+                with context as span:
+                    try:
+                        for item in items:
+                            rows = frame_rows(item)
+                            if rows is not None:
+                                span.rows_out = (span.rows_out or 0) + rows
+                            yield item
+                    finally:
+                        items.close()
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            context = open_span(args, kwargs)
+            if context is None:
+                return func(*args, **kwargs)
+
+            with context as span:
+                result = func(*args, **kwargs)
+                span.rows_out = frame_rows(result)
+                return result
+        return wrapper
+    return decorate
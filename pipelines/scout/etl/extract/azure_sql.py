@@ -1,42 +1,81 @@
 """
 Azure SQL Server data extraction for Scout ETL Pipeline
 """
+import time
 import pandas as pd
-import sqlalchemy as sa
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterator, List, Sequence, Tuple
 from ..common.config import cfg
+from ..common.connections import registry
 from ..common.log import ETLRun
-from ..common.io import clean_dataframe, infer_datatypes
+from ..common.tracing import traced
+from ..common.io import clean_dataframe, infer_datatypes, dataframe_chunks
+from ..common.state import StagedWatermarkStore, WatermarkStore
 
-def create_azure_connection() -> Optional[sa.engine.Engine]:
-    """Create Azure SQL connection"""
+if TYPE_CHECKING:  # sqlalchemy is imported when an engine is first needed
+    import sqlalchemy as sa
+
+# Watermark key for the sales extract
+SALES_SOURCE = "SalesInteractions"
+
+def create_azure_connection() -> Optional['sa.engine.Engine']:
+    """Get the shared, pooled Azure SQL engine"""
     if not cfg.validate_azure_config():
         print("⚠️ Azure SQL configuration not available")
         return None
 
     try:
-        # Build connection string
-        connection_string = (
-            f"mssql+pyodbc://{cfg.azure_sql_user}:{cfg.azure_sql_pass}@"
-            f"{cfg.azure_sql_url}?driver=ODBC+Driver+17+for+SQL+Server"
-        )
-
-        engine = sa.create_engine(connection_string)
-
-        # Test connection
-        with engine.connect() as conn:
-            conn.execute(sa.text("SELECT 1"))
-
-        print("✅ Azure SQL connection established")
-        return engine
+        return registry.get("azure_sql", _create_azure_engine,
+                            health_check=_ping_engine,
+                            closer=lambda engine: engine.dispose())
 
     except Exception as e:
         print(f"❌ Failed to connect to Azure SQL: {e}")
         return None
 
-def pull_sales_interactions(run: ETLRun) -> pd.DataFrame:
-    """Extract sales interactions from Azure SQL"""
-    start_time = pd.Timestamp.now()
+def _create_azure_engine() -> 'sa.engine.Engine':
+    """Build the pooled Azure SQL engine (once per process)"""
+    import sqlalchemy as sa
+
+    # Build connection string
+    connection_string = (
+        f"mssql+pyodbc://{cfg.azure_sql_user}:{cfg.azure_sql_pass}@"
+        f"{cfg.azure_sql_url}?driver=ODBC+Driver+17+for+SQL+Server"
+    )
+
+    engine = sa.create_engine(
+        connection_string,
+        pool_size=cfg.max_workers,
+        max_overflow=cfg.max_workers,
+        pool_pre_ping=True,
+        pool_recycle=1800
+    )
+
+    print("✅ Azure SQL connection established")
+    return engine
+
+def _ping_engine(engine: 'sa.engine.Engine') -> None:
+    """Health check for the Azure SQL engine"""
+    import sqlalchemy as sa
+
+    with engine.connect() as conn:
+        conn.execute(sa.text("SELECT 1"))
+
+@traced()
+def pull_sales_interactions(run: ETLRun, full_refresh: Optional[bool] = None,
+                            watermarks: Optional[WatermarkStore] = None) -> pd.DataFrame:
+    """Extract sales interactions from Azure SQL
+
+    Pulls only rows past the stored watermark (plus the late-arrival
+    overlap window); full_refresh (default cfg.full_refresh) re-reads the
+    whole lookback window and resets the watermark. With cfg.stream_extract
+    the rows are read through stream_sales_interactions and concatenated.
+
+    The new watermark goes to `watermarks`; by default that is a fresh
+    StagedWatermarkStore nobody commits, so a plain call never moves the
+    stored position. Pass a staged store and commit() it once the rows are
+    persisted, or a WatermarkStore to advance it right away.
+    """
+    watermarks = watermarks or StagedWatermarkStore()
 
     engine = create_azure_connection()
     if engine is None:
@@ -45,6 +84,11 @@ def pull_sales_interactions(run: ETLRun) -> pd.DataFrame:
                     note="Azure SQL not configured, using mock data")
         return _mock_sales_interactions()
 
+    if cfg.stream_extract:
+        return _collect_sales_stream(run, full_refresh, watermarks)
+
+    import sqlalchemy as sa
+
     try:
         query = """
         SELECT
@@ -66,11 +110,12 @@ def pull_sales_interactions(run: ETLRun) -> pd.DataFrame:
             CAST(TransactionDate AS VARCHAR) + ' ' +
             CAST(TransactionTime AS VARCHAR) as TransactionTimestamp
         FROM SalesInteractions
-        WHERE TransactionDate >= DATEADD(day, -90, GETDATE())
+        WHERE {window}
         ORDER BY TransactionDate DESC, TransactionTime DESC
         """
 
-        df = pd.read_sql(query, engine)
+        window, params, mode = _sales_window(run, full_refresh, watermarks)
+        df = pd.read_sql(sa.text(query.format(window=window)), engine, params=params)
 
         # Clean and process data
         df = clean_dataframe(df)
@@ -80,9 +125,11 @@ def pull_sales_interactions(run: ETLRun) -> pd.DataFrame:
         date_cols = ['TransactionDate', 'TransactionTimestamp']
         df = infer_datatypes(df, numeric_cols=numeric_cols, date_cols=date_cols)
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        _advance_watermark(watermarks, df, mode)
+
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("pull_sales_interactions", "success",
-                    duration_ms=duration_ms, rows=len(df))
+                    duration_ms=duration_ms, rows=len(df), mode=mode)
         run.log_metric("sales_interactions_extracted", len(df))
 
         return df
@@ -93,9 +140,225 @@ def pull_sales_interactions(run: ETLRun) -> pd.DataFrame:
         # Return mock data as fallback
         return _mock_sales_interactions()
 
+def _collect_sales_stream(run: ETLRun, full_refresh: Optional[bool],
+                         watermarks: WatermarkStore) -> pd.DataFrame:
+    """pull_sales_interactions via the chunked stream (which advances the watermark)"""
+    try:
+        chunks = list(stream_sales_interactions(run, full_refresh=full_refresh,
+                                                watermarks=watermarks))
+    except Exception as e:
+        run.log_error("pull_sales_interactions", str(e))
+        print(f"❌ Failed to extract sales interactions: {e}")
+        return _mock_sales_interactions()
+
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+# Column types for streamed SalesInteractions batches; anything else is a string
+SALES_NUMERIC_COLUMNS = ['Quantity', 'UnitPrice', 'TotalAmount', 'StoreID', 'DeviceID']
+SALES_DATETIME_COLUMNS = ['TransactionDate', 'TransactionTimestamp']
+
+@traced()
+def stream_sales_interactions(run: ETLRun, chunk_size: Optional[int] = None,
+                              full_refresh: Optional[bool] = None,
+                              watermarks: Optional[WatermarkStore] = None) -> Iterator[pd.DataFrame]:
+    """Extract sales interactions as typed chunks from a server-side cursor
+
+    Rows are fetched `chunk_size` at a time and each partition becomes a
+    typed DataFrame, so memory is bounded by the chunk rather than the
+    extract window. The timestamp is built as DATETIME in SQL instead of a
+    VARCHAR concatenation. Per-chunk rows/sec and bytes/sec are logged.
+    Uses the same watermark window and `watermarks` default as
+    pull_sales_interactions; the watermark is only set once the stream has
+    been fully consumed.
+    """
+    chunk_size = chunk_size or cfg.stream_chunk_size
+    watermarks = watermarks or StagedWatermarkStore()
+
+    engine = create_azure_connection()
+    if engine is None:
+        run.log_step("stream_sales_interactions", "skipped",
+                    note="Azure SQL not configured, using mock data")
+        yield from dataframe_chunks(_mock_sales_interactions(), chunk_size)
+        return
+
+    import sqlalchemy as sa
+
+    query = """
+    SELECT
+        InteractionID,
+        StoreID,
+        DeviceID,
+        ProductID,
+        CustomerID,
+        TransactionDate,
+        TransactionTime,
+        Quantity,
+        UnitPrice,
+        TotalAmount,
+        PaymentMethod,
+        Category,
+        Brand,
+        ProductName,
+        SKU,
+        CAST(TransactionDate AS DATETIME) +
+        CAST(TransactionTime AS DATETIME) as TransactionTimestamp
+    FROM SalesInteractions
+    WHERE {window}
+    ORDER BY TransactionDate, TransactionTime
+    """
+
+    total_rows = 0
+    total_bytes = 0
+    chunk_index = 0
+    latest = None
+
+    try:
+        window, params, mode = _sales_window(run, full_refresh, watermarks)
+
+        with engine.connect() as conn:
+            # yield_per streams rows from the server cursor in fixed partitions
+            result = (conn.execution_options(yield_per=chunk_size)
+                      .execute(sa.text(query.format(window=window)), params))
+            columns = list(result.keys())
+
+            fetch_start = time.perf_counter()
+            for rows in result.partitions():
+                df = _rows_to_frame(rows, columns)
+                elapsed = max(time.perf_counter() - fetch_start, 1e-9)
+
+                chunk_bytes = int(df.memory_usage(deep=True).sum())
+                total_rows += len(df)
+                total_bytes += chunk_bytes
+                run.log_step("stream_sales_interactions_chunk", "success",
+                            duration_ms=int(elapsed * 1000),
+                            chunk=chunk_index,
+                            rows=len(df),
+                            rows_per_sec=int(len(df) / elapsed),
+                            bytes_per_sec=int(chunk_bytes / elapsed))
+                chunk_index += 1
+                latest = _latest_position(df, latest)
+
+                yield df
+                fetch_start = time.perf_counter()
+
+    except Exception as e:
+        run.log_error("stream_sales_interactions", str(e), chunks_completed=chunk_index)
+        if chunk_index > 0:
+            # Partial results were already handed downstream; don't mix in mock data
+            raise
+        print(f"❌ Failed to stream sales interactions: {e}")
+        yield from dataframe_chunks(_mock_sales_interactions(), chunk_size)
+        return
+
+    if latest is not None:
+        watermarks.set(SALES_SOURCE, latest[0], latest[1], rows_extracted=total_rows)
+    elif mode == "full_refresh":
+        watermarks.reset(SALES_SOURCE)
+
+    duration_ms = run.current_span().elapsed_ms
+    duration_s = duration_ms / 1000
+    run.log_step("stream_sales_interactions", "success",
+                duration_ms=duration_ms,
+                rows=total_rows, chunks=chunk_index, mode=mode)
+    run.log_metric("sales_interactions_extracted", total_rows)
+    if duration_s > 0:
+        run.log_metric("sales_interactions_rows_per_sec", int(total_rows / duration_s))
+        run.log_metric("sales_interactions_bytes_per_sec", int(total_bytes / duration_s))
+
+def _sales_window(run: ETLRun, full_refresh: Optional[bool],
+                  watermarks: WatermarkStore) -> Tuple[str, Dict[str, Any], str]:
+    """Build the SalesInteractions WHERE clause from the stored watermark
+
+    Returns (where_clause, bind_params, mode) where mode is one of
+    'full_refresh', 'initial' or 'incremental'.
+    """
+    if full_refresh is None:
+        full_refresh = cfg.full_refresh
+
+    watermark = None if full_refresh else watermarks.get(SALES_SOURCE)
+    if watermark is None:
+        mode = "full_refresh" if full_refresh else "initial"
+        run.log_metric("sales_interactions_extract_mode", mode)
+        return ("TransactionDate >= DATEADD(day, -:lookback_days, GETDATE())",
+                {"lookback_days": cfg.extract_lookback_days}, mode)
+
+    watermark_date = pd.Timestamp(watermark["transaction_date"])
+    run.log_metric("sales_interactions_extract_mode", "incremental")
+    run.log_metric("sales_interactions_watermark", watermark["transaction_date"])
+
+    if cfg.watermark_overlap_days > 0:
+        # Re-read the overlap window to pick up late-arriving rows. Re-read rows
+        # come back as-is: stage layers are replaced per run, and incremental
+        # customer segments skip interaction_ids they already merged
+        since = (watermark_date - pd.Timedelta(days=cfg.watermark_overlap_days)).date()
+        return "TransactionDate >= :since", {"since": since}, "incremental"
+
+    # No overlap: strict keyset continuation on (TransactionDate, InteractionID)
+    return ("(TransactionDate > :watermark_date OR "
+            "(TransactionDate = :watermark_date AND InteractionID > :watermark_id))",
+            {"watermark_date": watermark_date.date(),
+             "watermark_id": watermark["interaction_id"] or ""}, "incremental")
+
+def _latest_position(df: pd.DataFrame, latest: Optional[Tuple[Any, Any]] = None) -> Optional[Tuple[Any, Any]]:
+    """Highest (TransactionDate, InteractionID) in df, merged with a previous maximum"""
+    if df.empty or 'TransactionDate' not in df.columns:
+        return latest
+
+    dates = pd.to_datetime(df['TransactionDate'], errors='coerce')
+    max_date = dates.max()
+    if pd.isna(max_date):
+        return latest
+
+    max_id = None
+    if 'InteractionID' in df.columns:
+        max_id = _max_interaction_id(df.loc[dates == max_date, 'InteractionID'].dropna())
+    candidate = (max_date.date(), max_id)
+
+    if latest is None or candidate[0] > latest[0]:
+        return candidate
+    if (candidate[0] == latest[0] and candidate[1] is not None
+            and (latest[1] is None or candidate[1] > latest[1])):
+        return candidate
+    return latest
+
+def _max_interaction_id(ids: pd.Series) -> Any:
+    """Highest ID in the column's own type, as the keyset query compares them
+
+    Numeric IDs compare as numbers (so 10 > 9, and whole floats left by
+    NULLs come back as ints); string IDs compare as strings, like VARCHAR.
+    """
+    if ids.empty:
+        return None
+    if pd.api.types.is_numeric_dtype(ids.dtype):
+        value = ids.max().item()
+        return int(value) if float(value).is_integer() else value
+    return ids.astype(str).max()
+
+def _advance_watermark(watermarks: WatermarkStore, df: pd.DataFrame, mode: str) -> None:
+    """Persist the new watermark after a successful extract"""
+    latest = _latest_position(df)
+    if latest is not None:
+        watermarks.set(SALES_SOURCE, latest[0], latest[1], rows_extracted=len(df))
+    elif mode == "full_refresh":
+        watermarks.reset(SALES_SOURCE)
+
+def _rows_to_frame(rows: Sequence[Sequence[Any]], columns: List[str]) -> pd.DataFrame:
+    """Build a typed DataFrame from one fetched row partition"""
+    # coerce_float turns DECIMAL/MONEY values (Decimal) into floats while building
+    df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    for name in df.columns.intersection(SALES_NUMERIC_COLUMNS):
+        df[name] = pd.to_numeric(df[name], errors='coerce')
+    for name in df.columns.intersection(SALES_DATETIME_COLUMNS):
+        df[name] = pd.to_datetime(df[name], errors='coerce')
+
+    # Only the string columns are object dtype, so cleaning touches nothing else
+    return clean_dataframe(df)
+
+@traced()
 def pull_stores(run: ETLRun) -> pd.DataFrame:
     """Extract store information from Azure SQL"""
-    start_time = pd.Timestamp.now()
 
     engine = create_azure_connection()
     if engine is None:
@@ -133,7 +396,7 @@ def pull_stores(run: ETLRun) -> pd.DataFrame:
         date_cols = ['OpenDate']
         df = infer_datatypes(df, numeric_cols=numeric_cols, date_cols=date_cols)
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("pull_stores", "success",
                     duration_ms=duration_ms, rows=len(df))
         run.log_metric("stores_extracted", len(df))
@@ -3,16 +3,16 @@ Google Drive JSON/CSV data extraction for Scout ETL Pipeline
 """
 import pandas as pd
 import json
-import requests
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from ..common.config import cfg
 from ..common.log import ETLRun
+from ..common.tracing import traced
 from ..common.io import read_csv, read_json, clean_dataframe, normalize_columns
 
+@traced()
 def pull_devices(run: ETLRun) -> pd.DataFrame:
     """Extract device information from Google Drive"""
-    start_time = pd.Timestamp.now()
 
     if not cfg.gdrive_folder_id:
         run.log_step("pull_devices", "skipped",
@@ -33,7 +33,7 @@ def pull_devices(run: ETLRun) -> pd.DataFrame:
         devices_df = clean_dataframe(devices_df)
         devices_df = normalize_columns(devices_df)
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("pull_devices", "success",
                     duration_ms=duration_ms, rows=len(devices_df))
         run.log_metric("devices_extracted", len(devices_df))
@@ -45,9 +45,9 @@ def pull_devices(run: ETLRun) -> pd.DataFrame:
         print(f"❌ Failed to extract devices from Google Drive: {e}")
         return _mock_devices()
 
+@traced()
 def pull_campaign_data(run: ETLRun) -> pd.DataFrame:
     """Extract campaign effectiveness data from Google Drive"""
-    start_time = pd.Timestamp.now()
 
     try:
         # Look for campaign files in the configured folder
@@ -62,7 +62,7 @@ def pull_campaign_data(run: ETLRun) -> pd.DataFrame:
         campaign_df = clean_dataframe(campaign_df)
         campaign_df = normalize_columns(campaign_df)
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("pull_campaign_data", "success",
                     duration_ms=duration_ms, rows=len(campaign_df))
         run.log_metric("campaign_data_extracted", len(campaign_df))
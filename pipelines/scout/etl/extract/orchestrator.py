@@ -0,0 +1,204 @@
+"""
+Extract orchestration for Scout ETL Pipeline
+Run independent source extracts concurrently and collect one raw_data dict
+"""
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Any, List, Optional
+from ..common.config import cfg
+from ..common.log import ETLRun
+from ..common.state import StagedWatermarkStore
+from ..common.tracing import traced
+from ..transform.bronze_normalize import to_bronze
+from .azure_sql import pull_sales_interactions, pull_stores
+from .gdrive_json import pull_devices, pull_campaign_data
+
+@dataclass
+class ExtractSource:
+    """One extract to run: `extract(run)` must return a DataFrame
+
+    on_success runs as soon as the extract is accepted; on_persisted only
+    once its data has been persisted downstream (see commit_extracts).
+    """
+    name: str
+    extract: Callable[[ETLRun], pd.DataFrame]
+    timeout: Optional[float] = None
+    required: bool = False
+    on_success: Optional[Callable[[], None]] = None
+    on_persisted: Optional[Callable[[], None]] = None
+
+class ExtractTimeout(TimeoutError):
+    """A required source did not finish within its timeout"""
+
+def default_extract_sources(full_refresh: Optional[bool] = None,
+                            reference_tables: Optional[List[str]] = None,
+                            watermarks: Optional[StagedWatermarkStore] = None) -> List[ExtractSource]:
+    """Sales, stores, devices and campaigns, plus optional Supabase reference tables
+
+    The sales watermark is staged and only committed through
+    commit_extracts, once the pulled rows have been persisted, so a
+    timed-out pull or a failed bronze step never advances it.
+    """
+    watermarks = watermarks or StagedWatermarkStore()
+    sources = [
+        ExtractSource("sales",
+                      partial(pull_sales_interactions, full_refresh=full_refresh,
+                              watermarks=watermarks),
+                      required=True, on_persisted=watermarks.commit),
+        ExtractSource("stores", pull_stores),
+        ExtractSource("devices", pull_devices),
+        ExtractSource("campaigns", pull_campaign_data),
+    ]
+
+    if reference_tables:
+        # Imported lazily: the Supabase client is only needed for reference pulls
+        from .supabase_rest import pull_reference_data
+        for table in reference_tables:
+            sources.append(ExtractSource(table, partial(pull_reference_data, table_name=table)))
+
+    return sources
+
+@traced("extract_sources")
+def run_extracts(run: ETLRun, sources: Optional[List[ExtractSource]] = None,
+                 max_workers: Optional[int] = None,
+                 timeout: Optional[float] = None) -> Dict[str, pd.DataFrame]:
+    """Run extract sources concurrently and return {name: DataFrame}
+
+    Each source gets its own timeout (source.timeout, else `timeout`, else
+    cfg.extract_timeout) counted from when it starts running. Timed-out or
+    failed sources are logged and left out of the result; if a required
+    source is lost, queued sources are cancelled and ExtractTimeout or the
+    original exception is raised. Running threads cannot be interrupted, so
+    a timed-out extract is abandoned and its result discarded.
+    """
+    sources = sources if sources is not None else default_extract_sources()
+    max_workers = max_workers or cfg.max_workers
+    default_timeout = timeout if timeout is not None else cfg.extract_timeout
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    started_at: Dict[str, float] = {}
+    timings: Dict[str, Dict[str, Any]] = {}
+    raw_data: Dict[str, pd.DataFrame] = {}
+
+    parent = run.current_span()
+
+    def _run_source(source: ExtractSource) -> pd.DataFrame:
+        started_at[source.name] = time.monotonic()
+        try:
+            # Worker threads have no open span; nest under this call's span explicitly
+            with run.span(f"extract_{source.name}", parent=parent) as span:
+                df = source.extract(run)
+                span.rows_out = len(df)
+                return df
+        finally:
+            timings[source.name] = {"wall_ms": int(span.wall_ms), "cpu_ms": int(span.cpu_ms)}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract")
+    futures: Dict[Future, ExtractSource] = {executor.submit(_run_source, s): s for s in sources}
+    pending = set(futures)
+    timed_out: List[str] = []
+    failed: List[str] = []
+
+    try:
+        while pending:
+            # Expire sources that have run past their deadline
+            now = time.monotonic()
+            deadlines = []
+            for future in list(pending):
+                source = futures[future]
+                if source.name not in started_at:
+                    continue
+                deadline = started_at[source.name] + (source.timeout or default_timeout)
+                if now < deadline:
+                    deadlines.append(deadline)
+                    continue
+
+                pending.discard(future)
+                future.cancel()
+                timed_out.append(source.name)
+                run.log_error(f"extract_{source.name}", "Extract timed out",
+                              timeout_seconds=source.timeout or default_timeout)
+                print(f"⚠️ Extract '{source.name}' timed out, discarding its result")
+                if source.required:
+                    raise ExtractTimeout(f"Required extract '{source.name}' timed out")
+
+            if not pending:
+                break
+
+            # Wake up at the next deadline (or periodically, for queued sources)
+            wait_seconds = min(deadlines) - now if deadlines else 1.0
+            done, _ = wait(pending, timeout=max(0.0, min(wait_seconds, 1.0)),
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.discard(future)
+                source = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    failed.append(source.name)
+                    run.log_error(f"extract_{source.name}", str(e))
+                    print(f"❌ Extract '{source.name}' failed: {e}")
+                    if source.required:
+                        raise
+                    continue
+
+                raw_data[source.name] = df
+                if source.on_success is not None:
+                    source.on_success()
+                run.log_step(f"extract_{source.name}", "success",
+                             duration_ms=timings[source.name]["wall_ms"],
+                             cpu_ms=timings[source.name]["cpu_ms"], rows=len(df))
+    finally:
+        # Drop queued work and stop waiting on abandoned threads
+        executor.shutdown(wait=False, cancel_futures=True)
+        _log_extract_timing(run, wall_start, cpu_start, timings, raw_data, timed_out, failed)
+
+    return raw_data
+
+def commit_extracts(sources: List[ExtractSource], raw_data: Dict[str, pd.DataFrame]) -> None:
+    """Run on_persisted for every source in raw_data; call once its data is safely stored"""
+    for source in sources:
+        if source.name in raw_data and source.on_persisted is not None:
+            source.on_persisted()
+
+def _log_extract_timing(run: ETLRun, wall_start: float, cpu_start: float,
+                        timings: Dict[str, Dict[str, Any]], raw_data: Dict[str, pd.DataFrame],
+                        timed_out: List[str], failed: List[str]) -> None:
+    """Record the wall-clock vs summed per-source time breakdown"""
+    wall_ms = int((time.perf_counter() - wall_start) * 1000)
+    source_wall_ms = sum(t["wall_ms"] for t in timings.values())
+    source_cpu_ms = sum(t["cpu_ms"] for t in timings.values())
+    speedup = round(source_wall_ms / wall_ms, 2) if wall_ms > 0 else None
+
+    status = "success" if not (timed_out or failed) else "partial"
+    run.log_step("extract_sources", status, duration_ms=wall_ms,
+                 sources=sorted(raw_data), timed_out=timed_out, failed=failed,
+                 source_wall_ms=source_wall_ms, source_cpu_ms=source_cpu_ms,
+                 process_cpu_ms=int((time.process_time() - cpu_start) * 1000),
+                 parallel_speedup=speedup)
+    run.log_metric("extract_timing", {
+        "wall_ms": wall_ms,
+        "source_wall_ms": source_wall_ms,
+        "source_cpu_ms": source_cpu_ms,
+        "parallel_speedup": speedup,
+        "sources": dict(timings),
+    })
+
+def extract_to_bronze(run: ETLRun, sources: Optional[List[ExtractSource]] = None,
+                      max_workers: Optional[int] = None,
+                      timeout: Optional[float] = None) -> Dict[str, pd.DataFrame]:
+    """Run all extracts concurrently and normalize the result to bronze
+
+    Watermarks are committed once bronze normalization succeeds; callers
+    that persist bronze should use run_extracts and commit_extracts instead.
+    """
+    sources = sources if sources is not None else default_extract_sources()
+    raw_data = run_extracts(run, sources, max_workers=max_workers, timeout=timeout)
+    bronze = to_bronze(raw_data, run)
+    commit_extracts(sources, raw_data)
+    return bronze
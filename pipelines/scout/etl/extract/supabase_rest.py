@@ -3,38 +3,61 @@ Supabase REST API data extraction for Scout ETL Pipeline
 Used for reference data and incremental loads
 """
 import pandas as pd
-import requests
-from typing import Optional, Dict, Any, List
-from supabase import create_client, Client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Iterator
 from ..common.config import cfg
+from ..common.connections import registry
 from ..common.log import ETLRun
+from ..common.tracing import traced
 from ..common.io import clean_dataframe
 
-def create_supabase_client(use_service_role: bool = False) -> Optional[Client]:
-    """Create Supabase client for data extraction"""
+if TYPE_CHECKING:  # supabase is imported when a client is first needed
+    from supabase import Client
+
+def create_supabase_client(use_service_role: bool = False) -> Optional['Client']:
+    """Get the shared Supabase client for the requested role"""
     if not cfg.validate_supabase_config(require_service_role=use_service_role):
         print("⚠️ Supabase configuration not available")
         return None
 
-    try:
+    role = 'service' if use_service_role else 'anon'
+
+    def _create_client() -> 'Client':
+        from supabase import create_client
+
         if use_service_role and cfg.supabase_service_role:
             supabase = create_client(cfg.supabase_url, cfg.supabase_service_role)
         else:
             supabase = create_client(cfg.supabase_url, cfg.supabase_anon_key)
 
-        # Test connection
-        result = supabase.table('scout_gold_transactions_flat').select('count', count='exact').limit(1).execute()
-
-        print(f"✅ Supabase connection established ({'service' if use_service_role else 'anon'} role)")
+        print(f"✅ Supabase connection established ({role} role)")
         return supabase
 
+    try:
+        return registry.get(f"supabase_{role}", _create_client,
+                            health_check=_ping_supabase)
+
     except Exception as e:
         print(f"❌ Failed to connect to Supabase: {e}")
         return None
 
-def pull_reference_data(run: ETLRun, table_name: str) -> pd.DataFrame:
-    """Extract reference data from Supabase"""
-    start_time = pd.Timestamp.now()
+def _ping_supabase(supabase: 'Client') -> None:
+    """Health check for a Supabase client (single-row read, no exact count)"""
+    supabase.table('scout_gold_transactions_flat').select('transaction_id').limit(1).execute()
+
+@traced("pull_reference_{table_name}")
+def pull_reference_data(run: ETLRun, table_name: str,
+                        columns: Optional[List[str]] = None,
+                        order_by: Optional[str] = None,
+                        page_size: Optional[int] = None,
+                        max_workers: Optional[int] = None,
+                        pagination: str = "range") -> pd.DataFrame:
+    """Extract reference data from Supabase
+
+    Reads the table page by page (see iter_reference_pages) so PostgREST
+    row limits can't silently truncate it; `columns` projects the select.
+    """
 
     supabase = create_supabase_client()
     if supabase is None:
@@ -43,16 +66,16 @@ def pull_reference_data(run: ETLRun, table_name: str) -> pd.DataFrame:
         return pd.DataFrame()
 
     try:
-        # Query the table
-        result = supabase.table(table_name).select('*').execute()
+        pages = list(_iter_pages(supabase, table_name, columns, order_by,
+                                 page_size, max_workers, pagination))
 
-        if result.data:
-            df = pd.DataFrame(result.data)
+        if pages:
+            df = pd.concat(pages, ignore_index=True) if len(pages) > 1 else pages[0]
             df = clean_dataframe(df)
 
-            duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+            duration_ms = run.current_span().elapsed_ms
             run.log_step(f"pull_reference_{table_name}", "success",
-                        duration_ms=duration_ms, rows=len(df))
+                        duration_ms=duration_ms, rows=len(df), pages=len(pages))
             run.log_metric(f"{table_name}_extracted", len(df))
 
             return df
@@ -66,9 +89,186 @@ def pull_reference_data(run: ETLRun, table_name: str) -> pd.DataFrame:
         print(f"❌ Failed to extract {table_name}: {e}")
         return pd.DataFrame()
 
+@traced("pull_reference_{table_name}")
+def iter_reference_pages(run: ETLRun, table_name: str,
+                         columns: Optional[List[str]] = None,
+                         order_by: Optional[str] = None,
+                         page_size: Optional[int] = None,
+                         max_workers: Optional[int] = None,
+                         pagination: str = "range") -> Iterator[pd.DataFrame]:
+    """Stream a Supabase table as one DataFrame per page
+
+    pagination="range" counts the table once, then fetches row ranges
+    concurrently (bounded by max_workers) and yields them in order.
+    pagination="keyset" walks the order keys sequentially with no count
+    query, which is cheaper for very deep tables. Either way pages are
+    sorted on `order_by` followed by the table's primary key (see
+    _order_keys), so rows with equal order_by values are never skipped or
+    read twice. A table with neither is read in a single request.
+    """
+    supabase = create_supabase_client()
+    if supabase is None:
+        run.log_step(f"pull_reference_{table_name}", "skipped",
+                    note="Supabase not configured")
+        return
+
+    rows = 0
+    pages = 0
+    for page in _iter_pages(supabase, table_name, columns, order_by,
+                            page_size, max_workers, pagination):
+        rows += len(page)
+        pages += 1
+        yield clean_dataframe(page)
+
+    duration_ms = run.current_span().elapsed_ms
+    run.log_step(f"pull_reference_{table_name}", "success",
+                duration_ms=duration_ms, rows=rows, pages=pages)
+    run.log_metric(f"{table_name}_extracted", rows)
+
+def _iter_pages(supabase: 'Client', table_name: str,
+                columns: Optional[List[str]],
+                order_by: Optional[str],
+                page_size: Optional[int],
+                max_workers: Optional[int],
+                pagination: str) -> Iterator[pd.DataFrame]:
+    """Yield raw pages of a table in order"""
+    select = ','.join(columns) if columns else '*'
+    page_size = page_size or cfg.reference_page_size
+    max_workers = max_workers or cfg.max_workers
+
+    keys = _order_keys(table_name, order_by)
+    if not keys:
+        # Offsets or cursors without a unique sort could skip or repeat rows
+        print(f"⚠️ No primary_key or order_by known for {table_name}; reading it in one "
+              f"unpaged request (the server's max-rows limit may truncate it)")
+        result = supabase.table(table_name).select(select).execute()
+        if result.data:
+            yield pd.DataFrame(result.data)
+        return
+
+    if pagination == "keyset":
+        yield from _iter_keyset_pages(supabase, table_name, select, keys, page_size)
+        return
+
+    def fetch(start: int, end: int, count: Optional[str] = None):
+        query = supabase.table(table_name).select(select, count=count)
+        for key in keys:
+            query = query.order(key)
+        return query.range(start, end).execute()
+
+    # First page also returns the row count used to plan the remaining ranges
+    first = fetch(0, page_size - 1, count='exact')
+    if not first.data:
+        return
+    yield pd.DataFrame(first.data)
+
+    # The server may cap page size below what we asked for (PostgREST max-rows)
+    total = first.count or 0
+    if total <= len(first.data):
+        return
+    page_size = len(first.data)
+    starts = iter(range(page_size, total, page_size))
+
+    next_start = page_size
+    last_len = page_size
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Bounded window of in-flight requests; pages are yielded in order
+        pending = deque()
+
+        def submit_next():
+            start = next(starts, None)
+            if start is not None:
+                pending.append(executor.submit(fetch, start, start + page_size - 1))
+
+        for _ in range(max_workers * 2):
+            submit_next()
+
+        while pending:
+            result = pending.popleft().result()
+            submit_next()
+
+            last_len = len(result.data)
+            next_start += last_len
+            if result.data:
+                yield pd.DataFrame(result.data)
+
+    # Rows inserted after the count was taken: keep reading until a short page
+    while last_len >= page_size:
+        result = fetch(next_start, next_start + page_size - 1)
+        last_len = len(result.data)
+        next_start += last_len
+        if result.data:
+            yield pd.DataFrame(result.data)
+
+def _order_keys(table_name: str, order_by: Optional[str]) -> List[str]:
+    """Sort keys for paging: order_by (or the configured one), then the primary key
+
+    Offsets and keyset cursors are only stable on a unique sort, so the
+    primary key is always appended as a tiebreaker. Without a configured
+    primary key, order_by must itself name a unique column. Empty when
+    neither is known (the table is then read unpaged).
+    """
+    table_config = cfg.get_table_config(table_name) or {}
+    primary_key = table_config.get('primary_key') or []
+    if isinstance(primary_key, str):
+        primary_key = [primary_key]
+
+    order_by = order_by or table_config.get('order_by')
+    keys = [key.strip() for key in order_by.split(',')] if order_by else []
+    return keys + [key for key in primary_key if key not in keys]
+
+def _iter_keyset_pages(supabase: 'Client', table_name: str, select: str,
+                       keys: List[str], page_size: int) -> Iterator[pd.DataFrame]:
+    """Yield pages by walking the order keys sequentially (no count, no offsets)"""
+    if select != '*':
+        selected = select.split(',')
+        select = ','.join(selected + [key for key in keys if key not in selected])
+
+    last = None
+    while True:
+        query = supabase.table(table_name).select(select)
+        for key in keys:
+            query = query.order(key)
+        if last is not None:
+            query = _after(query, keys, last)
+        result = query.limit(page_size).execute()
+
+        if not result.data:
+            return
+        page = pd.DataFrame(result.data)
+        # A repeated key would be skipped at a page boundary
+        if page.duplicated(subset=keys).any():
+            raise ValueError(f"Order keys {keys} of {table_name} are not unique; "
+                             f"pass an order_by that is")
+        yield page
+
+        last = [result.data[-1][key] for key in keys]
+        if any(value is None for value in last):
+            raise ValueError(f"Order keys {keys} of {table_name} contain nulls")
+        if len(result.data) < page_size:
+            return
+
+def _after(query, keys: List[str], values: List[Any]):
+    """Filter a query to rows sorting strictly after values on keys"""
+    if len(keys) == 1:
+        return query.gt(keys[0], values[0])
+
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+    terms = []
+    for i, key in enumerate(keys):
+        conditions = [f"{k}.eq.{_quote(v)}" for k, v in zip(keys[:i], values[:i])]
+        conditions.append(f"{key}.gt.{_quote(values[i])}")
+        terms.append(conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})")
+    return query.or_(','.join(terms))
+
+def _quote(value: Any) -> str:
+    """PostgREST filter value, double-quoted so commas and parentheses are literal"""
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+@traced()
 def pull_existing_transactions(run: ETLRun, limit: int = 10000) -> pd.DataFrame:
     """Pull existing transactions for incremental processing"""
-    start_time = pd.Timestamp.now()
 
     supabase = create_supabase_client()
     if supabase is None:
@@ -88,7 +288,7 @@ def pull_existing_transactions(run: ETLRun, limit: int = 10000) -> pd.DataFrame:
             df = pd.DataFrame(result.data)
             df = clean_dataframe(df)
 
-            duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+            duration_ms = run.current_span().elapsed_ms
             run.log_step("pull_existing_transactions", "success",
                         duration_ms=duration_ms, rows=len(df))
             run.log_metric("existing_transactions_extracted", len(df))
@@ -104,9 +304,26 @@ def pull_existing_transactions(run: ETLRun, limit: int = 10000) -> pd.DataFrame:
         print(f"❌ Failed to extract existing transactions: {e}")
         return pd.DataFrame()
 
-def check_data_freshness(run: ETLRun) -> Dict[str, Any]:
-    """Check the freshness of data in Supabase tables"""
-    supabase = create_supabase_client()
+# Tables covered by the default freshness check
+FRESHNESS_TABLES = [
+    'scout_gold_transactions_flat',
+    'scout_silver_transactions',
+    'scout_bronze_sales_interactions'
+]
+
+def check_data_freshness(run: ETLRun, tables: Optional[List[str]] = None,
+                         exact_counts: bool = False,
+                         timestamp_column: str = 'transactiondate') -> Dict[str, Any]:
+    """Check the freshness of data in Supabase tables
+
+    Uses the etl_table_freshness RPC (migration 057): one round trip for all
+    tables, with row counts estimated from pg stats unless exact_counts is
+    set. Falls back to per-table queries when the function isn't deployed.
+    """
+    tables = tables or FRESHNESS_TABLES
+
+    supabase = create_supabase_client(use_service_role=True) if cfg.supabase_service_role else None
+    supabase = supabase or create_supabase_client()
     if supabase is None:
         return {"status": "unavailable", "tables": {}}
 
@@ -116,27 +333,54 @@ def check_data_freshness(run: ETLRun) -> Dict[str, Any]:
         "checked_at": pd.Timestamp.now().isoformat()
     }
 
-    tables_to_check = [
-        'scout_gold_transactions_flat',
-        'scout_silver_transactions',
-        'scout_bronze_sales_interactions'
-    ]
+    try:
+        result = supabase.rpc('etl_table_freshness', {
+            'p_tables': tables,
+            'p_timestamp_column': timestamp_column,
+            'p_exact_counts': exact_counts
+        }).execute()
+    except Exception as e:
+        print(f"⚠️ etl_table_freshness RPC unavailable, checking tables one by one: {e}")
+        return _check_data_freshness_per_table(run, supabase, tables, timestamp_column,
+                                               exact_counts, freshness_info)
+
+    for row in result.data or []:
+        table = row['table_name']
+        if row['status'] == 'ok':
+            freshness_info["tables"][table] = {
+                "latest_date": row['latest_ts'],
+                "total_records": row['row_count'] or 0,
+                "count_is_estimate": row['count_is_estimate'],
+                "total_bytes": row['total_bytes'],
+                "status": "ok"
+            }
+        else:
+            freshness_info["tables"][table] = {"status": row['status']}
+
+        run.log_metric(f"{table}_freshness_check", "completed")
+
+    return freshness_info
 
-    for table in tables_to_check:
+def _check_data_freshness_per_table(run: ETLRun, supabase: 'Client', tables: List[str],
+                                    timestamp_column: str, exact_counts: bool,
+                                    freshness_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-table freshness queries (two round trips per table)"""
+    for table in tables:
         try:
             # Get latest record timestamp
             result = (supabase.table(table)
-                     .select('transactiondate')
-                     .order('transactiondate', desc=True)
+                     .select(timestamp_column)
+                     .order(timestamp_column, desc=True)
                      .limit(1)
                      .execute())
 
             if result.data and result.data[0]:
-                latest_date = result.data[0].get('transactiondate')
+                latest_date = result.data[0].get(timestamp_column)
 
                 # Get total count
+                count_mode = 'exact' if exact_counts else 'estimated'
                 count_result = (supabase.table(table)
-                               .select('count', count='exact')
+                               .select('count', count=count_mode)
                                .execute())
 
                 total_count = count_result.count if count_result.count else 0
@@ -144,6 +388,7 @@ def check_data_freshness(run: ETLRun) -> Dict[str, Any]:
                 freshness_info["tables"][table] = {
                     "latest_date": latest_date,
                     "total_records": total_count,
+                    "count_is_estimate": not exact_counts,
                     "status": "ok"
                 }
             else:
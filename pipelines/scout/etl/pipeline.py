@@ -0,0 +1,116 @@
+"""
+Resumable runner for Scout ETL Pipeline
+Extract -> bronze -> silver -> gold, persisting every layer as Parquet
+
+Usage (from pipelines/scout):
+    python -m etl.pipeline            # resume an unfinished run if there is one
+    python -m etl.pipeline --fresh    # recompute every layer
+"""
+import argparse
+import pandas as pd
+from typing import Dict, List, Optional
+from .common.config import cfg
+from .common.log import ETLRun, log_run
+from .common.stage_cache import StageCache
+from .common.stage_store import StageStore
+from .common.tracing import traced
+from .extract.orchestrator import (
+    ExtractSource, commit_extracts, default_extract_sources, run_extracts
+)
+from .transform.bronze_normalize import to_bronze
+from .transform.customer_segments import update_customer_segments
+from .transform.silver_conform import to_silver
+from .transform.silver_enrich import (
+    enrich_interactions, create_customer_segments, STORE_LOOKUP_COLUMNS, DEVICE_LOOKUP_COLUMNS
+)
+
+@traced("pipeline")
+def run_pipeline(run: ETLRun, resume: bool = True,
+                 store: Optional[StageStore] = None,
+                 sources: Optional[List[ExtractSource]] = None,
+                 cache: Optional[StageCache] = None) -> Dict[str, pd.DataFrame]:
+    """Run the pipeline, reusing layers persisted by an unfinished previous run
+
+    Each layer is written to the stage store as soon as it is built, so a
+    failure in enrichment resumes from silver instead of re-extracting.
+    Transform stages go through the stage cache, so a rerun over unchanged
+    inputs skips them. Returns the gold tables.
+    """
+    store = store or StageStore()
+    cache = cache or StageCache()
+    reused = store.begin_pipeline(run.run_id, resume)
+    if reused:
+        run.log_step("pipeline_resume", "success", reused_layers=reused)
+
+    try:
+        if 'gold' in reused:
+            gold = store.read_layer('gold', run=run)
+        else:
+            silver = _silver_layer(run, store, cache, reused, sources)
+            enriched = cache.run_stage(run, "enrich_interactions", enrich_interactions,
+                                       {"silver_data": silver})
+            gold = {
+                'interactions_enriched': enriched,
+                'customer_segments': _customer_segments(run, cache, enriched),
+            }
+            store.write_layer('gold', gold, run)
+            store.mark_complete('gold')
+
+        store.finish_pipeline()
+        return gold
+
+    except Exception as e:
+        run.log_error("pipeline", str(e), completed_layers=store.completed_layers())
+        raise
+
+def _silver_layer(run: ETLRun, store: StageStore, cache: StageCache, reused: List[str],
+                  sources: Optional[List[ExtractSource]]) -> Dict[str, pd.DataFrame]:
+    """Silver tables needed for enrichment, built or read back from Parquet"""
+    if 'silver' in reused:
+        # Enrichment passes interactions through whole but only uses the lookup columns
+        return store.read_layer('silver', tables=['interactions', 'stores', 'devices'],
+                                columns={'stores': STORE_LOOKUP_COLUMNS,
+                                         'devices': DEVICE_LOOKUP_COLUMNS},
+                                run=run)
+
+    if 'bronze' in reused:
+        bronze = store.read_layer('bronze', run=run)
+    else:
+        sources = sources if sources is not None else default_extract_sources()
+        raw_data = run_extracts(run, sources)
+        bronze = cache.run_stage(run, "to_bronze", to_bronze, {"raw_data": raw_data})
+        store.write_layer('bronze', bronze, run)
+        store.mark_complete('bronze')
+        # Watermarks only advance once the rows they cover are persisted
+        commit_extracts(sources, raw_data)
+
+    silver = cache.run_stage(run, "to_silver", to_silver, {"bronze_data": bronze})
+    store.write_layer('silver', silver, run)
+    store.mark_complete('silver')
+    return silver
+
+def _customer_segments(run: ETLRun, cache: StageCache, enriched: pd.DataFrame) -> pd.DataFrame:
+    """Customer segments, merged into the persisted segment state or recomputed"""
+    if cfg.incremental_segments:
+        # Depends on persisted state, not only on its input, so it bypasses the stage cache
+        return update_customer_segments(enriched, run)
+    return cache.run_stage(run, "create_customer_segments", create_customer_segments,
+                           {"enriched_df": enriched})
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run the Scout ETL pipeline")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore layers persisted by an unfinished run")
+    args = parser.parse_args()
+
+    run = log_run(environment=cfg.environment, dry_run=cfg.dry_run)
+    try:
+        run_pipeline(run, resume=not args.fresh)
+        run.finish(ok=True)
+    except Exception:
+        run.finish(ok=False)
+        raise
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Aggregation planner for Scout ETL Pipeline
+Keyed aggregates computed from one factorization per key, in batch or incrementally
+"""
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from ..common.util import DISTINCT_SKETCH_PRECISION, DistinctSketch, estimate_distinct, hll_registers
+
+AGGREGATE_FUNCS = ('size', 'sum', 'count', 'mean', 'min', 'max', 'nunique',
+                   'approx_nunique', 'distinct_sketch')
+
+# Funcs backed by HyperLogLog registers instead of exact (key, value) pairs
+SKETCH_FUNCS = ('approx_nunique', 'distinct_sketch')
+
+# How partial states of each kind are re-reduced when partials are combined
+_COMBINE_FUNCS = {'size': 'sum', 'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+@dataclass(frozen=True)
+class Aggregate:
+    """One output column: func applied to column within each key group"""
+    name: str
+    func: str
+    column: Optional[str] = None
+
+@dataclass
+class KeyState:
+    """Partial aggregates for one key
+
+    values holds the mergeable states (size, sums, counts, min/max) indexed
+    by key; distinct holds de-duplicated (key, value) pairs per nunique
+    column, kept only when the state is meant to be combined later;
+    registers holds the non-empty HyperLogLog registers (key, register,
+    rank) per approx_nunique/distinct_sketch column.
+    """
+    values: pd.DataFrame
+    distinct: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    registers: Dict[str, pd.DataFrame] = field(default_factory=dict)
+
+class AggregationPlan:
+    """Keyed aggregates grouped by key so each key is factorized once
+
+    Batch:        plan.execute(df)
+    Incremental:  states = [plan.partial(chunk) for chunk in chunks]
+                  plan.finalize(plan.combine(states))
+
+    Means are computed as sum / count and distinct counts from (key, value)
+    pairs, so both modes produce the same result. approx_nunique estimates
+    distinct counts from per-key HyperLogLog registers instead, which stay
+    bounded per key; distinct_sketch outputs the serialized DistinctSketch
+    per key so it can be stored and merged later. Groups follow
+    groupby(key, observed=True) semantics: sorted keys, NaN keys dropped.
+    """
+
+    def __init__(self, precision: int = DISTINCT_SKETCH_PRECISION):
+        self.precision = precision
+        self.aggregates: Dict[str, List[Aggregate]] = {}
+
+    def add(self, key: str, name: str, func: str, column: Optional[str] = None) -> 'AggregationPlan':
+        """Add an output column; column is required for every func except size"""
+        if func not in AGGREGATE_FUNCS:
+            raise ValueError(f"Unsupported aggregate function: {func}")
+        if func != 'size' and column is None:
+            raise ValueError(f"Aggregate '{name}' needs a column for {func}")
+        self.aggregates.setdefault(key, []).append(Aggregate(name, func, column))
+        return self
+
+    def add_distinct(self, key: str, name: str, column: str, approximate: bool = False,
+                     sketch: bool = False) -> 'AggregationPlan':
+        """Add a distinct count, exact (nunique) or approximate (approx_nunique)
+
+        With approximate=True and sketch=True the serialized sketch is also
+        output as <name>_sketch, so counts can be merged across runs later.
+        """
+        if not approximate:
+            return self.add(key, name, 'nunique', column)
+        self.add(key, name, 'approx_nunique', column)
+        if sketch:
+            self.add(key, f'{name}_sketch', 'distinct_sketch', column)
+        return self
+
+    def execute(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Final aggregates for a whole frame, one DataFrame per key"""
+        return self.finalize(self.partial(df, mergeable=False))
+
+    def partial(self, df: pd.DataFrame, mergeable: bool = True) -> Dict[str, KeyState]:
+        """Partial aggregates for one frame (or chunk)
+
+        With mergeable=False distinct counts are taken directly from the
+        factorized codes and the state can only be finalized, not combined.
+        """
+        return {key: self._partial_key(df, key, aggregates, mergeable)
+                for key, aggregates in self.aggregates.items()}
+
+    def combine(self, states: List[Dict[str, KeyState]]) -> Dict[str, KeyState]:
+        """Merge mergeable partial states into one"""
+        if len(states) == 1:
+            return states[0]
+
+        combined = {}
+        for key in self.aggregates:
+            key_states = [state[key] for state in states if key in state]
+            if not key_states:
+                continue
+
+            values = pd.concat([state.values for state in key_states])
+            values = values.groupby(level=0, observed=True).agg(
+                {col: _COMBINE_FUNCS[col.rsplit(':', 1)[-1]] for col in values.columns}
+            )
+            distinct = {
+                col: pd.concat([state.distinct[col] for state in key_states],
+                               ignore_index=True).drop_duplicates()
+                for col in key_states[0].distinct
+            }
+            registers = {
+                col: _max_registers(pd.concat([state.registers[col] for state in key_states],
+                                              ignore_index=True), key)
+                for col in key_states[0].registers
+            }
+            combined[key] = KeyState(values, distinct, registers)
+        return combined
+
+    def finalize(self, state: Dict[str, KeyState]) -> Dict[str, pd.DataFrame]:
+        """Output columns for every key from a (combined) partial state"""
+        results = {}
+        for key, aggregates in self.aggregates.items():
+            if key not in state:
+                continue
+            values, distinct = state[key].values, state[key].distinct
+
+            columns = {}
+            for agg in aggregates:
+                if agg.func == 'size':
+                    columns[agg.name] = values['size']
+                elif agg.func == 'mean':
+                    columns[agg.name] = values[f'{agg.column}:sum'] / values[f'{agg.column}:count']
+                elif agg.func == 'nunique' and agg.column in distinct:
+                    pairs = distinct[agg.column]
+                    counts = pairs.groupby(key, observed=True)[agg.column].nunique()
+                    columns[agg.name] = counts.reindex(values.index, fill_value=0)
+                elif agg.func == 'approx_nunique':
+                    columns[agg.name] = self._estimate(state[key].registers[agg.column], values.index)
+                elif agg.func == 'distinct_sketch':
+                    columns[agg.name] = self._serialize(state[key].registers[agg.column], values.index)
+                else:
+                    columns[agg.name] = values[f'{agg.column}:{agg.func}']
+
+            results[key] = pd.DataFrame(columns, index=values.index)
+        return results
+
+    def _partial_key(self, df: pd.DataFrame, key: str, aggregates: List[Aggregate],
+                     mergeable: bool) -> KeyState:
+        """Factorize one key and compute every state column from its codes"""
+        codes, uniques = pd.factorize(df[key], sort=True)
+        index = pd.Index(uniques, name=key)
+
+        valid = codes >= 0
+        states = {'size': np.bincount(codes[valid], minlength=len(uniques))}
+
+        columns_by_func: Dict[str, List[str]] = {}
+        for column, func in _state_columns(aggregates):
+            columns_by_func.setdefault(func, []).append(column)
+
+        if columns_by_func:
+            # Group on the dense integer codes (NaN keys dropped) rather than the
+            # key values, so the key is not hashed again for every aggregation;
+            # each func is a single cython pass over all of its columns
+            frame, group_codes = (df, codes) if valid.all() else (df[valid], codes[valid])
+            grouped = frame.groupby(group_codes, sort=True)
+            for func, columns in columns_by_func.items():
+                result = getattr(grouped[columns], func)()
+                states.update({f'{column}:{func}': result[column].to_numpy() for column in columns})
+
+        distinct = {}
+        for column in dict.fromkeys(agg.column for agg in aggregates if agg.func == 'nunique'):
+            if mergeable:
+                distinct[column] = df.loc[valid, [key, column]].drop_duplicates()
+            else:
+                states[f'{column}:nunique'] = _count_distinct(codes, df[column], len(uniques))
+
+        # Register states are small and always mergeable
+        registers = {}
+        for column in dict.fromkeys(agg.column for agg in aggregates if agg.func in SKETCH_FUNCS):
+            registers[column] = self._partial_registers(codes, index, df[column])
+
+        return KeyState(pd.DataFrame(states, index=index), distinct, registers)
+
+    def _partial_registers(self, key_codes: np.ndarray, index: pd.Index,
+                           values: pd.Series) -> pd.DataFrame:
+        """Max rank per (key, register) over the non-null values of one column"""
+        valid = (key_codes >= 0) & values.notna().to_numpy()
+        register, rank = hll_registers(values[valid], self.precision)
+
+        # Reduce on a single int64 (key code, register) slot before attaching key values
+        slots = key_codes[valid].astype(np.int64) << self.precision | register
+        ranks = pd.Series(rank).groupby(slots, sort=False).max()
+        slots = ranks.index.to_numpy()
+        return pd.DataFrame({index.name: index.take(slots >> self.precision),
+                             'register': (slots & ((1 << self.precision) - 1)).astype(np.int32),
+                             'rank': ranks.to_numpy()})
+
+    def _estimate(self, registers: pd.DataFrame, index: pd.Index) -> pd.Series:
+        """approx_nunique per key of index from its register state"""
+        key_codes = index.get_indexer(registers[index.name])
+        matched = key_codes >= 0
+        counts = estimate_distinct(key_codes[matched], registers['rank'].to_numpy()[matched],
+                                   len(index), self.precision)
+        return pd.Series(counts, index=index)
+
+    def _serialize(self, registers: pd.DataFrame, index: pd.Index) -> pd.Series:
+        """DistinctSketch.to_bytes() per key of index"""
+        key_codes = index.get_indexer(registers[index.name])
+        register = registers['register'].to_numpy()
+        rank = registers['rank'].to_numpy()
+        matched = key_codes >= 0
+        key_codes, register, rank = key_codes[matched], register[matched], rank[matched]
+
+        order = np.lexsort((register, key_codes))
+        key_codes, register, rank = key_codes[order], register[order], rank[order]
+        bounds = np.searchsorted(key_codes, np.arange(len(index) + 1))
+
+        # Sparse encodings are contiguous slices of one packed buffer; only
+        # keys with many registers go through DistinctSketch for the dense form
+        header = bytes([self.precision])
+        packed = ((register.astype(np.uint32) << 8) | rank).astype('<u4').tobytes()
+        sketches = []
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            if 4 * (end - start) > 1 << self.precision:
+                ranks = pd.Series(rank[start:end], index=register[start:end])
+                sketches.append(DistinctSketch(self.precision, ranks).to_bytes())
+            else:
+                sketches.append(header + packed[4 * start:4 * end])
+        return pd.Series(sketches, index=index, dtype=object)
+
+def _max_registers(registers: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Register-wise max per key (HyperLogLog merge) of concatenated register states"""
+    return registers.groupby([key, 'register'], observed=True, sort=False)['rank'].max().reset_index()
+
+def _state_columns(aggregates: List[Aggregate]) -> List[Tuple[str, str]]:
+    """(column, func) states needed by the aggregates, without duplicates"""
+    needed = []
+    for agg in aggregates:
+        if agg.func == 'mean':
+            needed += [(agg.column, 'sum'), (agg.column, 'count')]
+        elif agg.func in ('sum', 'count', 'min', 'max'):
+            needed.append((agg.column, agg.func))
+    return list(dict.fromkeys(needed))
+
+def _count_distinct(key_codes: np.ndarray, values: pd.Series, n_keys: int) -> np.ndarray:
+    """Distinct non-null values per key code (groupby nunique from codes)"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        value_codes, n_values = values.cat.codes.to_numpy(), len(values.cat.categories)
+    else:
+        value_codes, value_uniques = pd.factorize(values)
+        n_values = len(value_uniques)
+
+    valid = (key_codes >= 0) & (value_codes >= 0)
+    pairs = key_codes[valid].astype(np.int64) * n_values + value_codes[valid]
+    return np.bincount(pd.unique(pairs) // max(n_values, 1), minlength=n_keys)
+
+@dataclass
+class TopValues:
+    """First-seen distinct values per group as a padded code matrix
+
+    codes[g] holds up to `limit` codes into categories for group g, in the
+    order the values first appear, padded with -1. Consumers can use the
+    codes directly instead of splitting the joined strings.
+    """
+    codes: np.ndarray
+    categories: pd.Index
+
+    def joined(self, sep: str = '|') -> np.ndarray:
+        """sep-joined values per group, built once per distinct combination"""
+        if len(self.codes) == 0:
+            return np.array([], dtype=object)
+
+        combinations, inverse = np.unique(self.codes, axis=0, return_inverse=True)
+        labels = self.categories.astype(str).to_numpy()
+        joined = np.array([sep.join(labels[row[row >= 0]]) for row in combinations], dtype=object)
+        return joined[inverse.ravel()]
+
+    def to_lists(self) -> List[list]:
+        """Values per group as Python lists"""
+        values = self.categories.to_numpy()
+        return [list(values[row[row >= 0]]) for row in self.codes]
+
+def top_distinct_values(group_codes: np.ndarray, n_groups: int,
+                        values: pd.Series, limit: int) -> TopValues:
+    """First `limit` distinct non-null values per group, in first-seen order
+
+    Vectorized equivalent of groupby(...).agg(lambda x: x.unique()[:limit]):
+    factorize the values, keep the first row of every (group, value) pair,
+    then stable-sort by group and rank within each group.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        value_codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        value_codes, uniques = pd.factorize(values)
+        categories = pd.Index(uniques)
+
+    valid = (group_codes >= 0) & (value_codes >= 0)
+    groups = group_codes[valid].astype(np.int64)
+    codes = value_codes[valid].astype(np.int64)
+
+    first = ~pd.Series(groups * len(categories) + codes).duplicated().to_numpy()
+    groups, codes = groups[first], codes[first]
+
+    order = np.argsort(groups, kind='stable')
+    groups, codes = groups[order], codes[order]
+    group_starts = np.concatenate([[0], np.cumsum(np.bincount(groups, minlength=n_groups))[:-1]])
+    rank = np.arange(len(groups)) - group_starts[groups]
+
+    keep = rank < limit
+    matrix = np.full((n_groups, limit), -1, dtype=np.int32)
+    matrix[groups[keep], rank[keep]] = codes[keep]
+    return TopValues(matrix, categories)
+
+def merge_top_values(parts: List[TopValues], group_codes: np.ndarray,
+                     n_groups: int, limit: int) -> TopValues:
+    """Combine TopValues of consecutive partials whose rows map to group_codes
+
+    The partials' rows are stacked in order and re-ranked per group on the
+    codes (categories are unioned first), so first-seen order is kept and
+    values are never split back out of joined strings.
+    """
+    categories = parts[0].categories.append([part.categories for part in parts[1:]]).unique()
+    matrices = []
+    for part in parts:
+        # The trailing -1 keeps padding codes (-1) as padding
+        remap = np.append(categories.get_indexer(part.categories), -1)
+        matrices.append(remap[part.codes])
+    matrix = np.concatenate(matrices)
+
+    values = pd.Series(pd.Categorical.from_codes(matrix.ravel(), categories=categories))
+    rows = np.repeat(group_codes, matrix.shape[1])
+    return top_distinct_values(rows, n_groups, values, limit)
@@ -4,33 +4,52 @@ Clean and standardize raw data from multiple sources
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from ..common.config import cfg
 from ..common.log import ETLRun
-from ..common.io import normalize_columns, clean_dataframe, infer_datatypes
-from ..common.util import clean_column_names, detect_column_types, calculate_data_quality_score
-
-def to_bronze(raw_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd.DataFrame]:
-    """Transform raw data to bronze layer"""
-    start_time = pd.Timestamp.now()
+from ..common.io import (
+    normalize_columns, clean_dataframe, clean_strings, infer_datatypes, frame_to_ipc, frame_from_ipc
+)
+from ..common.quality import profile_frame
+from ..common.tracing import traced
+from ..common.util import clean_column_names, detect_column_types
+
+# Low-cardinality dimensions stored as category dtype from bronze onwards
+CATEGORICAL_COLUMNS = ['brand', 'category', 'payment_method', 'region', 'device_type']
+
+@traced("bronze_normalize")
+def to_bronze(raw_data: Dict[str, pd.DataFrame], run: ETLRun,
+              processes: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """Transform raw data to bronze layer
+
+    With processes > 1 (default cfg.bronze_processes) sources are normalized
+    on a process pool, and large sources are split into partitions.
+    """
+    processes = processes if processes is not None else cfg.bronze_processes
     bronze_data = {}
 
     try:
-        # Process each raw dataset
-        for source_name, df in raw_data.items():
-            bronze_df = normalize_source_data(df, source_name, run)
-            bronze_data[source_name] = bronze_df
+        if processes > 1:
+            bronze_data = _normalize_sources_parallel(raw_data, run, processes)
+        else:
+            # Process each raw dataset
+            for source_name, df in raw_data.items():
+                bronze_df = normalize_source_data(df, source_name, run)
+                bronze_data[source_name] = bronze_df
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("bronze_normalize", "success",
                     duration_ms=duration_ms,
-                    sources_processed=len(bronze_data))
+                    sources_processed=len(bronze_data),
+                    processes=max(processes, 1))
 
         # Log quality metrics for each bronze table
         for name, df in bronze_data.items():
-            quality = calculate_data_quality_score(df)
-            run.log_metric(f"bronze_{name}_quality_score", quality["completeness"])
-            run.log_metric(f"bronze_{name}_row_count", quality["row_count"])
+            # Profiled when the source was normalized; reused here
+            profile = profile_frame(df)
+            run.log_metric(f"bronze_{name}_quality_score", profile.completeness())
+            run.log_metric(f"bronze_{name}_row_count", profile.row_count)
 
         return bronze_data
 
@@ -38,6 +57,7 @@ def to_bronze(raw_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd.Da
         run.log_error("bronze_normalize", str(e))
         raise
 
+@traced("normalize_{source_name}")
 def normalize_source_data(df: pd.DataFrame, source_name: str, run: ETLRun) -> pd.DataFrame:
     """Normalize data from a specific source"""
     if df.empty:
@@ -45,47 +65,168 @@ def normalize_source_data(df: pd.DataFrame, source_name: str, run: ETLRun) -> pd
         return df
 
     original_count = len(df)
-    start_time = pd.Timestamp.now()
 
     try:
-        # Step 1: Clean column names
-        original_columns = df.columns.tolist()
-        df.columns = clean_column_names(df.columns.tolist())
-
-        # Step 2: Remove completely empty rows and columns
-        df = df.dropna(how='all').loc[:, df.notna().any()]
-
-        # Step 3: Data type detection and conversion
-        if source_name == "sales":
-            df = _normalize_sales_data(df)
-        elif source_name == "stores":
-            df = _normalize_stores_data(df)
-        elif source_name == "devices":
-            df = _normalize_devices_data(df)
-        else:
-            # Generic normalization
-            df = _normalize_generic_data(df)
-
-        # Step 4: Add metadata columns
-        df = _add_bronze_metadata(df, source_name)
-
-        # Step 5: Data quality validation
-        final_count = len(df)
-        quality_score = calculate_data_quality_score(df)
-
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
-        run.log_step(f"normalize_{source_name}", "success",
-                    duration_ms=duration_ms,
-                    rows_in=original_count,
-                    rows_out=final_count,
-                    quality_score=round(quality_score["completeness"], 3))
-
+        df = normalize_frame(df, source_name)
+        _log_normalized(run, source_name, df, original_count)
         return df
 
     except Exception as e:
         run.log_error(f"normalize_{source_name}", str(e))
         raise
 
+def _log_normalized(run: ETLRun, source_name: str, df: pd.DataFrame,
+                    original_count: int, **kwargs) -> None:
+    """Log the normalize step for one source with its quality score
+
+    The duration is that of the current span: the source's own span, or
+    the whole pool when sources are normalized in parallel.
+    """
+    profile = profile_frame(df)
+
+    duration_ms = run.current_span().elapsed_ms
+    run.log_step(f"normalize_{source_name}", "success",
+                duration_ms=duration_ms,
+                rows_in=original_count,
+                rows_out=len(df),
+                quality_score=round(profile.completeness(), 3),
+                **kwargs)
+
+@traced("normalize_parallel")
+def _normalize_sources_parallel(raw_data: Dict[str, pd.DataFrame], run: ETLRun,
+                                processes: int) -> Dict[str, pd.DataFrame]:
+    """Normalize all sources on a process pool
+
+    Frames cross the process boundary as Arrow IPC buffers. Whole-frame
+    steps (empty row/column removal) run here first so partitions produce
+    exactly what a serial run would: typed sources are split into row
+    ranges, generic sources into column groups so type detection stays
+    per column.
+    """
+    plans = {}
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for source_name, df in raw_data.items():
+            if df.empty:
+                run.log_step(f"normalize_{source_name}", "skipped", note="Empty dataset")
+                continue
+
+            prepared = _prepare_frame(df)
+            parts = _plan_partitions(prepared, source_name, processes)
+            futures = [
+                executor.submit(_normalize_partition, frame_to_ipc(part), source_name,
+                                row_offset, by_columns)
+                for part, row_offset, by_columns in parts
+            ]
+            plans[source_name] = (len(df), len(parts), parts[0][2], futures)
+
+        bronze_data = {}
+        for source_name, df in raw_data.items():
+            if source_name not in plans:
+                bronze_data[source_name] = df
+                continue
+
+            try:
+                original_count, n_parts, by_columns, futures = plans[source_name]
+                results = [frame_from_ipc(future.result()) for future in futures]
+
+                if by_columns:
+                    bronze_df = _add_bronze_metadata(pd.concat(results, axis=1), source_name)
+                else:
+                    bronze_df = _concat_row_partitions(results) if n_parts > 1 else results[0]
+
+                _log_normalized(run, source_name, bronze_df, original_count,
+                                partitions=n_parts,
+                                partitioned_by="columns" if by_columns else "rows")
+                bronze_data[source_name] = bronze_df
+
+            except Exception as e:
+                run.log_error(f"normalize_{source_name}", str(e))
+                raise
+
+    return bronze_data
+
+def _concat_row_partitions(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate row partitions, keeping category columns categorical
+
+    Each partition only knows the categories in its own rows, and concat
+    falls back to object when they differ, so the partitions are first
+    cast to the sorted union (the categories a serial run would produce).
+    """
+    for col in CATEGORICAL_COLUMNS:
+        dtypes = [part[col].dtype for part in parts if col in part.columns]
+        if len(dtypes) != len(parts) or not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+        categories = sorted(set().union(*(dtype.categories for dtype in dtypes)))
+        union = pd.CategoricalDtype(categories)
+        parts = [part.astype({col: union}) for part in parts]
+    return pd.concat(parts)
+
+def _prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Whole-frame normalization steps that must run before partitioning"""
+    df = df.set_axis(clean_column_names(df.columns.tolist()), axis=1)
+    df = df.dropna(how='all')
+    return df.loc[:, df.notna().any()]
+
+def _plan_partitions(df: pd.DataFrame, source_name: str,
+                     processes: int) -> List[Tuple[pd.DataFrame, int, bool]]:
+    """Split a prepared frame into (part, row_offset, by_columns) work items"""
+    partition_rows = max(cfg.bronze_partition_rows, 1)
+
+    if source_name in ("sales", "stores", "devices"):
+        n_parts = min(processes, -(-len(df) // partition_rows))
+        if n_parts <= 1:
+            return [(df, 0, False)]
+        bounds = np.linspace(0, len(df), n_parts + 1).astype(int)
+        return [(df.iloc[start:end], int(start), False)
+                for start, end in zip(bounds[:-1], bounds[1:])]
+
+    # Generic sources: type detection dominates and is per column
+    n_parts = min(processes, len(df.columns), -(-df.size // partition_rows))
+    if n_parts <= 1:
+        return [(df, 0, False)]
+    groups = np.array_split(np.arange(len(df.columns)), n_parts)
+    return [(df.iloc[:, group], 0, True) for group in groups]
+
+def _normalize_partition(payload: Tuple[str, bytes], source_name: str,
+                         row_offset: int, by_columns: bool) -> Tuple[str, bytes]:
+    """Process-pool worker: normalize one row range or column group"""
+    df = frame_from_ipc(payload)
+    if by_columns:
+        df = _normalize_generic_data(df, source_name)
+    else:
+        df = normalize_frame(df, source_name, row_offset=row_offset, drop_empty_columns=False)
+    return frame_to_ipc(df)
+
+def normalize_frame(df: pd.DataFrame, source_name: str, row_offset: int = 0,
+                    drop_empty_columns: bool = True) -> pd.DataFrame:
+    """Apply bronze normalization to one frame (or one chunk) without logging
+
+    Streaming callers pass row_offset so _bronze_row_id stays unique across
+    chunks, and drop_empty_columns=False so every chunk keeps the same schema.
+    """
+    # Step 1: Clean column names
+    df.columns = clean_column_names(df.columns.tolist())
+
+    # Step 2: Remove completely empty rows and columns
+    df = df.dropna(how='all')
+    if drop_empty_columns:
+        df = df.loc[:, df.notna().any()]
+
+    # Step 3: Data type detection and conversion
+    if source_name == "sales":
+        df = _normalize_sales_data(df)
+    elif source_name == "stores":
+        df = _normalize_stores_data(df)
+    elif source_name == "devices":
+        df = _normalize_devices_data(df)
+    else:
+        # Generic normalization
+        df = _normalize_generic_data(df, source_name)
+
+    # Step 4: Add metadata columns
+    return _add_bronze_metadata(df, source_name, row_offset)
+
 def _normalize_sales_data(df: pd.DataFrame) -> pd.DataFrame:
     """Normalize sales/interactions data"""
     # Expected columns mapping
@@ -131,8 +272,8 @@ def _normalize_sales_data(df: pd.DataFrame) -> pd.DataFrame:
     string_columns = ['brand', 'category', 'product_name', 'payment_method', 'sku']
     for col in string_columns:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper()
-            df[col] = df[col].replace(['NAN', 'NONE', ''], np.nan)
+            df[col] = clean_strings(df[col], case='upper', null_tokens=('NAN', 'NONE', ''),
+                                    categorical=col in CATEGORICAL_COLUMNS)
 
     return df
 
@@ -171,8 +312,8 @@ def _normalize_stores_data(df: pd.DataFrame) -> pd.DataFrame:
     string_columns = ['store_name', 'store_type', 'region', 'province', 'city', 'status']
     for col in string_columns:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.title()
-            df[col] = df[col].replace(['Nan', 'None', ''], np.nan)
+            df[col] = clean_strings(df[col], case='title', null_tokens=('Nan', 'None', ''),
+                                    categorical=col in CATEGORICAL_COLUMNS)
 
     return df
 
@@ -207,15 +348,15 @@ def _normalize_devices_data(df: pd.DataFrame) -> pd.DataFrame:
     string_columns = ['device_name', 'device_type', 'status', 'location_in_store']
     for col in string_columns:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.title()
-            df[col] = df[col].replace(['Nan', 'None', ''], np.nan)
+            df[col] = clean_strings(df[col], case='title', null_tokens=('Nan', 'None', ''),
+                                    categorical=col in CATEGORICAL_COLUMNS)
 
     return df
 
-def _normalize_generic_data(df: pd.DataFrame) -> pd.DataFrame:
+def _normalize_generic_data(df: pd.DataFrame, source_name: Optional[str] = None) -> pd.DataFrame:
     """Generic normalization for unknown data sources"""
-    # Detect and convert data types
-    type_mapping = detect_column_types(df)
+    # Detect and convert data types (reusing the schema cached for this source)
+    type_mapping = detect_column_types(df, source_name)
 
     for col, dtype in type_mapping.items():
         if col not in df.columns:
@@ -243,14 +384,14 @@ def _normalize_generic_data(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
-def _add_bronze_metadata(df: pd.DataFrame, source_name: str) -> pd.DataFrame:
+def _add_bronze_metadata(df: pd.DataFrame, source_name: str, row_offset: int = 0) -> pd.DataFrame:
     """Add metadata columns to bronze data"""
     df = df.copy()
 
     # Add bronze layer metadata
     df['_bronze_source'] = source_name
     df['_bronze_loaded_at'] = pd.Timestamp.now()
-    df['_bronze_row_id'] = range(1, len(df) + 1)
+    df['_bronze_row_id'] = range(row_offset + 1, row_offset + len(df) + 1)
 
     # Add data quality indicators
     df['_bronze_null_count'] = df.isnull().sum(axis=1)
@@ -278,10 +419,10 @@ def validate_bronze_data(bronze_data: Dict[str, pd.DataFrame], run: ETLRun) -> b
             validation_passed = False
 
         # Check data quality thresholds
-        quality = calculate_data_quality_score(df)
-        if quality["completeness"] < 0.7:  # 70% completeness threshold
+        completeness = profile_frame(df).completeness()
+        if completeness < 0.7:  # 70% completeness threshold
             run.log_error(f"bronze_validation_{source_name}",
-                         f"Low data quality: {quality['completeness']:.2%} completeness")
+                         f"Low data quality: {completeness:.2%} completeness")
             validation_passed = False
 
         # Log validation results
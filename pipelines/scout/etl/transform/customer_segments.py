@@ -0,0 +1,324 @@
+"""
+Incremental customer segmentation for Scout ETL Pipeline
+Per-customer running aggregates and RFM breakpoint sketches in a persisted state store
+"""
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+from ..common.config import cfg
+from ..common.log import ETLRun
+from ..common.state import JsonStateFile
+from ..common.tracing import traced
+from ..common.util import QuantileSketch, create_surrogate_key, ensure_datetime
+from .aggregates import KeyState, SKETCH_FUNCS
+from .silver_enrich import (
+    CUSTOMER_METRICS_PLAN, RECENCY_LABELS, SCORE_LABELS,
+    add_activity_metrics, finish_customer_segments
+)
+
+CUSTOMER_KEY = 'customer_id'
+SEGMENT_KEY = 'customer_segment_key'
+INTERACTION_ID = 'interaction_id'
+RFM_QUANTILES = [0.2, 0.4, 0.6, 0.8]
+
+# Metric -> relative accuracy of its breakpoint sketch (0 = exact)
+RFM_SKETCHES = {'last_purchase_day': 0.0, 'transaction_count': 0.0, 'total_revenue': 0.001}
+
+EPOCH = pd.Timestamp('1970-01-01')
+
+@dataclass
+class CustomerSegmentState:
+    """Running per-customer aggregates plus everything needed to score them
+
+    customers holds the mergeable CUSTOMER_METRICS_PLAN states and the
+    finalized metrics per customer; distinct holds the (customer, value)
+    sets behind exact distinct counts and registers the HyperLogLog
+    registers behind approximate ones; sketches hold the distributions the
+    RFM breakpoints are read from; merged holds the interaction_id and
+    transaction_date of interactions merged in the last
+    cfg.segment_seen_days days of data, so re-read rows are recognised.
+    """
+    customers: pd.DataFrame = field(default_factory=pd.DataFrame)
+    distinct: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    registers: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    sketches: Dict[str, QuantileSketch] = field(default_factory=dict)
+    merged: pd.DataFrame = field(default_factory=lambda: _empty_merged())
+
+class CustomerSegmentStore:
+    """Segmentation state on disk: <root>/state.json plus one Parquet version directory
+
+    Each save writes a new version directory and then repoints state.json
+    at it, so a failed run never leaves half-merged aggregates behind.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None):
+        self.root = Path(root) if root else cfg.state_dir / "customer_segments"
+        self._index = JsonStateFile(self.root / "state.json")
+
+    def load(self) -> CustomerSegmentState:
+        """Current state, or an empty state if nothing was saved yet"""
+        index = self._index._load()
+        version = self.root / index.get("version", "")
+        if not index.get("version") or not version.exists():
+            return CustomerSegmentState(sketches=_empty_sketches())
+
+        customers = pd.read_parquet(version / "customers.parquet")
+        distinct = {path.stem[len("distinct_"):]: pd.read_parquet(path)
+                    for path in version.glob("distinct_*.parquet")}
+        registers = {path.stem[len("registers_"):]: pd.read_parquet(path)
+                     for path in version.glob("registers_*.parquet")}
+        sketches = {name: QuantileSketch.from_dict(state)
+                    for name, state in index.get("sketches", {}).items()}
+        merged_path = version / "merged.parquet"
+        if not merged_path.exists():
+            raise ValueError(
+                "Customer segment state predates merged interaction tracking; "
+                "rerun with FULL_REFRESH=true to rebuild it"
+            )
+        merged = pd.read_parquet(merged_path)
+        return CustomerSegmentState(customers, distinct, registers, sketches, merged)
+
+    def save(self, state: CustomerSegmentState, run_id: Optional[str] = None) -> None:
+        """Persist a new state version and switch to it"""
+        previous = self._index._load().get("version")
+        version = f"v-{run_id or 'local'}-{uuid.uuid4().hex[:8]}"
+        target = self.root / version
+        target.mkdir(parents=True, exist_ok=True)
+
+        try:
+            state.customers.to_parquet(target / "customers.parquet")
+            state.merged.to_parquet(target / "merged.parquet", index=False)
+            for column, pairs in state.distinct.items():
+                pairs.to_parquet(target / f"distinct_{column}.parquet", index=False)
+            for column, registers in state.registers.items():
+                registers.to_parquet(target / f"registers_{column}.parquet", index=False)
+
+            self._index._save({
+                "version": version,
+                "sketches": {name: sketch.to_dict() for name, sketch in state.sketches.items()},
+                "customers": len(state.customers),
+                "run_id": run_id,
+                "updated_at": datetime.utcnow().isoformat(),
+            })
+        except Exception:
+            shutil.rmtree(target, ignore_errors=True)
+            raise
+
+        if previous and previous != version:
+            shutil.rmtree(self.root / previous, ignore_errors=True)
+
+    def reset(self) -> None:
+        """Drop all segmentation state (the next update starts from scratch)"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+@traced()
+def update_customer_segments(enriched_df: pd.DataFrame, run: ETLRun,
+                             store: Optional[CustomerSegmentStore] = None,
+                             full_refresh: Optional[bool] = None) -> pd.DataFrame:
+    """Merge new interactions into the persisted customer state and score all customers
+
+    Only interactions whose interaction_id has not been merged yet are
+    aggregated, so re-read overlap windows and resumed runs are not counted
+    twice, late rows inside the window still are, and the aggregation cost
+    follows the new data. Rows dated before the retained window
+    (cfg.segment_seen_days before the latest merged date) are taken as
+    already merged. RFM breakpoints come from the
+    quantile sketches, and recency is measured from the latest purchase in
+    the data rather than from the wall clock, so unchanged data always
+    gives the same segments. Returns the create_customer_segments table.
+    """
+    store = store or CustomerSegmentStore()
+    if full_refresh is None:
+        full_refresh = cfg.full_refresh
+
+    try:
+        if full_refresh:
+            store.reset()
+        state = store.load()
+        _check_distinct_modes(state)
+
+        new_rows = pd.DataFrame()
+        if not enriched_df.empty and CUSTOMER_KEY in enriched_df.columns:
+            new_rows = _new_interactions(enriched_df, state.merged)
+
+        customers_updated = 0
+        if not new_rows.empty:
+            customers_updated = _merge_interactions(state, new_rows)
+            state.merged = _record_merged(state.merged, new_rows)
+            store.save(state, run.run_id)
+
+        segments = score_customer_segments(state)
+
+        duration_ms = run.current_span().elapsed_ms
+        run.log_step("update_customer_segments", "success",
+                    duration_ms=duration_ms,
+                    new_interactions=len(new_rows),
+                    skipped_interactions=len(enriched_df) - len(new_rows),
+                    customers_updated=customers_updated,
+                    rows=len(segments))
+        run.log_metric("customer_segments_created", len(segments))
+
+        return segments
+
+    except Exception as e:
+        run.log_error("update_customer_segments", str(e))
+        raise
+
+def score_customer_segments(state: CustomerSegmentState) -> pd.DataFrame:
+    """Segments table for every customer in the state"""
+    if state.customers.empty:
+        return pd.DataFrame()
+
+    metric_columns = [agg.name for agg in CUSTOMER_METRICS_PLAN.aggregates[CUSTOMER_KEY]]
+    customers = state.customers.sort_index()
+    customer_metrics = customers[metric_columns].copy()
+    add_activity_metrics(customer_metrics)
+
+    # Recency is relative to the latest purchase in the data (no wall-clock drift)
+    last_purchase = ensure_datetime(customer_metrics['last_purchase']).dt.normalize()
+    as_of = last_purchase.max()
+    customer_metrics['recency_days'] = (as_of - last_purchase).dt.days
+
+    # Recency quantiles are mirrored last-purchase quantiles: q(as_of - x) = as_of - q_(1-q)(x)
+    as_of_day = (as_of - EPOCH).days
+    last_day_edges = state.sketches['last_purchase_day'].quantiles([1 - q for q in RFM_QUANTILES])
+    customer_metrics['recency_score'] = _score(customer_metrics['recency_days'],
+                                               as_of_day - last_day_edges, RECENCY_LABELS)
+    customer_metrics['frequency_score'] = _score(
+        customer_metrics['transaction_count'],
+        state.sketches['transaction_count'].quantiles(RFM_QUANTILES), SCORE_LABELS
+    )
+    customer_metrics['monetary_score'] = _score(
+        customer_metrics['total_revenue'],
+        state.sketches['total_revenue'].quantiles(RFM_QUANTILES), SCORE_LABELS
+    )
+
+    return finish_customer_segments(customer_metrics, customers[SEGMENT_KEY])
+
+def _empty_sketches() -> Dict[str, QuantileSketch]:
+    return {name: QuantileSketch(accuracy) for name, accuracy in RFM_SKETCHES.items()}
+
+def _empty_merged() -> pd.DataFrame:
+    return pd.DataFrame({INTERACTION_ID: pd.Series(dtype=object),
+                         'transaction_date': pd.Series(dtype='datetime64[ns]')})
+
+def _new_interactions(df: pd.DataFrame, merged: pd.DataFrame) -> pd.DataFrame:
+    """Dated rows not merged yet: unseen IDs inside the retained window
+
+    Rows without an interaction_id cannot be recognised when re-read, so
+    they only count when dated after everything merged so far.
+    """
+    dates = ensure_datetime(df['transaction_date']).dt.normalize()
+    new = dates.notna()
+    if merged.empty:
+        return df[new]
+
+    latest = merged['transaction_date'].max()
+    ids = _interaction_ids(df)
+    unseen = ids.notna() & ~ids.isin(merged[INTERACTION_ID]) & (dates >= _window_start(latest))
+    new &= unseen.fillna(False) | (ids.isna() & (dates > latest))
+    return df[new]
+
+def _record_merged(merged: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """Add merged rows' IDs and dates, keeping only those inside the retained window"""
+    rows = pd.DataFrame({
+        INTERACTION_ID: _interaction_ids(new_rows).astype(object).to_numpy(),
+        'transaction_date': ensure_datetime(new_rows['transaction_date']).dt.normalize().to_numpy(),
+    }).dropna(subset=['transaction_date']).drop_duplicates()
+    combined = pd.concat([merged, rows], ignore_index=True) if not merged.empty else rows
+    if combined.empty:
+        return _empty_merged()
+    # Rows without an ID stay too: they carry the latest merged date
+    start = _window_start(combined['transaction_date'].max())
+    return combined[combined['transaction_date'] >= start].reset_index(drop=True)
+
+def _interaction_ids(df: pd.DataFrame) -> pd.Series:
+    """interaction_id as strings (all NA when the column is missing)"""
+    if INTERACTION_ID not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype='string')
+    return df[INTERACTION_ID].astype('string')
+
+def _window_start(latest: pd.Timestamp) -> pd.Timestamp:
+    """Earliest transaction date whose merged IDs are still kept"""
+    return latest - pd.Timedelta(days=cfg.segment_seen_days)
+
+def _merge_interactions(state: CustomerSegmentState, new_rows: pd.DataFrame) -> int:
+    """Fold new interactions into the state; only touched customers are recomputed"""
+    plan = CUSTOMER_METRICS_PLAN
+    partial = plan.partial(new_rows)[CUSTOMER_KEY]
+    touched = partial.values.index
+
+    existing = touched.intersection(state.customers.index) if not state.customers.empty else touched[:0]
+    if len(existing):
+        previous = KeyState(
+            state.customers.loc[existing, partial.values.columns],
+            {column: pairs[pairs[CUSTOMER_KEY].isin(existing)] for column, pairs in state.distinct.items()},
+            {column: registers[registers[CUSTOMER_KEY].isin(existing)]
+             for column, registers in state.registers.items()}
+        )
+        merged = plan.combine([{CUSTOMER_KEY: previous}, {CUSTOMER_KEY: partial}])[CUSTOMER_KEY]
+    else:
+        merged = partial
+
+    metrics = plan.finalize({CUSTOMER_KEY: merged})[CUSTOMER_KEY].round(2)
+
+    # Replace the touched customers' old values in the breakpoint sketches
+    if len(existing):
+        _update_sketches(state.sketches, state.customers.loc[existing], weight=-1)
+    _update_sketches(state.sketches, metrics, weight=1)
+
+    updated = pd.concat([merged.values, metrics], axis=1)
+
+    # Surrogate keys only depend on the customer, so only new customers are hashed
+    new_customers = touched.difference(existing)
+    updated[SEGMENT_KEY] = state.customers[SEGMENT_KEY].reindex(touched) if len(existing) else None
+    if len(new_customers):
+        keys = create_surrogate_key(pd.DataFrame({CUSTOMER_KEY: new_customers}), [CUSTOMER_KEY])
+        updated.loc[new_customers, SEGMENT_KEY] = keys.to_numpy()
+    if state.customers.empty:
+        state.customers = updated
+    else:
+        state.customers = pd.concat([state.customers.drop(existing), updated])
+
+    for states, merged_states in ((state.distinct, merged.distinct),
+                                  (state.registers, merged.registers)):
+        for column, rows in merged_states.items():
+            kept = states.get(column)
+            if kept is not None and len(existing):
+                kept = kept[~kept[CUSTOMER_KEY].isin(existing)]
+            states[column] = pd.concat([kept, rows], ignore_index=True) if kept is not None else rows
+
+    return len(touched)
+
+def _check_distinct_modes(state: CustomerSegmentState) -> None:
+    """Refuse to merge into state built with other exact/approximate distinct settings"""
+    if state.customers.empty:
+        return
+
+    aggregates = CUSTOMER_METRICS_PLAN.aggregates[CUSTOMER_KEY]
+    exact = {agg.column for agg in aggregates if agg.func == 'nunique'}
+    approximate = {agg.column for agg in aggregates if agg.func in SKETCH_FUNCS}
+    if set(state.distinct) != exact or set(state.registers) != approximate:
+        raise ValueError(
+            "Customer segment state was built with different APPROX_DISTINCT settings; "
+            "rerun with FULL_REFRESH=true to rebuild it"
+        )
+
+def _update_sketches(sketches: Dict[str, QuantileSketch], metrics: pd.DataFrame, weight: int) -> None:
+    """Add (weight=1) or remove (weight=-1) customers' RFM inputs"""
+    last_purchase = ensure_datetime(metrics['last_purchase']).dt.normalize()
+    sketches['last_purchase_day'].add((last_purchase - EPOCH).dt.days, weight)
+    sketches['transaction_count'].add(metrics['transaction_count'], weight)
+    sketches['total_revenue'].add(metrics['total_revenue'], weight)
+
+def _score(values: pd.Series, edges: np.ndarray, labels: List[int]) -> pd.Categorical:
+    """Quintile label per value given the four inner breakpoints (qcut bin semantics)"""
+    values = values.to_numpy(dtype=float)
+    codes = np.searchsorted(edges, values, side='left')
+    codes = np.where(np.isnan(values), -1, codes)
+    return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(labels, ordered=True))
@@ -0,0 +1,122 @@
+"""
+Dimension lookups for Scout ETL Pipeline
+Hash-indexed key -> row position arrays used to attach columns by take
+"""
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from ..common.stage_cache import fingerprint_frame
+
+# Built lookups for dimension tables, keyed by content; shared across chunks and runs
+_LOOKUP_CACHE: "OrderedDict[Tuple[Any, ...], DimensionLookup]" = OrderedDict()
+LOOKUP_CACHE_SIZE = 32
+
+class DimensionLookup:
+    """Key index plus attribute arrays for one dimension table
+
+    positions() hashes the keys once (per distinct value for categorical
+    keys); take() then attaches every attribute with a positional gather,
+    so no intermediate merged frame is built. Unmatched keys give NA, and
+    integer/boolean attributes are upcast only when a key is unmatched,
+    as with a left merge.
+    """
+
+    def __init__(self, table: pd.DataFrame, key: str, columns: List[str], prefix: str = ''):
+        keys = table[key]
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            keys = keys.astype(object)
+
+        self.key = key
+        self.index = pd.Index(keys)
+        if not self.index.is_unique:
+            # A left merge would fan out rows; keep the first match per key instead
+            print(f"⚠️ Duplicate {key} values in lookup table, using first match")
+            first = ~self.index.duplicated(keep='first')
+            table, self.index = table[first], self.index[first]
+
+        self.columns = {f'{prefix}{col}': table[col].values for col in columns}
+
+    def positions(self, keys: pd.Series) -> np.ndarray:
+        """Row position in the lookup table for each key (-1 when unmatched)"""
+        _check_key_dtypes(keys, self.index, self.key)
+
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            category_positions = self.index.get_indexer(keys.cat.categories.astype(object))
+            codes = keys.cat.codes.to_numpy()
+            return np.where(codes >= 0, category_positions.take(codes), -1)
+
+        return self.index.get_indexer(keys)
+
+    def take(self, positions: np.ndarray) -> Dict[str, Any]:
+        """Attribute arrays gathered at the given positions"""
+        allow_fill = bool((positions < 0).any())
+        return {name: pd.api.extensions.take(values, positions, allow_fill=allow_fill)
+                for name, values in self.columns.items()}
+
+    def attach(self, keys: pd.Series) -> Dict[str, Any]:
+        """Attribute arrays aligned with keys"""
+        return self.take(self.positions(keys))
+
+def get_dimension_lookup(table: pd.DataFrame, key: str, columns: List[str],
+                         prefix: str = '') -> DimensionLookup:
+    """DimensionLookup for a table, reused while the table content is unchanged"""
+    cache_key = (fingerprint_frame(table[[key] + columns]), key, tuple(columns), prefix)
+    lookup = _LOOKUP_CACHE.get(cache_key)
+    if lookup is None:
+        lookup = DimensionLookup(table, key, columns, prefix)
+        _LOOKUP_CACHE[cache_key] = lookup
+        while len(_LOOKUP_CACHE) > LOOKUP_CACHE_SIZE:
+            _LOOKUP_CACHE.popitem(last=False)
+    else:
+        _LOOKUP_CACHE.move_to_end(cache_key)
+    return lookup
+
+def aggregate_lookup(stats: pd.DataFrame, key: str) -> DimensionLookup:
+    """DimensionLookup over a keyed aggregate (e.g. brand_stats indexed by brand)"""
+    table = stats.reset_index()
+    table.columns = [key] + list(stats.columns)
+    return DimensionLookup(table, key, list(stats.columns))
+
+class EnrichmentIndex:
+    """All lookups used by enrich_frame, built once and reused for every chunk"""
+
+    def __init__(self, stores_df: Optional[pd.DataFrame],
+                 devices_df: Optional[pd.DataFrame],
+                 lookups: Optional[Dict[str, Any]],
+                 store_columns: List[str], device_columns: List[str]):
+        lookups = lookups or {}
+        self.store = None
+        self.device = None
+        self.aggregates: Dict[str, DimensionLookup] = {}
+
+        if stores_df is not None and not stores_df.empty:
+            self.store = get_dimension_lookup(stores_df, 'store_id', store_columns[1:], 'store_')
+        if devices_df is not None and not devices_df.empty:
+            self.device = get_dimension_lookup(devices_df, 'device_id', device_columns[1:], 'device_')
+
+        if 'customer_frequency' in lookups:
+            self.aggregates['customer_frequency'] = aggregate_lookup(
+                lookups['customer_frequency'].rename('customer_frequency').to_frame(), 'customer_id'
+            )
+        if 'brand_stats' in lookups:
+            self.aggregates['brand_stats'] = aggregate_lookup(lookups['brand_stats'], 'brand')
+        if 'category_stats' in lookups:
+            self.aggregates['category_stats'] = aggregate_lookup(lookups['category_stats'], 'category')
+        if 'brands_in_basket' in lookups:
+            self.aggregates['brands_in_basket'] = aggregate_lookup(
+                lookups['brands_in_basket'].rename('brands_in_basket').to_frame(), 'transaction_id'
+            )
+
+def _check_key_dtypes(keys: pd.Series, index: pd.Index, key: str) -> None:
+    """Reject string vs numeric keys, which a merge would also refuse"""
+    left_numeric = pd.api.types.is_numeric_dtype(keys.dtype)
+    right_numeric = pd.api.types.is_numeric_dtype(index.dtype)
+    if left_numeric == right_numeric or len(keys) == 0 or len(index) == 0:
+        return
+
+    other = index if left_numeric else keys
+    if pd.api.types.infer_dtype(other, skipna=True) in ('string', 'mixed'):
+        raise ValueError(
+            f"You are trying to merge on {keys.dtype} and {index.dtype} columns for key '{key}'"
+        )
@@ -0,0 +1,307 @@
+"""
+Business rule engine for Scout ETL Pipeline
+Declarative silver rules compiled into one fused evaluation plan per table
+"""
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+from ..common.config import cfg
+from ..common.log import ETLRun
+from ..common.tracing import traced
+
+# Built-in silver rules, used for tables without `rules` in tables.yaml.
+# Rule types:
+#   filter  keep rows matching a condition
+#   map     replace values through a mapping (mapping from dims.yaml when `dimension` is set)
+#   set     set `columns` to `value` (null when omitted) where a condition holds
+#   cap     set `column` to `max` where it is above `max`
+# Conditions: {column, op, value, upper} or {any: [...]} / {all: [...]}; upper compares
+# upper-cased strings. Ops: eq, ne, gt, ge, lt, le, isin, notin, notna.
+DEFAULT_RULES: Dict[str, List[Dict[str, Any]]] = {
+    'stores': [
+        {'name': 'active_stores', 'type': 'filter',
+         'when': {'column': 'status', 'op': 'isin', 'value': ['ACTIVE', 'OPEN'], 'upper': True}},
+        {'name': 'standard_regions', 'type': 'map', 'column': 'region', 'upper': True,
+         'dimension': 'region',
+         'mapping': {'METRO MANILA': 'NCR', 'NATIONAL CAPITAL REGION': 'NCR',
+                     'REGION 4A': 'CALABARZON', 'REGION IV-A': 'CALABARZON'}},
+        # Philippines coordinate bounds
+        {'name': 'coordinate_bounds', 'type': 'set', 'columns': ['latitude', 'longitude'],
+         'when': {'any': [{'column': 'latitude', 'op': 'lt', 'value': 4.0},
+                          {'column': 'latitude', 'op': 'gt', 'value': 21.0},
+                          {'column': 'longitude', 'op': 'lt', 'value': 116.0},
+                          {'column': 'longitude', 'op': 'gt', 'value': 127.0}]}},
+    ],
+    'devices': [
+        {'name': 'active_devices', 'type': 'filter',
+         'when': {'column': 'status', 'op': 'eq', 'value': 'ACTIVE', 'upper': True}},
+        {'name': 'standard_device_types', 'type': 'map', 'column': 'device_type', 'upper': True,
+         'dimension': 'device_type',
+         'mapping': {'POINT OF SALE': 'POS', 'SELF CHECKOUT': 'SELF-CHECKOUT',
+                     'MOBILE POS': 'MOBILE', 'INFORMATION KIOSK': 'KIOSK'}},
+    ],
+    'interactions': [
+        {'name': 'positive_amount', 'type': 'filter',
+         'when': {'column': 'total_amount', 'op': 'gt', 'value': 0}},
+        {'name': 'positive_quantity', 'type': 'filter',
+         'when': {'column': 'quantity', 'op': 'gt', 'value': 0}},
+        {'name': 'standard_payment_methods', 'type': 'map', 'column': 'payment_method', 'upper': True,
+         'dimension': 'payment_method',
+         'mapping': {'CREDIT CARD': 'CARD', 'DEBIT CARD': 'CARD', 'CREDIT': 'CARD',
+                     'GCASH': 'DIGITAL', 'PAYMAYA': 'DIGITAL', 'GRABPAY': 'DIGITAL'}},
+        {'name': 'quantity_cap', 'type': 'cap', 'column': 'quantity', 'max': 100},
+        {'name': 'unit_price_cap', 'type': 'set', 'columns': ['unit_price'],
+         'when': {'column': 'unit_price', 'op': 'gt', 'value': 10000}},
+    ],
+}
+
+RULE_TYPES = ('filter', 'map', 'set', 'cap')
+CONDITION_OPS = ('eq', 'ne', 'gt', 'ge', 'lt', 'le', 'isin', 'notin', 'notna')
+
+@dataclass
+class Rule:
+    """One compiled rule; reads/writes are the columns it needs and changes"""
+    name: str
+    type: str
+    spec: Dict[str, Any]
+    reads: Tuple[str, ...]
+    writes: Tuple[str, ...] = ()
+
+@dataclass
+class RuleReport:
+    """Outcome of applying a RulePlan: rows in/out and per-rule hits and timings
+
+    hits are rows failing the rule (filter; a row can fail several),
+    values remapped (map) or rows changed (set, cap); rules whose columns
+    are missing are reported as skipped.
+    """
+    rows_in: int = 0
+    rows_out: int = 0
+    rules: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def record(self, rule: Rule, hits: Optional[int], started: float) -> None:
+        self.rules[rule.name] = {
+            'type': rule.type,
+            'hits': hits,
+            'skipped': hits is None,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+class RulePlan:
+    """Rules for one table compiled into a fused evaluation plan
+
+    All filters are evaluated against the input and combined into one mask,
+    so rows are dropped with a single take; value rules then run in order
+    on the kept rows. String columns used with upper=True are factorized
+    once and every upper-cased comparison or mapping works on the distinct
+    values, not on every row.
+    """
+
+    def __init__(self, table: str, rules: List[Dict[str, Any]],
+                 dims: Optional[Dict[str, Any]] = None):
+        self.table = table
+        self.filters: List[Rule] = []
+        self.transforms: List[Rule] = []
+
+        written = {}
+        for position, spec in enumerate(rules):
+            rule = _compile_rule(spec, position, dims or {})
+            if rule.type == 'filter':
+                for column in rule.reads:
+                    if column in written:
+                        raise ValueError(
+                            f"Rule '{rule.name}' filters on '{column}', which rule "
+                            f"'{written[column]}' changes earlier; filters must come first"
+                        )
+                self.filters.append(rule)
+            else:
+                self.transforms.append(rule)
+                written.update(dict.fromkeys(rule.writes, rule.name))
+
+    def apply(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, RuleReport]:
+        """Apply every rule to df (not modified) and report what each rule did"""
+        report = RuleReport(rows_in=len(df))
+        columns = _ColumnCache(df)
+
+        keep = None
+        for rule in self.filters:
+            started = time.perf_counter()
+            if not _has_columns(df, rule):
+                report.record(rule, None, started)
+                continue
+            mask = _evaluate(rule.spec['when'], columns)
+            keep = mask if keep is None else keep & mask
+            report.record(rule, int(len(mask) - np.count_nonzero(mask)), started)
+
+        if keep is not None and not keep.all():
+            df = df.take(np.flatnonzero(keep))
+            columns = columns.take(df, keep)
+        else:
+            # Shallow copy: rules replace whole columns, never write into the input's arrays
+            df = df.copy(deep=False)
+            columns.df = df
+
+        for rule in self.transforms:
+            started = time.perf_counter()
+            if not _has_columns(df, rule):
+                report.record(rule, None, started)
+                continue
+            hits = _TRANSFORMS[rule.type](df, rule, columns)
+            for column in rule.writes:
+                columns.invalidate(column)
+            report.record(rule, hits, started)
+
+        report.rows_out = len(df)
+        return df, report
+
+_PLAN_CACHE: Dict[str, RulePlan] = {}
+
+def get_rule_plan(table: str) -> RulePlan:
+    """Compiled plan for a table: rules from tables.yaml, else DEFAULT_RULES"""
+    plan = _PLAN_CACHE.get(table)
+    if plan is None:
+        table_config = (getattr(cfg, 'tables', None) or {}).get(table) or {}
+        rules = table_config.get('rules', DEFAULT_RULES.get(table, []))
+        plan = RulePlan(table, rules, getattr(cfg, 'dims', None))
+        _PLAN_CACHE[table] = plan
+    return plan
+
+@traced("silver_rules_{table}")
+def apply_rules(df: pd.DataFrame, table: str, run: Optional[ETLRun] = None) -> pd.DataFrame:
+    """Apply a table's silver rules, logging per-rule hits and timings when run is given"""
+    df, report = get_rule_plan(table).apply(df)
+
+    if run is not None:
+        duration_ms = run.current_span().elapsed_ms
+        run.log_step(f"silver_rules_{table}", "success",
+                    duration_ms=duration_ms,
+                    rows_in=report.rows_in,
+                    rows_out=report.rows_out,
+                    rules=report.rules)
+    return df
+
+def _compile_rule(spec: Dict[str, Any], position: int, dims: Dict[str, Any]) -> Rule:
+    """Validate one rule spec and resolve its columns and mapping"""
+    spec = dict(spec)
+    name = spec.get('name') or f"rule_{position}"
+    rule_type = spec.get('type')
+    if rule_type not in RULE_TYPES:
+        raise ValueError(f"Rule '{name}' has unknown type {rule_type!r}")
+
+    if rule_type == 'filter':
+        return Rule(name, rule_type, spec, _condition_columns(spec.get('when'), name))
+
+    if rule_type == 'map':
+        dimension = dims.get(spec['dimension']) if spec.get('dimension') else None
+        mapping = dimension.get('mapping') if isinstance(dimension, dict) else None
+        spec['mapping'] = mapping if mapping is not None else spec.get('mapping') or {}
+        return Rule(name, rule_type, spec, (spec['column'],), (spec['column'],))
+
+    if rule_type == 'cap':
+        spec['when'] = {'column': spec['column'], 'op': 'gt', 'value': spec['max']}
+        spec['columns'], spec['value'] = [spec['column']], spec['max']
+        return Rule(name, rule_type, spec, (spec['column'],), (spec['column'],))
+
+    reads = _condition_columns(spec.get('when'), name)
+    columns = tuple(spec.get('columns') or ())
+    return Rule(name, rule_type, spec, tuple(dict.fromkeys(reads + columns)), columns)
+
+def _condition_columns(condition: Optional[Dict[str, Any]], name: str) -> Tuple[str, ...]:
+    """Columns a condition reads (validating its ops)"""
+    if not condition:
+        raise ValueError(f"Rule '{name}' needs a 'when' condition")
+    for combinator in ('any', 'all'):
+        if combinator in condition:
+            columns = [col for sub in condition[combinator] for col in _condition_columns(sub, name)]
+            return tuple(dict.fromkeys(columns))
+    if condition.get('op') not in CONDITION_OPS:
+        raise ValueError(f"Rule '{name}' has unknown op {condition.get('op')!r}")
+    return (condition['column'],)
+
+def _has_columns(df: pd.DataFrame, rule: Rule) -> bool:
+    return all(column in df.columns for column in rule.reads)
+
+class _ColumnCache:
+    """Per-apply factorizations of string columns: codes plus upper-cased distinct values"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._upper: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def upper(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(codes, upper-cased uniques) like Series.str.upper(); non-strings become NaN"""
+        if column not in self._upper:
+            values = self.df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories.to_numpy()
+            else:
+                codes, uniques = pd.factorize(values)
+                uniques = np.asarray(uniques, dtype=object)
+            upper = np.array([value.upper() if isinstance(value, str) else np.nan
+                              for value in uniques], dtype=object)
+            self._upper[column] = (codes, upper)
+        return self._upper[column]
+
+    def take(self, df: pd.DataFrame, keep: np.ndarray) -> '_ColumnCache':
+        """Cache for the rows kept by a filter"""
+        taken = _ColumnCache(df)
+        taken._upper = {column: (codes[keep], upper) for column, (codes, upper) in self._upper.items()}
+        return taken
+
+    def invalidate(self, column: str) -> None:
+        self._upper.pop(column, None)
+
+def _evaluate(condition: Dict[str, Any], columns: _ColumnCache) -> np.ndarray:
+    """Boolean row mask for a condition (null values never match except for ne/notin)"""
+    if 'any' in condition:
+        return np.logical_or.reduce([_evaluate(sub, columns) for sub in condition['any']])
+    if 'all' in condition:
+        return np.logical_and.reduce([_evaluate(sub, columns) for sub in condition['all']])
+
+    op, value = condition['op'], condition.get('value')
+    if condition.get('upper'):
+        # Evaluate on the distinct upper-cased values, then broadcast through the codes
+        codes, upper = columns.upper(condition['column'])
+        matches = np.append(_compare(pd.Series(upper, dtype=object), op, value), op in ('ne', 'notin'))
+        return matches[codes]
+    return _compare(columns.df[condition['column']], op, value)
+
+def _compare(values: pd.Series, op: str, value: Any) -> np.ndarray:
+    if op == 'isin':
+        result = values.isin(value)
+    elif op == 'notin':
+        result = ~values.isin(value)
+    elif op == 'notna':
+        result = values.notna()
+    else:
+        result = getattr(values, op)(value)
+    return result.to_numpy(dtype=bool)
+
+def _apply_map(df: pd.DataFrame, rule: Rule, columns: _ColumnCache) -> int:
+    """Replace values through the mapping (upper-casing first when upper=True)"""
+    column, mapping = rule.spec['column'], rule.spec['mapping']
+    if rule.spec.get('upper'):
+        codes, uniques = columns.upper(column)
+        mapped = np.array([mapping.get(value, value) for value in uniques], dtype=object)
+        remapped = np.array([value in mapping for value in uniques], dtype=bool)
+        df[column] = np.append(mapped, np.nan)[codes]
+        return int(np.count_nonzero(np.append(remapped, False)[codes]))
+
+    hits = int(df[column].isin(list(mapping)).sum())
+    df[column] = df[column].replace(mapping)
+    return hits
+
+def _apply_set(df: pd.DataFrame, rule: Rule, columns: _ColumnCache) -> int:
+    """Set columns to value where the condition holds (dtype kept when nothing matches)"""
+    mask = _evaluate(rule.spec['when'], columns)
+    hits = int(np.count_nonzero(mask))
+    if hits:
+        value = rule.spec.get('value')
+        value = np.nan if value is None else value
+        for column in rule.spec['columns']:
+            df[column] = df[column].mask(mask, value)
+    return hits
+
+_TRANSFORMS = {'map': _apply_map, 'set': _apply_set, 'cap': _apply_set}
@@ -7,14 +7,15 @@ import numpy as np
 from typing import Dict, Any, List, Optional, Tuple
 from ..common.config import cfg
 from ..common.log import ETLRun
-from ..common.util import (
-    create_surrogate_key, validate_primary_key, validate_foreign_key,
-    calculate_data_quality_score
-)
+from ..common.quality import extend_profile, profile_frame
+from ..common.tracing import traced
+from ..common.util import create_surrogate_key, validate_primary_key, validate_foreign_key
+from .aggregates import TopValues, merge_top_values, top_distinct_values
+from .rules import apply_rules
 
+@traced("silver_conform")
 def to_silver(bronze_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd.DataFrame]:
     """Transform bronze data to silver layer with business rules"""
-    start_time = pd.Timestamp.now()
     silver_data = {}
 
     try:
@@ -43,7 +44,7 @@ def to_silver(bronze_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd
                 silver_data['interactions'], run
             )
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("silver_conform", "success",
                     duration_ms=duration_ms,
                     tables_created=len(silver_data))
@@ -58,17 +59,17 @@ def to_silver(bronze_data: Dict[str, pd.DataFrame], run: ETLRun) -> Dict[str, pd
         run.log_error("silver_conform", str(e))
         raise
 
+@traced()
 def conform_stores(stores_df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
     """Conform stores data to silver layer standards"""
     if stores_df.empty:
         return stores_df
 
-    start_time = pd.Timestamp.now()
     df = stores_df.copy()
 
     try:
-        # Apply business rules
-        df = _apply_store_business_rules(df)
+        # Apply business rules (compiled from config, see rules.py)
+        df = apply_rules(df, 'stores', run)
 
         # Create surrogate key
         df['store_key'] = create_surrogate_key(df, ['store_id'])
@@ -84,7 +85,7 @@ def conform_stores(stores_df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
         # Add silver metadata
         df = _add_silver_metadata(df, 'stores')
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("conform_stores", "success",
                     duration_ms=duration_ms, rows=len(df))
 
@@ -94,6 +95,7 @@ def conform_stores(stores_df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
         run.log_error("conform_stores", str(e))
         raise
 
+@traced()
 def conform_devices(devices_df: pd.DataFrame,
                    stores_df: Optional[pd.DataFrame],
                    run: ETLRun) -> pd.DataFrame:
@@ -101,12 +103,11 @@ def conform_devices(devices_df: pd.DataFrame,
     if devices_df.empty:
         return devices_df
 
-    start_time = pd.Timestamp.now()
     df = devices_df.copy()
 
     try:
-        # Apply business rules
-        df = _apply_device_business_rules(df)
+        # Apply business rules (compiled from config, see rules.py)
+        df = apply_rules(df, 'devices', run)
 
         # Create surrogate key
         df['device_key'] = create_surrogate_key(df, ['device_id'])
@@ -131,7 +132,7 @@ def conform_devices(devices_df: pd.DataFrame,
         # Add silver metadata
         df = _add_silver_metadata(df, 'devices')
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("conform_devices", "success",
                     duration_ms=duration_ms, rows=len(df))
 
@@ -141,6 +142,7 @@ def conform_devices(devices_df: pd.DataFrame,
         run.log_error("conform_devices", str(e))
         raise
 
+@traced()
 def conform_interactions(interactions_df: pd.DataFrame,
                         stores_df: Optional[pd.DataFrame],
                         devices_df: Optional[pd.DataFrame],
@@ -149,17 +151,11 @@ def conform_interactions(interactions_df: pd.DataFrame,
     if interactions_df.empty:
         return interactions_df
 
-    start_time = pd.Timestamp.now()
     df = interactions_df.copy()
 
     try:
-        # Apply business rules
-        df = _apply_interaction_business_rules(df)
-
-        # Create surrogate key
-        df['interaction_key'] = create_surrogate_key(
-            df, ['transaction_id', 'store_id', 'device_id']
-        )
+        # Apply business rules and create surrogate key
+        df = _conform_interaction_rows(df, run)
 
         # Validate foreign keys
         fk_validations = {}
@@ -178,13 +174,10 @@ def conform_interactions(interactions_df: pd.DataFrame,
         for fk_name, validation in fk_validations.items():
             run.log_metric(f"interactions_{fk_name}_fk_coverage", validation["coverage_pct"])
 
-        # Add derived columns
-        df = _add_interaction_derived_columns(df)
-
-        # Add silver metadata
-        df = _add_silver_metadata(df, 'interactions')
+        # Add derived columns and silver metadata
+        df = _finish_interaction_rows(df)
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("conform_interactions", "success",
                     duration_ms=duration_ms, rows=len(df))
 
@@ -194,20 +187,43 @@ def conform_interactions(interactions_df: pd.DataFrame,
         run.log_error("conform_interactions", str(e))
         raise
 
+def conform_interaction_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Conform one interactions frame (or one chunk) without FK checks or logging"""
+    if df.empty:
+        return df
+    return _finish_interaction_rows(_conform_interaction_rows(df.copy()))
+
+def _conform_interaction_rows(df: pd.DataFrame, run: Optional[ETLRun] = None) -> pd.DataFrame:
+    """Apply interaction business rules and create the surrogate key"""
+    df = apply_rules(df, 'interactions', run)
+
+    df['interaction_key'] = create_surrogate_key(
+        df, ['transaction_id', 'store_id', 'device_id']
+    )
+
+    return df
+
+def _finish_interaction_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Add derived columns and silver metadata to conformed interactions"""
+    df = _add_interaction_derived_columns(df)
+    return _add_silver_metadata(df, 'interactions')
+
+# Transaction-level grain for create_transaction_summary
+TRANSACTION_COLS = ['transaction_id', 'store_id', 'device_id',
+                    'transaction_date', 'transaction_timestamp', 'payment_method']
+
+# Summary list column -> (interaction column, distinct values kept)
+TOP_VALUE_COLUMNS = {'brands_purchased': ('brand', 5), 'categories_purchased': ('category', 3)}
+
+@traced()
 def create_transaction_summary(interactions_df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
     """Create transaction-level summary from interactions"""
     if interactions_df.empty:
         return pd.DataFrame()
 
-    start_time = pd.Timestamp.now()
-
     try:
-        # Group by transaction to create summary
-        transaction_cols = ['transaction_id', 'store_id', 'device_id',
-                           'transaction_date', 'transaction_timestamp', 'payment_method']
-
         # Check which columns exist
-        existing_cols = [col for col in transaction_cols if col in interactions_df.columns]
+        existing_cols = [col for col in TRANSACTION_COLS if col in interactions_df.columns]
 
         if not existing_cols:
             run.log_step("create_transaction_summary", "skipped",
@@ -215,31 +231,10 @@ def create_transaction_summary(interactions_df: pd.DataFrame, run: ETLRun) -> pd
             return pd.DataFrame()
 
         # Aggregate interactions to transactions
-        df = (interactions_df.groupby(existing_cols, as_index=False)
-              .agg({
-                  'quantity': 'sum',
-                  'total_amount': 'sum',
-                  'product_name': 'count',  # Item count
-                  'brand': lambda x: '|'.join(x.unique()[:5]),  # Top 5 brands
-                  'category': lambda x: '|'.join(x.unique()[:3])  # Top 3 categories
-              })
-              .rename(columns={
-                  'product_name': 'item_count',
-                  'brand': 'brands_purchased',
-                  'category': 'categories_purchased'
-              }))
-
-        # Add derived metrics
-        df['avg_item_price'] = df['total_amount'] / df['quantity']
-        df['basket_size'] = df['item_count']
-
-        # Create surrogate key
-        df['transaction_key'] = create_surrogate_key(df, ['transaction_id'])
+        df = summarize_transactions(interactions_df, existing_cols)
+        df = finish_transaction_summary(df)
 
-        # Add silver metadata
-        df = _add_silver_metadata(df, 'transactions')
-
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("create_transaction_summary", "success",
                     duration_ms=duration_ms, rows=len(df))
 
@@ -249,80 +244,76 @@ def create_transaction_summary(interactions_df: pd.DataFrame, run: ETLRun) -> pd
         run.log_error("create_transaction_summary", str(e))
         raise
 
-def _apply_store_business_rules(df: pd.DataFrame) -> pd.DataFrame:
-    """Apply business rules to stores data"""
-    # Filter active stores only
-    if 'status' in df.columns:
-        df = df[df['status'].str.upper().isin(['ACTIVE', 'OPEN'])]
-
-    # Standardize region names
-    if 'region' in df.columns:
-        region_mapping = {
-            'METRO MANILA': 'NCR',
-            'NATIONAL CAPITAL REGION': 'NCR',
-            'REGION 4A': 'CALABARZON',
-            'REGION IV-A': 'CALABARZON'
-        }
-        df['region'] = df['region'].str.upper().replace(region_mapping)
-
-    # Validate coordinates
-    if 'latitude' in df.columns and 'longitude' in df.columns:
-        # Philippines coordinate bounds
-        df.loc[
-            (df['latitude'] < 4.0) | (df['latitude'] > 21.0) |
-            (df['longitude'] < 116.0) | (df['longitude'] > 127.0),
-            ['latitude', 'longitude']
-        ] = np.nan
-
-    return df
-
-def _apply_device_business_rules(df: pd.DataFrame) -> pd.DataFrame:
-    """Apply business rules to devices data"""
-    # Filter active devices only
-    if 'status' in df.columns:
-        df = df[df['status'].str.upper() == 'ACTIVE']
-
-    # Standardize device types
-    if 'device_type' in df.columns:
-        device_type_mapping = {
-            'POINT OF SALE': 'POS',
-            'SELF CHECKOUT': 'SELF-CHECKOUT',
-            'MOBILE POS': 'MOBILE',
-            'INFORMATION KIOSK': 'KIOSK'
-        }
-        df['device_type'] = df['device_type'].str.upper().replace(device_type_mapping)
-
-    return df
-
-def _apply_interaction_business_rules(df: pd.DataFrame) -> pd.DataFrame:
-    """Apply business rules to interactions data"""
-    # Filter valid transactions
-    if 'total_amount' in df.columns:
-        df = df[df['total_amount'] > 0]
-
-    if 'quantity' in df.columns:
-        df = df[df['quantity'] > 0]
-
-    # Standardize payment methods
-    if 'payment_method' in df.columns:
-        payment_mapping = {
-            'CREDIT CARD': 'CARD',
-            'DEBIT CARD': 'CARD',
-            'CREDIT': 'CARD',
-            'GCASH': 'DIGITAL',
-            'PAYMAYA': 'DIGITAL',
-            'GRABPAY': 'DIGITAL'
-        }
-        df['payment_method'] = df['payment_method'].str.upper().replace(payment_mapping)
-
-    # Cap extreme values
-    if 'quantity' in df.columns:
-        df.loc[df['quantity'] > 100, 'quantity'] = 100  # Cap quantity at 100
-
-    if 'unit_price' in df.columns:
-        df.loc[df['unit_price'] > 10000, 'unit_price'] = np.nan  # Cap unit price
-
-    return df
+def summarize_transactions(interactions_df: pd.DataFrame, existing_cols: List[str]) -> pd.DataFrame:
+    """Group interactions into per-transaction totals
+
+    The '|'-joined columns hold the first distinct brands (5) and
+    categories (3) of each transaction in first-seen order.
+    """
+    return join_top_values(*summarize_transaction_values(interactions_df, existing_cols))
+
+def summarize_transaction_values(interactions_df: pd.DataFrame,
+                                 existing_cols: List[str]) -> Tuple[pd.DataFrame, Dict[str, TopValues]]:
+    """summarize_transactions with the brand/category lists as code matrices
+
+    The TopValues rows align with the summary rows, so chunk results can be
+    merged on codes (merge_transaction_summaries) and joined into strings
+    only at the end (join_top_values).
+    """
+    grouped = interactions_df.groupby(existing_cols, as_index=False, observed=True)
+    summary = (grouped
+               .agg({
+                   'quantity': 'sum',
+                   'total_amount': 'sum',
+                   'product_name': 'count'  # Item count
+               })
+               .rename(columns={'product_name': 'item_count'}))
+
+    # Rows with a null grouping key belong to no transaction
+    group_codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+
+    top_values = {name: top_distinct_values(group_codes, len(summary), interactions_df[column], limit)
+                  for name, (column, limit) in TOP_VALUE_COLUMNS.items()}
+    return summary, top_values
+
+def merge_transaction_summaries(partials: List[Tuple[pd.DataFrame, Dict[str, TopValues]]],
+                                existing_cols: List[str]) -> Tuple[pd.DataFrame, Dict[str, TopValues]]:
+    """Combine summarize_transaction_values outputs from separate chunks
+
+    Partials must be in chunk order; brand/category lists keep first-seen
+    order, like the batch path.
+    """
+    combined = pd.concat([summary for summary, _ in partials], ignore_index=True)
+    grouped = combined.groupby(existing_cols, as_index=False, sort=False, observed=True)
+    summary = grouped.agg({
+        'quantity': 'sum',
+        'total_amount': 'sum',
+        'item_count': 'sum'
+    })
+
+    group_codes = grouped.ngroup().to_numpy(dtype=np.int64)
+    top_values = {name: merge_top_values([values[name] for _, values in partials],
+                                         group_codes, len(summary), limit)
+                  for name, (_, limit) in TOP_VALUE_COLUMNS.items()}
+    return summary, top_values
+
+def join_top_values(summary: pd.DataFrame, top_values: Dict[str, TopValues]) -> pd.DataFrame:
+    """Add the '|'-joined brand/category columns to a transaction summary"""
+    for name, values in top_values.items():
+        summary[name] = values.joined('|')
+    return summary
+
+def finish_transaction_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """Add derived metrics, surrogate key and metadata to a transaction summary"""
+    # Add derived metrics
+    df['avg_item_price'] = df['total_amount'] / df['quantity']
+    df['basket_size'] = df['item_count']
+
+    # Create surrogate key
+    df['transaction_key'] = create_surrogate_key(df, ['transaction_id'])
+
+    # Add silver metadata
+    return _add_silver_metadata(df, 'transactions')
 
 def _add_interaction_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Add derived columns to interactions"""
@@ -353,7 +344,10 @@ def _add_silver_metadata(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
 
     df['_silver_table'] = table_name
     df['_silver_loaded_at'] = pd.Timestamp.now()
-    df['_silver_quality_score'] = calculate_data_quality_score(df)["completeness"]
+    df['_silver_quality_score'] = profile_frame(df).completeness()
+
+    # The score column is constant, so validation reuses this profile
+    extend_profile(df, ['_silver_quality_score'])
 
     return df
 
@@ -376,10 +370,10 @@ def validate_silver_data(silver_data: Dict[str, pd.DataFrame], run: ETLRun) -> b
             validation_passed = False
 
         # Check data quality
-        quality = calculate_data_quality_score(df)
-        if quality["completeness"] < 0.8:  # 80% completeness threshold
+        completeness = profile_frame(df).completeness()
+        if completeness < 0.8:  # 80% completeness threshold
             run.log_error(f"silver_validation_{table_name}",
-                         f"Low data quality: {quality['completeness']:.2%}")
+                         f"Low data quality: {completeness:.2%}")
             validation_passed = False
 
         # Check for required business rules
@@ -389,6 +383,6 @@ def validate_silver_data(silver_data: Dict[str, pd.DataFrame], run: ETLRun) -> b
                 run.log_error(f"silver_validation_{table_name}",
                              f"Found {inactive_count} inactive stores")
 
-        run.log_metric(f"silver_{table_name}_quality_score", quality["completeness"])
+        run.log_metric(f"silver_{table_name}_quality_score", completeness)
 
     return validation_passed
\ No newline at end of file
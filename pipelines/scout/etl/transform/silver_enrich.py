@@ -7,59 +7,64 @@ import numpy as np
 from typing import Dict, Any, List, Optional
 from ..common.config import cfg
 from ..common.log import ETLRun
-from ..common.util import create_surrogate_key, calculate_data_quality_score
-
+from ..common.quality import profile_frame
+from ..common.tracing import traced
+from ..common.util import create_surrogate_key, ensure_datetime
+from .aggregates import AggregationPlan
+from .lookups import EnrichmentIndex
+
+# Store/device columns attached to interactions during enrichment
+STORE_LOOKUP_COLUMNS = ['store_id', 'store_name', 'store_type', 'region',
+                        'province', 'city', 'barangay', 'latitude', 'longitude']
+DEVICE_LOOKUP_COLUMNS = ['device_id', 'device_name', 'device_type',
+                         'location_in_store', 'serial_number']
+
+# Per-customer metrics behind the customer segments table
+CUSTOMER_METRICS_PLAN = (
+    AggregationPlan()
+    .add('customer_id', 'total_revenue', 'sum', 'total_amount')
+    .add('customer_id', 'avg_transaction_value', 'mean', 'total_amount')
+    .add('customer_id', 'transaction_count', 'count', 'total_amount')
+    .add('customer_id', 'total_quantity', 'sum', 'quantity')
+    .add('customer_id', 'first_purchase', 'min', 'transaction_date')
+    .add('customer_id', 'last_purchase', 'max', 'transaction_date')
+    .add_distinct('customer_id', 'brands_purchased', 'brand',
+                  approximate='brands_purchased' in cfg.approx_distinct, sketch=True)
+    .add_distinct('customer_id', 'categories_purchased', 'category',
+                  approximate='categories_purchased' in cfg.approx_distinct, sketch=True)
+    .add_distinct('customer_id', 'stores_visited', 'store_id',
+                  approximate='stores_visited' in cfg.approx_distinct, sketch=True)
+)
+
+# RFM score labels per quintile, lowest quintile first (recent customers score high)
+RECENCY_LABELS = [5, 4, 3, 2, 1]
+SCORE_LABELS = [1, 2, 3, 4, 5]
+
+@traced()
 def enrich_interactions(silver_data: Dict[str, pd.DataFrame], run: ETLRun) -> pd.DataFrame:
     """Enrich interactions with store and device information"""
     if 'interactions' not in silver_data or silver_data['interactions'].empty:
         run.log_step("enrich_interactions", "skipped", note="No interactions data")
         return pd.DataFrame()
 
-    start_time = pd.Timestamp.now()
-
     try:
-        interactions_df = silver_data['interactions'].copy()
+        interactions_df = silver_data['interactions']
         stores_df = silver_data.get('stores', pd.DataFrame())
         devices_df = silver_data.get('devices', pd.DataFrame())
 
-        # Start with base interactions
-        enriched_df = interactions_df.copy()
-
-        # Enrich with store data
-        if not stores_df.empty:
-            enriched_df = _enrich_with_store_data(enriched_df, stores_df, run)
-
-        # Enrich with device data
-        if not devices_df.empty:
-            enriched_df = _enrich_with_device_data(enriched_df, devices_df, run)
-
-        # Add customer insights (demographic mapping)
-        enriched_df = _add_customer_insights(enriched_df, run)
-
-        # Add business metrics
-        enriched_df = _add_business_metrics(enriched_df, run)
-
-        # Add temporal enrichments
-        enriched_df = _add_temporal_enrichments(enriched_df, run)
-
-        # Update surrogate key for enriched data
-        enriched_df['interaction_enriched_key'] = create_surrogate_key(
-            enriched_df, ['transaction_id', 'store_id', 'device_id']
-        )
+        # Whole-dataset aggregates (brand/category stats, customer frequency)
+        lookups = build_enrichment_lookups(interactions_df)
 
-        # Add enrichment metadata
-        enriched_df['_enriched_at'] = pd.Timestamp.now()
-        enriched_df['_enrichment_source'] = 'silver_enrich'
+        enriched_df = enrich_frame(interactions_df, stores_df, devices_df, run, lookups)
 
-        duration_ms = int((pd.Timestamp.now() - start_time).total_seconds() * 1000)
+        duration_ms = run.current_span().elapsed_ms
         run.log_step("enrich_interactions", "success",
                     duration_ms=duration_ms,
                     rows=len(enriched_df),
                     columns=len(enriched_df.columns))
 
         # Log enrichment metrics
-        quality = calculate_data_quality_score(enriched_df)
-        run.log_metric("enriched_interactions_quality", quality["completeness"])
+        run.log_metric("enriched_interactions_quality", profile_frame(enriched_df).completeness())
         run.log_metric("enriched_interactions_columns", len(enriched_df.columns))
 
         return enriched_df
@@ -68,53 +73,159 @@ def enrich_interactions(silver_data: Dict[str, pd.DataFrame], run: ETLRun) -> pd
         run.log_error("enrich_interactions", str(e))
         raise
 
-def _enrich_with_store_data(interactions_df: pd.DataFrame,
-                           stores_df: pd.DataFrame,
-                           run: ETLRun) -> pd.DataFrame:
-    """Enrich interactions with store information"""
-    # Prepare store lookup data
-    store_lookup = stores_df[['store_id', 'store_name', 'store_type', 'region',
-                             'province', 'city', 'barangay', 'latitude', 'longitude']].copy()
+def enrich_frame(interactions_df: pd.DataFrame,
+                 stores_df: pd.DataFrame,
+                 devices_df: pd.DataFrame,
+                 run: Optional[ETLRun],
+                 lookups: Optional[Dict[str, Any]] = None,
+                 index: Optional[EnrichmentIndex] = None) -> pd.DataFrame:
+    """Enrich one interactions frame (or one chunk)
 
-    # Rename columns to avoid conflicts
-    store_lookup.columns = ['store_id'] + [f'store_{col}' for col in store_lookup.columns[1:]]
+    lookups holds the whole-dataset aggregates from build_enrichment_lookups;
+    when it is None the aggregate-dependent columns are left out. Store,
+    device and aggregate columns are attached by positional take through an
+    EnrichmentIndex (pass a prebuilt one to reuse it across chunks), and the
+    output frame is assembled once from the collected columns. Pass
+    run=None to skip per-call metrics when enriching chunks.
+    """
+    if index is None:
+        index = build_enrichment_index(stores_df, devices_df, lookups)
 
-    # Merge with interactions
-    enriched_df = interactions_df.merge(store_lookup, on='store_id', how='left')
+    columns: Dict[str, Any] = {}
 
-    # Calculate store metrics
-    store_match_rate = (enriched_df['store_name'].notna().sum() / len(enriched_df)) * 100
-    run.log_metric("store_enrichment_match_rate", round(store_match_rate, 2))
+    # Enrich with store data
+    _enrich_with_store_data(interactions_df, index, columns, run)
+
+    # Enrich with device data
+    _enrich_with_device_data(interactions_df, index, columns, run)
+
+    # Add customer insights (demographic mapping)
+    _add_customer_insights(interactions_df, index, columns)
+
+    # Add business metrics
+    _add_business_metrics(interactions_df, index, columns)
+
+    # Add temporal enrichments
+    _add_temporal_enrichments(interactions_df, columns)
+
+    enriched_df = _assemble(interactions_df, columns)
+
+    # Update surrogate key for enriched data
+    enriched_df['interaction_enriched_key'] = create_surrogate_key(
+        enriched_df, ['transaction_id', 'store_id', 'device_id']
+    )
+
+    # Add enrichment metadata
+    enriched_df['_enriched_at'] = pd.Timestamp.now()
+    enriched_df['_enrichment_source'] = 'silver_enrich'
 
     return enriched_df
 
-def _enrich_with_device_data(interactions_df: pd.DataFrame,
-                            devices_df: pd.DataFrame,
-                            run: ETLRun) -> pd.DataFrame:
-    """Enrich interactions with device information"""
-    # Prepare device lookup data
-    device_lookup = devices_df[['device_id', 'device_name', 'device_type',
-                               'location_in_store', 'serial_number']].copy()
+def build_enrichment_index(stores_df: Optional[pd.DataFrame],
+                           devices_df: Optional[pd.DataFrame],
+                           lookups: Optional[Dict[str, Any]] = None) -> EnrichmentIndex:
+    """Lookup index for enrich_frame; store/device lookups are cached by table content"""
+    return EnrichmentIndex(stores_df, devices_df, lookups,
+                           STORE_LOOKUP_COLUMNS, DEVICE_LOOKUP_COLUMNS)
 
-    # Rename columns to avoid conflicts
-    device_lookup.columns = ['device_id'] + [f'device_{col}' for col in device_lookup.columns[1:]]
+def build_enrichment_lookups(df: pd.DataFrame) -> Dict[str, Any]:
+    """Compute the whole-dataset aggregates used by enrichment"""
+    plan = enrichment_plan(df.columns)
+    return enrichment_lookups(plan.execute(df))
 
-    # Merge with interactions
-    enriched_df = interactions_df.merge(device_lookup, on='device_id', how='left')
+def enrichment_plan(columns: List[str]) -> AggregationPlan:
+    """Keyed aggregates behind the enrichment lookups, for the available columns"""
+    plan = AggregationPlan()
 
-    # Calculate device metrics
-    device_match_rate = (enriched_df['device_name'].notna().sum() / len(enriched_df)) * 100
-    run.log_metric("device_enrichment_match_rate", round(device_match_rate, 2))
+    if 'customer_id' in columns:
+        plan.add('customer_id', 'customer_frequency', 'size')
+
+    if 'brand' in columns and 'total_amount' in columns:
+        plan.add('brand', 'brand_total_revenue', 'sum', 'total_amount')
+        plan.add('brand', 'brand_transaction_count', 'count', 'total_amount')
+        plan.add('brand', 'brand_avg_transaction', 'mean', 'total_amount')
+
+    if 'category' in columns:
+        plan.add('category', 'category_total_revenue', 'sum', 'total_amount')
+        plan.add('category', 'category_avg_transaction', 'mean', 'total_amount')
+        plan.add('category', 'category_avg_quantity', 'mean', 'quantity')
+
+    if 'transaction_id' in columns and 'brand' in columns:
+        # Count unique brands per transaction
+        plan.add_distinct('transaction_id', 'brands_in_basket', 'brand',
+                          approximate='brands_in_basket' in cfg.approx_distinct)
+
+    return plan
+
+def enrichment_lookups(aggregates: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """Shape executed enrichment_plan aggregates into the lookups enrich_frame expects"""
+    lookups = {}
 
+    if 'customer_id' in aggregates:
+        lookups['customer_frequency'] = aggregates['customer_id']['customer_frequency']
+
+    if 'brand' in aggregates:
+        lookups['brand_stats'] = aggregates['brand']
+
+    if 'category' in aggregates:
+        lookups['category_stats'] = aggregates['category'].round(2)
+
+    if 'transaction_id' in aggregates:
+        lookups['brands_in_basket'] = aggregates['transaction_id']['brands_in_basket']
+
+    return lookups
+
+def _assemble(interactions_df: pd.DataFrame, columns: Dict[str, Any]) -> pd.DataFrame:
+    """Interactions plus the collected columns, built with a single concat
+
+    Columns that already exist in the interactions are overwritten in place.
+    """
+    # Series are aligned on the interactions index, taken arrays by position
+    collected = pd.DataFrame(columns, index=interactions_df.index)
+    replaced = [col for col in collected.columns if col in interactions_df.columns]
+
+    enriched_df = pd.concat([interactions_df, collected.drop(columns=replaced)], axis=1)
+    for col in replaced:
+        enriched_df[col] = collected[col]
+    enriched_df.index = pd.RangeIndex(len(enriched_df))
     return enriched_df
 
-def _add_customer_insights(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
-    """Add customer demographic insights"""
-    enriched_df = df.copy()
+def _enrich_with_store_data(interactions_df: pd.DataFrame,
+                           index: EnrichmentIndex,
+                           columns: Dict[str, Any],
+                           run: Optional[ETLRun]) -> None:
+    """Attach store information"""
+    if index.store is None or 'store_id' not in interactions_df.columns:
+        return
+
+    columns.update(index.store.attach(interactions_df['store_id']))
+
+    # Calculate store metrics
+    if run is not None and len(interactions_df):
+        store_match_rate = (pd.notna(columns['store_store_name']).sum() / len(interactions_df)) * 100
+        run.log_metric("store_enrichment_match_rate", round(store_match_rate, 2))
+
+def _enrich_with_device_data(interactions_df: pd.DataFrame,
+                            index: EnrichmentIndex,
+                            columns: Dict[str, Any],
+                            run: Optional[ETLRun]) -> None:
+    """Attach device information"""
+    if index.device is None or 'device_id' not in interactions_df.columns:
+        return
+
+    columns.update(index.device.attach(interactions_df['device_id']))
+
+    # Calculate device metrics
+    if run is not None and len(interactions_df):
+        device_match_rate = (pd.notna(columns['device_device_name']).sum() / len(interactions_df)) * 100
+        run.log_metric("device_enrichment_match_rate", round(device_match_rate, 2))
 
+def _add_customer_insights(df: pd.DataFrame, index: EnrichmentIndex,
+                           columns: Dict[str, Any]) -> None:
+    """Add customer demographic insights"""
     # Age group mapping (if age data exists)
     if 'age' in df.columns:
-        enriched_df['age_group'] = pd.cut(
+        columns['age_group'] = pd.cut(
             df['age'],
             bins=[0, 18, 25, 35, 45, 55, 65, 100],
             labels=['<18', '18-24', '25-34', '35-44', '45-54', '55-64', '65+']
@@ -127,34 +238,29 @@ def _add_customer_insights(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
             'MALE': 'Male', 'FEMALE': 'Female',
             '1': 'Male', '0': 'Female'
         }
-        enriched_df['gender_normalized'] = df['gender'].astype(str).str.upper().map(gender_mapping)
+        columns['gender_normalized'] = df['gender'].astype(str).str.upper().map(gender_mapping)
 
     # Purchase behavior segmentation
     if 'total_amount' in df.columns:
-        enriched_df['purchase_segment'] = pd.cut(
+        columns['purchase_segment'] = pd.cut(
             df['total_amount'],
             bins=[0, 50, 150, 500, 1000, float('inf')],
             labels=['Low', 'Medium', 'High', 'Premium', 'VIP']
         )
 
     # Frequency indicators (simplified for demo)
-    if 'customer_id' in df.columns:
-        customer_freq = df.groupby('customer_id').size()
-        freq_mapping = customer_freq.to_dict()
-        enriched_df['customer_frequency'] = df['customer_id'].map(freq_mapping)
+    if 'customer_id' in df.columns and 'customer_frequency' in index.aggregates:
+        columns.update(index.aggregates['customer_frequency'].attach(df['customer_id']))
 
-        enriched_df['frequency_segment'] = pd.cut(
-            enriched_df['customer_frequency'],
+        columns['frequency_segment'] = pd.cut(
+            columns['customer_frequency'],
             bins=[0, 1, 3, 10, float('inf')],
             labels=['One-time', 'Occasional', 'Regular', 'Frequent']
         )
 
-    return enriched_df
-
-def _add_business_metrics(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
+def _add_business_metrics(df: pd.DataFrame, index: EnrichmentIndex,
+                          columns: Dict[str, Any]) -> None:
     """Add business intelligence metrics"""
-    enriched_df = df.copy()
-
     # Margin calculation (simplified - would need cost data in production)
     if 'total_amount' in df.columns and 'category' in df.columns:
         # Simplified margin assumptions by category
@@ -166,71 +272,45 @@ def _add_business_metrics(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
             'CLOTHING': 0.50
         }
 
-        enriched_df['estimated_margin_rate'] = df['category'].str.upper().map(margin_mapping).fillna(0.25)
-        enriched_df['estimated_margin'] = df['total_amount'] * enriched_df['estimated_margin_rate']
+        columns['estimated_margin_rate'] = df['category'].str.upper().map(margin_mapping).fillna(0.25)
+        columns['estimated_margin'] = df['total_amount'] * columns['estimated_margin_rate']
 
     # Brand performance indicators
-    if 'brand' in df.columns and 'total_amount' in df.columns:
-        brand_performance = df.groupby('brand')['total_amount'].agg(['sum', 'count', 'mean'])
-        brand_performance.columns = ['brand_total_revenue', 'brand_transaction_count', 'brand_avg_transaction']
-
-        enriched_df = enriched_df.merge(
-            brand_performance.reset_index(),
-            on='brand',
-            how='left'
-        )
+    if 'brand' in df.columns and 'brand_stats' in index.aggregates:
+        columns.update(index.aggregates['brand_stats'].attach(df['brand']))
 
     # Category insights
-    if 'category' in df.columns:
-        category_stats = df.groupby('category').agg({
-            'total_amount': ['sum', 'mean'],
-            'quantity': 'mean'
-        }).round(2)
-
-        category_stats.columns = ['category_total_revenue', 'category_avg_transaction', 'category_avg_quantity']
-
-        enriched_df = enriched_df.merge(
-            category_stats.reset_index(),
-            on='category',
-            how='left'
-        )
+    if 'category' in df.columns and 'category_stats' in index.aggregates:
+        columns.update(index.aggregates['category_stats'].attach(df['category']))
 
     # Cross-selling indicators
-    if 'transaction_id' in df.columns and 'brand' in df.columns:
-        # Count unique brands per transaction
-        brand_count = df.groupby('transaction_id')['brand'].nunique().reset_index()
-        brand_count.columns = ['transaction_id', 'brands_in_basket']
-
-        enriched_df = enriched_df.merge(brand_count, on='transaction_id', how='left')
+    if 'transaction_id' in df.columns and 'brands_in_basket' in index.aggregates:
+        columns.update(index.aggregates['brands_in_basket'].attach(df['transaction_id']))
 
         # Cross-selling flag
-        enriched_df['is_cross_sell'] = (enriched_df['brands_in_basket'] > 1).astype(bool)
+        columns['is_cross_sell'] = columns['brands_in_basket'] > 1
 
-    return enriched_df
-
-def _add_temporal_enrichments(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
+def _add_temporal_enrichments(df: pd.DataFrame, columns: Dict[str, Any]) -> None:
     """Add time-based enrichments"""
-    enriched_df = df.copy()
-
     if 'transaction_date' in df.columns:
         transaction_date = pd.to_datetime(df['transaction_date'])
 
         # Day classifications
-        enriched_df['is_weekend'] = transaction_date.dt.weekday >= 5
-        enriched_df['is_month_end'] = transaction_date.dt.day >= 25
-        enriched_df['is_month_start'] = transaction_date.dt.day <= 7
+        columns['is_weekend'] = transaction_date.dt.weekday >= 5
+        columns['is_month_end'] = transaction_date.dt.day >= 25
+        columns['is_month_start'] = transaction_date.dt.day <= 7
 
         # Season mapping (Philippines context)
-        enriched_df['season'] = transaction_date.dt.month.map({
+        columns['season'] = transaction_date.dt.month.map({
             12: 'Dry', 1: 'Dry', 2: 'Dry', 3: 'Hot Dry', 4: 'Hot Dry', 5: 'Hot Dry',
             6: 'Wet', 7: 'Wet', 8: 'Wet', 9: 'Wet', 10: 'Wet', 11: 'Dry'
         })
 
         # Holiday indicators (simplified)
-        enriched_df['is_holiday_season'] = transaction_date.dt.month.isin([11, 12, 1])
+        columns['is_holiday_season'] = transaction_date.dt.month.isin([11, 12, 1])
 
         # Payroll periods (15th and 30th)
-        enriched_df['is_payday_period'] = (
+        columns['is_payday_period'] = (
             (transaction_date.dt.day.between(13, 17)) |
             (transaction_date.dt.day.between(28, 31))
         )
@@ -239,20 +319,19 @@ def _add_temporal_enrichments(df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
         transaction_ts = pd.to_datetime(df['transaction_timestamp'])
 
         # Hour-based classifications
-        enriched_df['hour'] = transaction_ts.dt.hour
-        enriched_df['is_peak_hour'] = transaction_ts.dt.hour.isin([11, 12, 13, 17, 18, 19])  # Lunch & dinner
-        enriched_df['is_business_hour'] = transaction_ts.dt.hour.between(9, 21)
+        columns['hour'] = transaction_ts.dt.hour
+        columns['is_peak_hour'] = transaction_ts.dt.hour.isin([11, 12, 13, 17, 18, 19])  # Lunch & dinner
+        columns['is_business_hour'] = transaction_ts.dt.hour.between(9, 21)
 
         # Shift classifications
-        enriched_df['work_shift'] = pd.cut(
+        columns['work_shift'] = pd.cut(
             transaction_ts.dt.hour,
             bins=[0, 6, 14, 22, 24],
             labels=['Night', 'Morning', 'Afternoon', 'Evening'],
             include_lowest=True
         )
 
-    return enriched_df
-
+@traced()
 def create_customer_segments(enriched_df: pd.DataFrame, run: ETLRun) -> pd.DataFrame:
     """Create customer segmentation table"""
     if enriched_df.empty or 'customer_id' not in enriched_df.columns:
@@ -260,31 +339,11 @@ def create_customer_segments(enriched_df: pd.DataFrame, run: ETLRun) -> pd.DataF
         return pd.DataFrame()
 
     try:
-        # Aggregate customer metrics
-        customer_metrics = enriched_df.groupby('customer_id').agg({
-            'total_amount': ['sum', 'mean', 'count'],
-            'quantity': 'sum',
-            'transaction_date': ['min', 'max'],
-            'brand': 'nunique',
-            'category': 'nunique',
-            'store_id': 'nunique'
-        }).round(2)
-
-        customer_metrics.columns = [
-            'total_revenue', 'avg_transaction_value', 'transaction_count',
-            'total_quantity', 'first_purchase', 'last_purchase',
-            'brands_purchased', 'categories_purchased', 'stores_visited'
-        ]
+        # Aggregate customer metrics (one factorization of customer_id for all columns)
+        customer_metrics = CUSTOMER_METRICS_PLAN.execute(enriched_df)['customer_id'].round(2)
 
         # Calculate derived metrics
-        customer_metrics['days_active'] = (
-            pd.to_datetime(customer_metrics['last_purchase']) -
-            pd.to_datetime(customer_metrics['first_purchase'])
-        ).dt.days + 1
-
-        customer_metrics['avg_days_between_visits'] = (
-            customer_metrics['days_active'] / customer_metrics['transaction_count']
-        )
+        add_activity_metrics(customer_metrics)
 
         # RFM Segmentation
         customer_metrics['recency_days'] = (
@@ -293,27 +352,16 @@ def create_customer_segments(enriched_df: pd.DataFrame, run: ETLRun) -> pd.DataF
 
         # Create RFM scores (1-5 scale)
         customer_metrics['recency_score'] = pd.qcut(
-            customer_metrics['recency_days'], q=5, labels=[5, 4, 3, 2, 1]
+            customer_metrics['recency_days'], q=5, labels=RECENCY_LABELS
         )
         customer_metrics['frequency_score'] = pd.qcut(
-            customer_metrics['transaction_count'], q=5, labels=[1, 2, 3, 4, 5]
+            customer_metrics['transaction_count'], q=5, labels=SCORE_LABELS
         )
         customer_metrics['monetary_score'] = pd.qcut(
-            customer_metrics['total_revenue'], q=5, labels=[1, 2, 3, 4, 5]
+            customer_metrics['total_revenue'], q=5, labels=SCORE_LABELS
         )
 
-        # Combine RFM into segments
-        customer_metrics['rfm_score'] = (
-            customer_metrics['recency_score'].astype(str) +
-            customer_metrics['frequency_score'].astype(str) +
-            customer_metrics['monetary_score'].astype(str)
-        )
-
-        # Add surrogate key
-        customer_metrics = customer_metrics.reset_index()
-        customer_metrics['customer_segment_key'] = create_surrogate_key(
-            customer_metrics, ['customer_id']
-        )
+        customer_metrics = finish_customer_segments(customer_metrics)
 
         run.log_step("create_customer_segments", "success", rows=len(customer_metrics))
         run.log_metric("customer_segments_created", len(customer_metrics))
@@ -322,4 +370,39 @@ def create_customer_segments(enriched_df: pd.DataFrame, run: ETLRun) -> pd.DataF
 
     except Exception as e:
         run.log_error("create_customer_segments", str(e))
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+def add_activity_metrics(customer_metrics: pd.DataFrame) -> None:
+    """Add days_active and avg_days_between_visits to per-customer metrics"""
+    customer_metrics['days_active'] = (
+        ensure_datetime(customer_metrics['last_purchase']) -
+        ensure_datetime(customer_metrics['first_purchase'])
+    ).dt.days + 1
+
+    customer_metrics['avg_days_between_visits'] = (
+        customer_metrics['days_active'] / customer_metrics['transaction_count']
+    )
+
+def finish_customer_segments(customer_metrics: pd.DataFrame,
+                             segment_keys: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Combine RFM scores into segments and add the surrogate key
+
+    segment_keys (aligned with the customer index) reuses keys computed
+    earlier instead of hashing every customer again.
+    """
+    # Combine RFM into segments
+    customer_metrics['rfm_score'] = (
+        customer_metrics['recency_score'].astype(str) +
+        customer_metrics['frequency_score'].astype(str) +
+        customer_metrics['monetary_score'].astype(str)
+    )
+
+    # Add surrogate key
+    customer_metrics = customer_metrics.reset_index()
+    if segment_keys is not None:
+        customer_metrics['customer_segment_key'] = segment_keys.to_numpy()
+    else:
+        customer_metrics['customer_segment_key'] = create_surrogate_key(
+            customer_metrics, ['customer_id']
+        )
+    return customer_metrics
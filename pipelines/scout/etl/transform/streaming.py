@@ -0,0 +1,216 @@
+"""
+Streaming execution mode for Scout ETL Pipeline
+Push fixed-size chunks of interactions through bronze -> silver -> enrich
+"""
+import pandas as pd
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Callable, Union
+from ..common.config import cfg
+from ..common.log import ETLRun
+from ..common.io import dataframe_chunks
+from .bronze_normalize import normalize_source_data, normalize_frame
+from .silver_conform import (
+    conform_stores, conform_devices, conform_interaction_frame,
+    summarize_transaction_values, merge_transaction_summaries, join_top_values,
+    finish_transaction_summary,
+    TRANSACTION_COLS
+)
+from .aggregates import AggregationPlan
+from .silver_enrich import (
+    enrich_frame, build_enrichment_index, enrichment_plan, enrichment_lookups
+)
+
+ChunkSource = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+def iter_chunks(source: ChunkSource, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Yield chunks from a DataFrame or pass through an iterable of chunks"""
+    if isinstance(source, pd.DataFrame):
+        yield from dataframe_chunks(source, chunk_size or cfg.stream_chunk_size)
+    else:
+        yield from source
+
+class InteractionAggregates:
+    """Whole-dataset aggregates built incrementally from conformed chunks
+
+    Each update() reduces a chunk to small partial aggregates; partials are
+    re-reduced every `compact_every` chunks so state grows with the number
+    of distinct keys (brands, customers, transactions), not with rows.
+    """
+
+    def __init__(self, compact_every: int = 16):
+        self.compact_every = compact_every
+        self.transaction_cols: Optional[List[str]] = None
+        self.plan: Optional[AggregationPlan] = None
+        self._partials: Dict[str, List[Any]] = {'lookups': [], 'transactions': []}
+        self._pending = 0
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold one conformed interactions chunk into the running aggregates"""
+        if df.empty:
+            return
+
+        # Same plan as batch enrichment; each chunk yields mergeable partial states
+        if self.plan is None:
+            self.plan = enrichment_plan(df.columns)
+        self._partials['lookups'].append(self.plan.partial(df))
+
+        if self.transaction_cols is None:
+            self.transaction_cols = [col for col in TRANSACTION_COLS if col in df.columns]
+        if self.transaction_cols:
+            self._partials['transactions'].append(
+                summarize_transaction_values(df, self.transaction_cols)
+            )
+
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    def compact(self) -> None:
+        """Re-reduce buffered partials into a single partial per aggregate"""
+        parts = self._partials
+        if len(parts['lookups']) > 1:
+            parts['lookups'] = [self.plan.combine(parts['lookups'])]
+        if len(parts['transactions']) > 1:
+            parts['transactions'] = [
+                merge_transaction_summaries(parts['transactions'], self.transaction_cols)
+            ]
+        self._pending = 0
+
+    def lookups(self) -> Dict[str, Any]:
+        """Aggregates in the format build_enrichment_lookups returns"""
+        self.compact()
+        if not self._partials['lookups']:
+            return {}
+        return enrichment_lookups(self.plan.finalize(self._partials['lookups'][0]))
+
+    def transaction_summary(self) -> pd.DataFrame:
+        """Transaction summary equivalent to create_transaction_summary"""
+        self.compact()
+        if not self._partials['transactions']:
+            return pd.DataFrame()
+
+        df = (join_top_values(*self._partials['transactions'][0])
+              .sort_values(self.transaction_cols, kind='stable')
+              .reset_index(drop=True))
+        return finish_transaction_summary(df)
+
+class StreamingPipeline:
+    """Chunked bronze -> silver -> enrich execution for sales interactions
+
+    Stores and devices are small lookup tables and stay resident; sales are
+    processed one chunk at a time, so peak memory is bounded by the chunk
+    size rather than by the extract window.
+    """
+
+    def __init__(self, run: ETLRun,
+                 stores_df: Optional[pd.DataFrame] = None,
+                 devices_df: Optional[pd.DataFrame] = None,
+                 chunk_size: Optional[int] = None):
+        self.run = run
+        self.chunk_size = chunk_size or cfg.stream_chunk_size
+        self.aggregates = InteractionAggregates()
+        self.stores = pd.DataFrame()
+        self.devices = pd.DataFrame()
+        self.rows_in = 0
+        self.rows_out = 0
+        self.chunks = 0
+        self._orphans: Dict[str, set] = {'store': set(), 'device': set()}
+        self._index = None
+        self._index_lookups = None
+
+        # Lookup tables are conformed once and kept resident
+        if stores_df is not None and not stores_df.empty:
+            self.stores = conform_stores(normalize_source_data(stores_df, 'stores', run), run)
+        if devices_df is not None and not devices_df.empty:
+            self.devices = conform_devices(
+                normalize_source_data(devices_df, 'devices', run), self.stores, run
+            )
+
+    def conform_chunk(self, raw_chunk: pd.DataFrame, update_aggregates: bool = True) -> pd.DataFrame:
+        """Bronze-normalize and silver-conform one raw sales chunk"""
+        bronze = normalize_frame(raw_chunk, 'sales', row_offset=self.rows_in,
+                                 drop_empty_columns=False)
+        self.rows_in += len(raw_chunk)
+
+        silver = conform_interaction_frame(bronze)
+        self._track_orphans(silver)
+        if update_aggregates:
+            self.aggregates.update(silver)
+        return silver
+
+    def enrich_chunk(self, silver_chunk: pd.DataFrame,
+                     lookups: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Enrich one conformed chunk against the resident lookup tables"""
+        # The lookup index is built once per set of aggregates, not per chunk
+        if self._index is None or self._index_lookups is not lookups:
+            self._index = build_enrichment_index(self.stores, self.devices, lookups)
+            self._index_lookups = lookups
+
+        enriched = enrich_frame(silver_chunk, self.stores, self.devices, None, lookups,
+                                index=self._index)
+        self.rows_out += len(enriched)
+        self.chunks += 1
+        return enriched
+
+    def stream(self, sales: ChunkSource) -> Iterator[pd.DataFrame]:
+        """Single pass: yield enriched chunks while building aggregates
+
+        Columns that depend on whole-dataset aggregates (brand/category stats,
+        customer frequency, basket brand counts) are not attached; they are
+        available from finish() once the stream is exhausted.
+        """
+        for raw_chunk in iter_chunks(sales, self.chunk_size):
+            silver = self.conform_chunk(raw_chunk)
+            if not silver.empty:
+                yield self.enrich_chunk(silver)
+
+    def stream_two_pass(self, sales_factory: Callable[[], ChunkSource]) -> Iterator[pd.DataFrame]:
+        """Two passes over a replayable source for batch-equivalent columns
+
+        The first pass only builds aggregates; the second re-reads the source
+        and yields fully enriched chunks, so memory stays bounded by the chunk.
+        """
+        for raw_chunk in iter_chunks(sales_factory(), self.chunk_size):
+            self.conform_chunk(raw_chunk)
+
+        lookups = self.aggregates.lookups()
+        self.rows_in = 0
+
+        for raw_chunk in iter_chunks(sales_factory(), self.chunk_size):
+            silver = self.conform_chunk(raw_chunk, update_aggregates=False)
+            if not silver.empty:
+                yield self.enrich_chunk(silver, lookups)
+
+    def finish(self) -> Dict[str, pd.DataFrame]:
+        """Finalize incremental aggregates and log the streaming run"""
+        lookups = self.aggregates.lookups()
+        results = {
+            'stores': self.stores,
+            'devices': self.devices,
+            'transactions': self.aggregates.transaction_summary(),
+        }
+        for name in ('brand_stats', 'category_stats'):
+            if name in lookups:
+                results[name] = lookups[name].reset_index()
+        if 'customer_frequency' in lookups:
+            results['customer_frequency'] = (lookups['customer_frequency']
+                                             .rename('customer_frequency').reset_index())
+
+        self.run.log_step("stream_interactions", "success",
+                          chunks=self.chunks, rows_in=self.rows_in, rows_out=self.rows_out,
+                          chunk_size=self.chunk_size)
+        for fk_name, orphans in self._orphans.items():
+            if orphans:
+                self.run.log_step(f"stream_interactions_{fk_name}_orphans", "warning",
+                                  orphan_count=len(orphans))
+        self.run.log_metric("stream_transactions_created", len(results['transactions']))
+
+        return results
+
+    def _track_orphans(self, silver: pd.DataFrame) -> None:
+        """Collect FK values that have no match in the resident lookup tables"""
+        for fk_name, ref_df in (('store', self.stores), ('device', self.devices)):
+            col = f'{fk_name}_id'
+            if ref_df.empty or col not in silver.columns:
+                continue
+            values = pd.Index(silver[col].dropna().unique())
+            self._orphans[fk_name].update(values.difference(ref_df[col].dropna()))
@@ -0,0 +1,38 @@
+"""
+Tests for Scout ETL Pipeline incremental customer segments
+"""
+import pandas as pd
+import pytest
+
+from etl.common.log import log_run
+from etl.transform.customer_segments import CustomerSegmentStore, update_customer_segments
+
+def _interactions(rows):
+    return pd.DataFrame([
+        {'interaction_id': interaction_id, 'transaction_id': interaction_id,
+         'transaction_date': date, 'customer_id': customer, 'total_amount': amount,
+         'store_id': 'S1', 'device_id': 'D1', 'brand': 'B', 'category': 'C',
+         'sku': 'K', 'product_id': 'P', 'quantity': 1, 'unit_price': amount}
+        for interaction_id, date, customer, amount in rows
+    ])
+
+@pytest.fixture
+def run(monkeypatch):
+    monkeypatch.setenv("ETL_LOG_BUFFERED", "false")
+    return log_run()
+
+def test_incremental_segments_merge_every_unseen_interaction(tmp_path, run):
+    store = CustomerSegmentStore(tmp_path)
+    # '9' sorts after '10' as a string; both are on the same day
+    first = _interactions([('10', '2024-01-02', 'c1', 5.0), ('9', '2024-01-02', 'c1', 7.0),
+                           ('11', '2024-01-01', 'c2', 3.0)])
+    segments = update_customer_segments(first, run, store, full_refresh=True)
+    assert segments['transaction_count'].tolist() == [2, 1]
+
+    # The overlap window is re-read alongside a late row for an already merged day
+    second = pd.concat([first, _interactions([('8', '2024-01-02', 'c1', 1.0),
+                                              ('12', '2024-01-03', 'c2', 2.0)])])
+    for _ in range(2):
+        segments = update_customer_segments(second, run, store, full_refresh=False)
+        assert segments['transaction_count'].tolist() == [3, 2]
+        assert segments['total_revenue'].tolist() == [13.0, 5.0]
@@ -0,0 +1,32 @@
+"""
+Tests for Scout ETL Pipeline common I/O helpers
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.common.io import clean_dataframe, clean_strings
+
+@pytest.mark.parametrize("values", [[None, None], ['', ''], ['nan', ' None ', '']])
+def test_clean_strings_all_null_column(values):
+    series = pd.Series(values, dtype=object)
+
+    result = clean_strings(series)
+    assert len(result) == len(values)
+    assert result.isna().all()
+
+    categorical = clean_strings(series, categorical=True)
+    assert isinstance(categorical.dtype, pd.CategoricalDtype)
+    assert categorical.isna().all()
+
+def test_clean_strings_keeps_na_value_alongside_values():
+    result = clean_strings(pd.Series([' a ', '', None, 'A'], dtype=object), case='upper', na_value=pd.NA)
+    assert result.tolist()[0] == 'A' and result.tolist()[3] == 'A'
+    assert result.iloc[1] is pd.NA and result.iloc[2] is pd.NA
+
+def test_clean_dataframe_all_token_column():
+    df = pd.DataFrame({'SKU': ['', ''], 'Quantity': [1, 2]})
+
+    result = clean_dataframe(df)
+    assert result['SKU'].isna().all()
+    assert result['Quantity'].tolist() == [1, 2]
@@ -0,0 +1,45 @@
+"""
+Tests for Scout ETL Pipeline silver conformance
+"""
+import pandas as pd
+
+from etl.transform.silver_conform import (
+    join_top_values, merge_transaction_summaries, summarize_transaction_values, summarize_transactions
+)
+
+COLS = ['transaction_id', 'store_id']
+
+def _interactions(rows):
+    return pd.DataFrame([
+        {'transaction_id': t, 'store_id': 'S1', 'brand': brand, 'category': category,
+         'quantity': 1, 'total_amount': 1.0, 'product_name': 'P'}
+        for t, brand, category in rows
+    ])
+
+def _merged(chunks):
+    partials = [summarize_transaction_values(chunk, COLS) for chunk in chunks]
+    summary, top_values = merge_transaction_summaries(partials, COLS)
+    return summary, top_values
+
+def test_chunked_summaries_match_batch_when_a_chunk_has_no_brands():
+    chunks = [_interactions([('T1', None, None)]), _interactions([('T1', 'NIKE', 'Shoes')])]
+
+    merged = join_top_values(*_merged(chunks))
+    batch = summarize_transactions(pd.concat(chunks, ignore_index=True), COLS)
+
+    assert merged['brands_purchased'].tolist() == batch['brands_purchased'].tolist() == ['NIKE']
+    assert merged['categories_purchased'].tolist() == ['Shoes']
+    assert merged['item_count'].tolist() == [2]
+
+def test_chunked_summaries_merge_on_codes():
+    chunks = [
+        _interactions([('T1', 'A|B', 'X'), ('T2', 'C', 'Y')]),
+        _interactions([('T1', 'C', 'X'), ('T1', 'A|B', 'Z'), ('T2', 'D', 'Y')]),
+    ]
+
+    summary, top_values = _merged(chunks)
+
+    # '|' inside a value stays one value; first-seen order across chunks is kept
+    assert top_values['brands_purchased'].to_lists() == [['A|B', 'C'], ['C', 'D']]
+    assert top_values['categories_purchased'].to_lists() == [['X', 'Z'], ['Y']]
+    assert summary['item_count'].tolist() == [3, 2]
@@ -0,0 +1,22 @@
+"""
+Tests for Scout ETL Pipeline utilities
+"""
+import pandas as pd
+import pytest
+
+from etl.common.util import infer_column_type, sample_values
+
+@pytest.mark.parametrize("bad_value, expected", [('N/A-RETURNED', "string"), ('12.5', "float")])
+def test_cached_type_is_confirmed_on_the_full_column(bad_value, expected):
+    # One value outside the sample disagrees with the cached schema
+    values = pd.Series([str(i) for i in range(5_000)], dtype=object)
+    unsampled = values.index.difference(sample_values(values).index)[-1]
+    values[unsampled] = bad_value
+
+    assert infer_column_type(values) == expected
+    assert infer_column_type(values, cached_type="integer") == expected
+
+def test_cached_type_kept_when_every_value_fits():
+    values = pd.Series([str(i) for i in range(5_000)], dtype=object)
+
+    assert infer_column_type(values, cached_type="integer") == "integer"